@@ -0,0 +1,95 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+"""Compares the block-wise CSV encoder with the former row-by-row generator
+
+Usage: python scripts/benchmarks/csv_export.py [rows] [block_size]
+"""
+
+import sys
+import timeit
+from datetime import datetime
+from decimal import Decimal
+
+from superset.utils import csv as csv_utils
+
+
+def make_rows(count):
+    return [
+        (
+            i,
+            f"user {i}",
+            None if i % 7 == 0 else i * 3.14,
+            'said "hello", then left',
+            datetime(2019, 1, 1, i % 24),
+            Decimal(i) / 100,
+        )
+        for i in range(count)
+    ]
+
+
+def legacy_generate(header, rows):
+    """The generator `_streaming_csv` used to build the CSV with"""
+    yield ",".join(f'"{col}"' for col in header) + "\n"
+    for row in rows:
+        s = ""
+        for item in row:
+            if item is None:
+                s += ","
+            else:
+                if '"' in str(item):
+                    item = item.replace('"', '""')
+                s += f'"{item}",'
+        yield s[:-1] + "\n"
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    block_size = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+    header = ["id", "name", "value", "comment", "ts", "amount"]
+    rows = make_rows(count)
+    blocks = list(csv_utils.chunk_rows(rows, block_size))
+
+    legacy = "".join(legacy_generate(header, rows))
+    blockwise = "".join(csv_utils.stream_csv(header, blocks))
+    assert legacy == blockwise, "outputs differ"
+
+    timings = {
+        "legacy": min(
+            timeit.repeat(
+                lambda: sum(1 for _ in legacy_generate(header, rows)),
+                number=1,
+                repeat=3,
+            )
+        ),
+        "blockwise": min(
+            timeit.repeat(
+                lambda: sum(1 for _ in csv_utils.stream_csv(header, blocks)),
+                number=1,
+                repeat=3,
+            )
+        ),
+    }
+    size_mb = len(blockwise) / 1024 / 1024
+    for name, seconds in timings.items():
+        print(
+            f"{name:>10}: {seconds:.3f}s for {count} rows, "
+            f"{count / seconds:,.0f} rows/s, {size_mb / seconds:.1f} MB/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+"""Compares SupersetDataFrame construction with the former object-array path
+
+Synthetic SQL Lab results of several widths and column types are converted
+both with and without engine provided dtypes (Presto and the base spec).
+Besides the best time, the peak memory allocated during one construction is
+reported next to the size of the result: the rows are already allocated when
+it starts, so the peak is made of the typed buffers of the result plus the
+intermediate copies the construction holds, while the values of object
+columns are shared with the rows.
+
+Usage: python scripts/benchmarks/dataframe.py [rows]
+"""
+import sys
+import timeit
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from superset.dataframe import SupersetDataFrame
+from superset.db_engine_specs.base import BaseEngineSpec
+from superset.db_engine_specs.presto import PrestoEngineSpec
+
+COLUMN_TYPES = {
+    "bigint": lambda i: None if i % 10 == 0 else i * 7,
+    "double": lambda i: i / 3,
+    "varchar": lambda i: f"value {i}",
+    "timestamp": lambda i: datetime(2019, 1, 1 + i % 28, i % 24),
+    "boolean": lambda i: i % 2 == 0,
+}
+
+SHAPES = {
+    "narrow mixed": ["bigint", "double", "varchar", "timestamp"],
+    "wide numeric": ["bigint", "double"] * 25,
+    "wide mixed": list(COLUMN_TYPES) * 10,
+}
+
+
+def make_cursor(types, rows):
+    description = [
+        (f"col_{i}", type_, None, None, None, None, True)
+        for i, type_ in enumerate(types)
+    ]
+    makers = [COLUMN_TYPES[type_] for type_ in types]
+    data = [tuple(make(i) for make in makers) for i in range(rows)]
+    return description, data
+
+
+def legacy_df(data, cursor_description, db_engine_spec):
+    """The construction `SupersetDataFrame.__init__` used to perform"""
+    column_names = [col[0] for col in cursor_description]
+    dtype = db_engine_spec.get_pandas_dtype(cursor_description)
+    if dtype:
+        array = np.array(data, dtype="object").reshape(-1, len(column_names))
+        data = {
+            column: pd.Series(array[:, i], dtype=dtype[column])
+            for i, column in enumerate(column_names)
+        }
+        return pd.DataFrame(data, columns=column_names)
+    return pd.DataFrame(list(data), columns=column_names).infer_objects()
+
+
+def peak_memory(func):
+    """Returns the peak memory, in bytes, allocated while running `func`"""
+    tracemalloc.start()
+    try:
+        result = func()
+        return tracemalloc.get_traced_memory()[1], result
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    for shape, types in SHAPES.items():
+        description, data = make_cursor(types, rows)
+        for spec in (PrestoEngineSpec, BaseEngineSpec):
+            legacy = legacy_df(data, description, spec)
+            current = SupersetDataFrame(data, description, spec).df
+            pd.testing.assert_frame_equal(legacy, current)
+
+            timings = {
+                "legacy": lambda: legacy_df(data, description, spec),
+                "transposed": lambda: SupersetDataFrame(data, description, spec),
+            }
+            for name, func in timings.items():
+                seconds = min(timeit.repeat(func, number=1, repeat=5))
+                peak, result = peak_memory(func)
+                if isinstance(result, SupersetDataFrame):
+                    result = result.df
+                size = result.memory_usage(index=False, deep=True).sum()
+                print(
+                    f"{shape:>12} ({len(types):>2} cols, {spec.engine:>6}) "
+                    f"{name:>11}: {seconds * 1000:8.1f}ms, "
+                    f"peak {peak / 1024 ** 2:6.1f}MB for a "
+                    f"{size / 1024 ** 2:6.1f}MB result of {rows} rows"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+"""Compares the deck.gl scatter payloads with their former row-wise version
+
+The synthetic points are given as longitude and latitude columns, as
+delimited "lat, lon" strings and as geohashes, each with a metric used as
+the radius, a category and a timestamp. The payloads are built and
+serialized to JSON as `explore_json` does.
+
+Usage: python scripts/benchmarks/deck_gl.py [rows]
+"""
+import sys
+import timeit
+from unittest.mock import Mock
+
+import geohash
+import numpy as np
+import pandas as pd
+
+from superset import viz
+from superset.utils.core import DTTM_ALIAS
+
+SPATIAL = {
+    "latlong": {"type": "latlong", "lonCol": "lon", "latCol": "lat"},
+    "delimited": {"type": "delimited", "lonlatCol": "lonlat"},
+    "geohash": {"type": "geohash", "geohashCol": "geo"},
+}
+
+
+def make_points(rows):
+    rng = np.random.RandomState(0)
+    lat = rng.uniform(-80, 80, rows).round(6)
+    lon = rng.uniform(-170, 170, rows).round(6)
+    return pd.DataFrame(
+        {
+            "lon": lon,
+            "lat": lat,
+            "lonlat": [f"{a}, {b}" for a, b in zip(lat, lon)],
+            "geo": [geohash.encode(a, b, precision=9) for a, b in zip(lat, lon)],
+            "count": rng.randint(1, 1000, size=rows),
+            "category": np.array(["a", "b", "c", "d"])[rng.randint(4, size=rows)],
+            DTTM_ALIAS: pd.Timestamp("2019-01-01")
+            + pd.to_timedelta(rng.randint(0, 86400, size=rows), unit="s"),
+        }
+    )
+
+
+class LegacyDeckScatterViz(viz.DeckScatterViz):
+    """The row-wise spatial processing `BaseDeckGLViz` used to perform"""
+
+    def process_spatial_data_obj(self, key, df):
+        spatial = self.form_data.get(key)
+        if spatial.get("type") == "latlong":
+            df[key] = list(
+                zip(
+                    pd.to_numeric(df[spatial.get("lonCol")], errors="coerce"),
+                    pd.to_numeric(df[spatial.get("latCol")], errors="coerce"),
+                )
+            )
+        elif spatial.get("type") == "delimited":
+            lon_lat_col = spatial.get("lonlatCol")
+            df[key] = df[lon_lat_col].apply(self.parse_coordinates)
+            del df[lon_lat_col]
+        elif spatial.get("type") == "geohash":
+            df[key] = df[spatial.get("geohashCol")].map(self.reverse_geohash_decode)
+            del df[spatial.get("geohashCol")]
+        return df
+
+
+def get_payload(viz_class, points, spatial, columnar=False):
+    form_data = {
+        "spatial": SPATIAL[spatial],
+        "point_radius_fixed": {"type": "metric", "value": "count"},
+        "dimension": "category",
+        "columnar_features": columnar,
+    }
+    viz_obj = viz_class(Mock(), form_data)
+    viz_obj.metric = "count"
+    return viz_obj.json_dumps(viz_obj.get_data(points.copy()))
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    points = make_points(rows)
+
+    print(f"{rows} points")
+    for spatial in SPATIAL:
+        legacy = get_payload(LegacyDeckScatterViz, points, spatial)
+        current = get_payload(viz.DeckScatterViz, points, spatial)
+        assert legacy == current
+        print(spatial)
+        for name, viz_class, columnar in (
+            ("legacy", LegacyDeckScatterViz, False),
+            ("rows", viz.DeckScatterViz, False),
+            ("columnar", viz.DeckScatterViz, True),
+        ):
+            payload = get_payload(viz_class, points, spatial, columnar)
+            seconds = min(
+                timeit.repeat(
+                    lambda: get_payload(viz_class, points, spatial, columnar),
+                    number=1,
+                    repeat=3,
+                )
+            )
+            print(
+                f"{name:>10}: {seconds * 1000:.1f}ms, "
+                f"{len(payload) / 1024 / 1024:.1f}MB"
+            )
+
+
+if __name__ == "__main__":
+    main()
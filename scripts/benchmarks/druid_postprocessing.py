@@ -0,0 +1,98 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+"""Compares the post-processing of Druid results with its former row-wise version
+
+The synthetic response is what `PyDruid.export_pandas` returns for an hourly
+groupBy query: ISO timestamps, two string dimensions with some nulls, one
+numeric dimension and two metrics.
+
+Usage: python scripts/benchmarks/druid_postprocessing.py [rows] [cardinality]
+"""
+import sys
+import timeit
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from superset.connectors.druid.models import DRUID_TZ, DruidDatasource
+from superset.utils import core as utils
+
+GROUPBY = ["country", "device", "version"]
+# the offset of the week_ending_saturday granularity, in milliseconds
+OFFSET = 6 * 24 * 3600 * 1000
+
+
+def make_response(rows, cardinality):
+    rng = np.random.RandomState(0)
+    hours = pd.date_range("2019-01-01", periods=rows // cardinality + 1, freq="H")
+    timestamps = hours.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+    countries = np.array([f"country {i}" for i in range(cardinality)], dtype=object)
+    country = countries[rng.randint(cardinality, size=rows)]
+    country[rng.rand(rows) < 0.05] = None
+    return pd.DataFrame(
+        {
+            "timestamp": np.repeat(timestamps.values, cardinality)[:rows],
+            "country": country,
+            "device": np.array(["mobile", "desktop", None], dtype=object)[
+                rng.randint(3, size=rows)
+            ],
+            "version": rng.randint(10, size=rows).astype(float),
+            "count": rng.randint(1000, size=rows),
+            "sum": rng.rand(rows),
+        }
+    )
+
+
+def legacy_postprocessing(df):
+    """The conversions `DruidDatasource.query` used to perform"""
+
+    def increment_timestamp(ts):
+        dt = utils.parse_human_datetime(ts).replace(tzinfo=DRUID_TZ)
+        return dt + timedelta(milliseconds=OFFSET)
+
+    df[GROUPBY] = df[GROUPBY].fillna("<NULL>").astype("unicode")
+    df["timestamp"] = df["timestamp"].apply(increment_timestamp)
+    return df
+
+
+def current_postprocessing(df):
+    df = DruidDatasource.homogenize_types(df, GROUPBY)
+    df["timestamp"] = DruidDatasource.increment_timestamps(df["timestamp"], OFFSET)
+    return df
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    cardinality = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    response = make_response(rows, cardinality)
+
+    legacy = legacy_postprocessing(response.copy())
+    current = current_postprocessing(response.copy())
+    pd.testing.assert_frame_equal(legacy, current)
+
+    print(f"{rows} rows, {cardinality} values per dimension")
+    for name, func in (
+        ("legacy", legacy_postprocessing),
+        ("current", current_postprocessing),
+    ):
+        seconds = min(timeit.repeat(lambda: func(response.copy()), number=1, repeat=3))
+        print(f"{name:>8}: {seconds * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
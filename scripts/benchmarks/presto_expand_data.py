@@ -0,0 +1,129 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+"""Compares PrestoEngineSpec.expand_data with its former quadratic version
+
+Rows hold a top level array and a row, both with nested ROW and ARRAY fields,
+every array having the same length so that both versions agree.
+
+Usage: python scripts/benchmarks/presto_expand_data.py [rows] [array_length]
+"""
+import copy
+import sys
+import timeit
+from collections import defaultdict, deque
+from unittest import mock
+
+from superset.db_engine_specs.presto import get_children, PrestoEngineSpec
+
+COLUMNS = [
+    {"name": "id", "type": "BIGINT"},
+    {
+        "name": "events",
+        "type": (
+            "ARRAY(ROW(name VARCHAR, tags ARRAY(VARCHAR), "
+            "detail ROW(score DOUBLE, samples ARRAY(BIGINT))))"
+        ),
+    },
+    {"name": "owner", "type": "ROW(name VARCHAR, emails ARRAY(VARCHAR))"},
+]
+
+
+def make_data(rows, length):
+    def event(i, j):
+        return [
+            f"event {j}",
+            [f"tag {k}" for k in range(length)],
+            [i * 0.5, list(range(length))],
+        ]
+
+    return [
+        {
+            "id": i,
+            "events": [event(i, j) for j in range(length)],
+            "owner": [f"user {i}", [f"user{i}@{k}.com" for k in range(length)]],
+        }
+        for i in range(rows)
+    ]
+
+
+def legacy_expand_data(columns, data):
+    """The expansion `PrestoEngineSpec.expand_data` used to perform"""
+    to_process = deque((column, 0) for column in columns)
+    all_columns = []
+    expanded_columns = []
+    current_array_level = None
+    while to_process:
+        column, level = to_process.popleft()
+        if column["name"] not in [column["name"] for column in all_columns]:
+            all_columns.append(column)
+        if level != current_array_level:
+            unnested_rows = defaultdict(int)
+            current_array_level = level
+        name = column["name"]
+        if column["type"].startswith("ARRAY("):
+            to_process.append((get_children(column)[0], level + 1))
+            i = 0
+            while i < len(data):
+                row = data[i]
+                values = row.get(name)
+                if values:
+                    extra_rows = len(values) - 1
+                    current_unnested_rows = unnested_rows[i]
+                    missing = extra_rows - current_unnested_rows
+                    for _ in range(missing):
+                        data.insert(i + current_unnested_rows + 1, {})
+                        unnested_rows[i] += 1
+                    for j, value in enumerate(values):
+                        data[i + j][name] = value
+                    i += unnested_rows[i]
+                i += 1
+        if column["type"].startswith("ROW("):
+            expanded = get_children(column)
+            to_process.extendleft((column, level) for column in expanded)
+            expanded_columns.extend(expanded)
+            for row in data:
+                for value, col in zip(row.get(name) or [], expanded):
+                    row[col["name"]] = value
+    data = [{k["name"]: row.get(k["name"], "") for k in all_columns} for row in data]
+    return all_columns, data, expanded_columns
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    length = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    data = make_data(rows, length)
+
+    with mock.patch.dict("superset._feature_flags", {"PRESTO_EXPAND_DATA": True}):
+        current = PrestoEngineSpec.expand_data(COLUMNS, copy.deepcopy(data))
+        legacy = legacy_expand_data(COLUMNS, copy.deepcopy(data))
+        assert legacy == current, "outputs differ"
+
+        timings = {
+            "legacy": lambda: legacy_expand_data(COLUMNS, copy.deepcopy(data)),
+            "current": lambda: PrestoEngineSpec.expand_data(
+                COLUMNS, copy.deepcopy(data)
+            ),
+        }
+        copy_time = min(timeit.repeat(lambda: copy.deepcopy(data), number=1, repeat=3))
+        print(f"{rows} rows expanded into {len(current[1])} rows")
+        for name, func in timings.items():
+            seconds = min(timeit.repeat(func, number=1, repeat=3)) - copy_time
+            print(f"{name:>8}: {seconds * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+"""Measures the cost of parsing large SQL statements with and without the cache
+
+A request running a query parses its SQL several times (`sql_csv_api`,
+`rejected_tables`, `execute_sql_statements`, `execute_sql_statement`...),
+which is simulated by building `ParsedQuery` objects `parses` times.
+
+Usage: python scripts/benchmarks/sql_parse.py [tables] [columns] [parses]
+"""
+import sys
+import timeit
+
+from superset import sql_parse
+
+
+def make_sql(tables, columns):
+    select = ",\n  ".join(f"t{i % tables}.col_{i} AS alias_{i}" for i in range(columns))
+    joins = "\n".join(
+        f"LEFT JOIN schema_{i % 3}.table_{i} t{i} ON t{i}.id = t0.id"
+        for i in range(1, tables)
+    )
+    where = " AND ".join(f"t{i}.col_{i} > {i}" for i in range(tables))
+    return (
+        f"SELECT\n  {select}\nFROM schema_0.table_0 t0\n{joins}\n"
+        f"WHERE {where}\nLIMIT 1000"
+    )
+
+
+def main():
+    tables = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    columns = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    parses = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+    sql = make_sql(tables, columns)
+
+    def request(use_cache):
+        for _ in range(parses):
+            if not use_cache:
+                sql_parse.parse_cache.clear()
+            parsed = sql_parse.ParsedQuery(sql)
+            parsed.tables
+            parsed.is_readonly()
+            parsed.get_statements()
+
+    print(f"{len(sql)} characters, {tables} tables, {parses} parses per request")
+    for use_cache in (False, True):
+        sql_parse.parse_cache.clear()
+        seconds = min(timeit.repeat(lambda: request(use_cache), number=1, repeat=5))
+        label = "cached" if use_cache else "uncached"
+        print(f"{label:>10}: {seconds * 1000:.3f}ms per request")
+
+
+if __name__ == "__main__":
+    main()
@@ -164,14 +164,24 @@ def set_database_uri(database_name, uri):
     default=False,
     help="Specify using 'merge' property during operation. " "Default value is False.",
 )
-def refresh_druid(datasource, merge):
+@click.option(
+    "--incremental",
+    "-i",
+    is_flag=True,
+    default=False,
+    help="Skip datasources whose segment metadata is unchanged since their "
+    "last refresh. Default value is False.",
+)
+def refresh_druid(datasource, merge, incremental):
     """Refresh druid datasources"""
     session = db.session()
     from superset.connectors.druid.models import DruidCluster
 
     for cluster in session.query(DruidCluster).all():
         try:
-            cluster.refresh_datasources(datasource_name=datasource, merge_flag=merge)
+            cluster.refresh_datasources(
+                datasource_name=datasource, merge_flag=merge, incremental=incremental
+            )
         except Exception as e:
             print("Error while processing cluster '{}'\n{}".format(cluster, str(e)))
             logging.exception(e)
@@ -16,7 +16,6 @@
 # under the License.
 # pylint: disable=C,R,W
 import logging
-import pickle as pkl
 from datetime import datetime, timedelta
 from typing import Any, Dict, List, Optional
 
@@ -27,7 +26,7 @@ from superset import app, cache, db
 from superset.connectors.base.models import BaseDatasource
 from superset.connectors.connector_registry import ConnectorRegistry
 from superset.stats_logger import BaseStatsLogger
-from superset.utils import core as utils
+from superset.utils import cache_codec, core as utils
 from superset.utils.core import DTTM_ALIAS
 
 from .query_object import QueryObject
@@ -183,7 +182,7 @@ class QueryContext:
             if cache_value:
                 stats_logger.incr("loaded_from_cache")
                 try:
-                    cache_value = pkl.loads(cache_value)
+                    cache_value = cache_codec.loads(cache_value)
                     df = cache_value["df"]
                     query = cache_value["query"]
                     status = utils.QueryStatus.SUCCESS
@@ -215,7 +214,11 @@ class QueryContext:
             if is_loaded and cache_key and cache and status != utils.QueryStatus.FAILED:
                 try:
                     cache_value = dict(dttm=cached_dttm, df=df, query=query)
-                    cache_binary = pkl.dumps(cache_value, protocol=pkl.HIGHEST_PROTOCOL)
+                    cache_binary = cache_codec.dumps(
+                        cache_value,
+                        config["CHART_CACHE_CODEC"],
+                        config["CHART_CACHE_COMPRESSION"],
+                    )
 
                     logging.info(
                         "Caching {} chars at key {}".format(
@@ -75,6 +75,13 @@ ROW_LIMIT = 50000
 VIZ_ROW_LIMIT = 10000
 # max rows retrieved by filter select auto complete
 FILTER_SELECT_ROW_LIMIT = 10000
+
+# Rows are fetched from the database QUERY_FETCH_CHUNK_SIZE at a time when
+# building chart and explore DataFrames. Queries whose result takes more than
+# QUERY_RESULT_MAX_BYTES bytes of memory are aborted, None means no limit.
+QUERY_FETCH_CHUNK_SIZE = 10000
+QUERY_RESULT_MAX_BYTES = None
+
 SUPERSET_WORKERS = 2  # deprecated
 SUPERSET_CELERY_WORKERS = 32  # deprecated
 
@@ -124,6 +131,19 @@ WTF_CSRF_EXEMPT_LIST = [
     "superset.views.core.verify_user_perm"
     ]
 
+# Size and time-to-live (in seconds) of the per-process cache resolving the
+# access keys of the `sql_csv_api` and `verify_user_perm` endpoints to users.
+# Set the TTL to 0 to disable the cache.
+ACCESS_KEY_CACHE_SIZE = 1024
+ACCESS_KEY_CACHE_TTL = 300
+
+# Share the AICS table permissions of a user across requests for up to this many
+# seconds, rather than loading them once per request. Shared entries are dropped
+# when table permissions are changed through this process, and never outlive
+# the expiry date of the permissions they hold. 0 disables sharing.
+AICS_TABLE_PERMISSION_CACHE_TTL = 0
+AICS_TABLE_PERMISSION_CACHE_SIZE = 1024
+
 # Whether to run the web server in debug mode or not
 DEBUG = os.environ.get("FLASK_ENV") == "development"
 FLASK_USE_RELOAD = True
@@ -163,6 +183,19 @@ DRUID_IS_ACTIVE = True
 DRUID_TZ = tz.tzutc()
 DRUID_ANALYSIS_TYPES = ["cardinality"]
 
+# By default every Druid query creates its own pydruid client and opens a new
+# connection to the broker. When enabled, clients are checked out of a pool
+# per broker, sharing up to DRUID_CLIENT_POOL_SIZE keep-alive connections.
+DRUID_CLIENT_POOL_ENABLED = False
+DRUID_CLIENT_POOL_SIZE = 10
+# Seconds the version of a Druid cluster is cached for
+DRUID_VERSION_CACHE_TTL = 300
+# Number of threads fetching segment metadata when refreshing Druid
+# datasources, and number of datasources whose columns and metrics are merged
+# in one transaction
+DRUID_REFRESH_MAX_WORKERS = 8
+DRUID_REFRESH_BATCH_SIZE = 100
+
 # ----------------------------------------------------
 # AUTHENTICATION CONFIG
 # ----------------------------------------------------
@@ -271,6 +304,57 @@ CACHE_DEFAULT_TIMEOUT = 60 * 60 * 24
 CACHE_CONFIG: Dict[str, Any] = {"CACHE_TYPE": "null"}
 TABLE_NAMES_CACHE_CONFIG = {"CACHE_TYPE": "null"}
 
+# Codec used to serialize chart data (DataFrames) stored in the cache.
+# "arrow" stores results as Arrow IPC streams, "pickle" is the legacy format.
+# Entries written with any codec, or before codecs existed, remain readable.
+CHART_CACHE_CODEC = "arrow"
+# Optional compression of cached chart data, one of
+# None, "lz4", "zstd", "gzip", "snappy" or "brotli"
+CHART_CACHE_COMPRESSION = None
+# Also cache the serialized JSON payload of charts, keyed by their data cache
+# key and form data, so that requests for a chart whose data is cached skip
+# its post-processing and serialization, POST requests included. Payloads
+# expire with the data they were built from.
+CHART_PAYLOAD_CACHE_ENABLED = False
+# Let a single process run the query of chart data missing from the cache,
+# while other requests for the same data wait for it to be cached instead of
+# running the same query, e.g. when the cache of a popular dashboard expires.
+# Waiting requests run the query themselves after waiting for
+# CHART_SINGLE_FLIGHT_WAIT_TIMEOUT seconds. The lock taken on the cache backend
+# expires after CHART_SINGLE_FLIGHT_LOCK_TIMEOUT seconds, should its holder die.
+CHART_SINGLE_FLIGHT_ENABLED = False
+CHART_SINGLE_FLIGHT_LOCK_TIMEOUT = 300
+CHART_SINGLE_FLIGHT_WAIT_TIMEOUT = 60
+# Default duration (in seconds) during which the cached data of charts is still
+# served after its caching timeout, while a Celery worker refreshes it, unless
+# defined for the datasource or the database. None disables serving expired
+# data. Refreshes in progress are marked in the cache for at most
+# CHART_CACHE_REFRESH_TIMEOUT seconds.
+CACHE_DEFAULT_MAX_STALENESS = None
+CHART_CACHE_REFRESH_TIMEOUT = 600
+
+# Cache the data of time series charts on SQL tables by day as well, so that
+# when their time range moves (e.g. "Last week") or their cache expires, only
+# the days missing from the cache are queried. The days that ended less than
+# CHART_INCREMENTAL_CACHE_LAG seconds ago are always queried, so that late
+# data is picked up. Only applies to time grains of a day or less, and to
+# queries without a series limit.
+CHART_INCREMENTAL_CACHE_ENABLED = False
+CHART_INCREMENTAL_CACHE_LAG = 3600
+
+# Number of charts computed at the same time by the `cache-warmup` task, and
+# maximum number of charts computed per minute on a database, by database name
+# (e.g. {"examples": 30}), or on databases that aren't listed
+CACHE_WARMUP_MAX_WORKERS = 4
+CACHE_WARMUP_RATE_LIMITS: Dict[str, int] = {}
+CACHE_WARMUP_DEFAULT_RATE_LIMIT = None
+# Maximum number of charts of a `explore_json_batch` request computed at the
+# same time
+EXPLORE_JSON_BATCH_MAX_WORKERS = 4
+# Maximum number of the extra queries of a chart (time comparisons, filter box
+# columns) run at the same time
+EXTRA_QUERIES_MAX_WORKERS = 4
+
 # CORS Options
 ENABLE_CORS = False
 CORS_OPTIONS: Dict[Any, Any] = {}
@@ -291,6 +375,10 @@ ALLOWED_EXTENSIONS = {"csv", "tsv"}
 # note: index option should not be overridden
 CSV_EXPORT = {"encoding": "utf-8"}
 
+# Number of rows fetched from the database and encoded at once when streaming
+# query results as CSV (SQL Lab export and the `sql_csv_api` endpoint)
+CSV_STREAMING_BLOCK_SIZE = 10000
+
 # ---------------------------------------------------
 # Time grain configurations
 # ---------------------------------------------------
@@ -347,6 +435,15 @@ ADDITIONAL_MIDDLEWARE: List[Callable] = []
 # Default configurator will consume the LOG_* settings below
 LOGGING_CONFIGURATOR = DefaultLoggingConfigurator()
 
+# Write the event log (`logs` table and App Insights) from a background thread,
+# in batches of up to EVENT_LOGGER_BATCH_SIZE events or every
+# EVENT_LOGGER_FLUSH_INTERVAL seconds, instead of within each request. Events
+# are dropped, and counted in the STATS_LOGGER, when the queue is full.
+EVENT_LOGGER_ASYNC = True
+EVENT_LOGGER_QUEUE_SIZE = 10000
+EVENT_LOGGER_BATCH_SIZE = 500
+EVENT_LOGGER_FLUSH_INTERVAL = 5  # seconds
+
 # Console Log Settings
 
 LOG_FORMAT = "%(asctime)s:%(levelname)s:%(name)s:%(message)s"
@@ -379,6 +476,10 @@ BACKUP_COUNT = 30
 
 # Set this API key to enable Mapbox visualizations
 MAPBOX_API_KEY = os.environ.get("MAPBOX_API_KEY", "")
+# Deepest zoom level Mapbox charts clustering their points on the server send
+# clusters for, the charts showing the clusters of that level when zoomed in
+# further
+MAPBOX_CLUSTERING_MAX_ZOOM = 12
 
 # Maximum number of rows returned from a database
 # in async mode, no more than SQL_MAX_ROW will be returned and stored
@@ -583,6 +684,21 @@ DASHBOARD_TEMPLATE_ID = None
 # as such `create_engine(url, **params)`
 DB_CONNECTION_MUTATOR = None
 
+# By default every query opens and closes its own database connection. When
+# enabled, engines are kept in a registry keyed by database, effective URL,
+# impersonated user and schema, each with a bounded connection pool checked
+# with a ping before use. Engines unused for ENGINE_POOL_IDLE_TIMEOUT seconds
+# are disposed of, as are the least recently used ones past
+# ENGINE_POOL_MAX_ENGINES. Pool parameters in a database's `engine_params`
+# extra take precedence over these.
+ENGINE_POOL_ENABLED = False
+ENGINE_POOL_SIZE = 5
+ENGINE_POOL_MAX_OVERFLOW = 5
+ENGINE_POOL_TIMEOUT = 30
+ENGINE_POOL_RECYCLE = 3600
+ENGINE_POOL_IDLE_TIMEOUT = 600
+ENGINE_POOL_MAX_ENGINES = 100
+
 # A function that intercepts the SQL to be executed and can alter it.
 # The use case is can be around adding some sort of comment header
 # with information such as the username and worker node information
@@ -59,6 +59,7 @@ class BaseDatasource(AuditMixinNullable, ImportMixin):
     filter_select_enabled = Column(Boolean, default=False)
     offset = Column(Integer, default=0)
     cache_timeout = Column(Integer)
+    cache_max_staleness = Column(Integer)
     params = Column(String(1000))
     perm = Column(String(1000))
 
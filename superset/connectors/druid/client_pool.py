@@ -0,0 +1,152 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+# pylint: disable=C,R,W
+"""Pools of reusable pydruid clients sharing keep-alive HTTP connections
+
+``PyDruid`` opens a new HTTP connection for every query through ``urllib``.
+Pooled clients post their queries through a ``requests`` session shared by
+all the clients of a broker, so that connections to the broker are kept alive
+and reused. A client holds the results of its last query, hence clients are
+checked out of the pool for the duration of a query and never shared by
+concurrent queries.
+"""
+import json
+import os
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Hashable, Iterator, Optional
+
+import requests
+from pydruid.client import HTML_ERROR, PyDruid
+
+
+class KeepAlivePyDruid(PyDruid):
+    """PyDruid client posting queries through a shared ``requests`` session"""
+
+    def __init__(self, url, endpoint, session: requests.Session) -> None:
+        super().__init__(url, endpoint)
+        self.session = session
+
+    def _post(self, query):
+        headers, querystr, url = self._prepare_url_headers_and_body(query)
+        res = self.session.post(url, data=querystr, headers=headers)
+        if res.status_code >= 400:
+            err = res.text
+            if res.status_code == 500:
+                # has Druid returned an error?
+                try:
+                    err = json.loads(err)
+                except ValueError:
+                    if HTML_ERROR.search(err):
+                        err = HTML_ERROR.search(err).group(1)
+            raise IOError(
+                "HTTP Error {0}: {1} \n Druid Error: {2} \n Query is: {3}".format(
+                    res.status_code,
+                    res.reason,
+                    err,
+                    json.dumps(
+                        query.query_dict,
+                        indent=4,
+                        sort_keys=True,
+                        separators=(",", ": "),
+                    ),
+                )
+            )
+        query.parse(res.content.decode("utf-8"))
+        return query
+
+
+class DruidClientPool(object):
+    """Idle pydruid clients of a broker, and their shared HTTP session
+
+    At most ``max_idle`` clients are kept idle, and at most ``max_idle``
+    connections to the broker are kept alive.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        endpoint: str,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        max_idle: int = 10,
+    ) -> None:
+        self.url = url
+        self.endpoint = endpoint
+        self.username = username
+        self.password = password
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=1, pool_maxsize=max_idle
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._idle: queue.LifoQueue = queue.LifoQueue(max_idle)
+
+    def create_client(self) -> KeepAlivePyDruid:
+        cli = KeepAlivePyDruid(self.url, self.endpoint, self.session)
+        if self.username and self.password:
+            cli.set_basic_auth_credentials(self.username, self.password)
+        return cli
+
+    @contextmanager
+    def client(self) -> Iterator[KeepAlivePyDruid]:
+        """Checks a client out of the pool for the duration of the block"""
+        try:
+            cli = self._idle.get_nowait()
+        except queue.Empty:
+            cli = self.create_client()
+        try:
+            yield cli
+        finally:
+            # don't keep the results of the last query alive while idle
+            cli.query_builder.last_query = None
+            try:
+                self._idle.put_nowait(cli)
+            except queue.Full:
+                pass
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_pools: Dict[Hashable, DruidClientPool] = {}
+_lock = threading.Lock()
+_pid = os.getpid()
+
+
+def get_client_pool(
+    key: Hashable, create: Callable[[], DruidClientPool]
+) -> DruidClientPool:
+    """Returns the pool registered under ``key``, creating it if needed"""
+    global _pid, _pools
+    with _lock:
+        if _pid != os.getpid():
+            # sockets inherited from the parent process can't be shared
+            _pools = {}
+            _pid = os.getpid()
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = create()
+        return pool
+
+
+def close_client_pools() -> None:
+    with _lock:
+        while _pools:
+            _pools.popitem()[1].close()
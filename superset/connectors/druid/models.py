@@ -16,17 +16,21 @@
 # under the License.
 # pylint: disable=C,R,W
 # pylint: disable=invalid-unary-operand-type
+import hashlib
 import json
 import logging
 import re
 from collections import OrderedDict
+from contextlib import contextmanager
 from copy import deepcopy
 from datetime import datetime, timedelta
 from distutils.version import LooseVersion
-from multiprocessing.pool import ThreadPool
-from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+from functools import partial
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
 
+import numpy as np
 import pandas as pd
+import pytz
 import sqlalchemy as sa
 from dateutil.parser import parse as dparse
 from flask import escape, Markup
@@ -74,6 +78,8 @@ try:
         Quantiles,
     )
     import requests
+
+    from superset.connectors.druid.client_pool import DruidClientPool, get_client_pool
 except ImportError:
     pass
 
@@ -83,6 +89,7 @@ except ImportError:
     pass
 
 DRUID_TZ = conf.get("DRUID_TZ")
+druid_versions = utils.LRUCache(ttl=conf.get("DRUID_VERSION_CACHE_TTL"))
 POST_AGG_TYPE = "postagg"
 metadata = Model.metadata  # pylint: disable=no-member
 
@@ -131,6 +138,7 @@ class DruidCluster(Model, AuditMixinNullable, ImportMixin):
     broker_endpoint = Column(String(255), default="druid/v2")
     metadata_last_refreshed = Column(DateTime)
     cache_timeout = Column(Integer)
+    cache_max_staleness = Column(Integer)
     broker_user = Column(String(255))
     broker_pass = Column(EncryptedType(String(255), conf.get("SECRET_KEY")))
 
@@ -140,6 +148,7 @@ class DruidCluster(Model, AuditMixinNullable, ImportMixin):
         "broker_port",
         "broker_endpoint",
         "cache_timeout",
+        "cache_max_staleness",
         "broker_user",
     ]
     update_from_object_fields = export_fields
@@ -175,6 +184,33 @@ class DruidCluster(Model, AuditMixinNullable, ImportMixin):
             cli.set_basic_auth_credentials(self.broker_user, self.broker_pass)
         return cli
 
+    @contextmanager
+    def pydruid_client(self) -> Iterator["PyDruid"]:
+        """Provides a client for the duration of the block
+
+        When ``DRUID_CLIENT_POOL_ENABLED`` is set the client is checked out of
+        a pool shared by all the queries to the same broker, reusing its
+        keep-alive connections, otherwise a new client is created.
+        """
+        if not conf.get("DRUID_CLIENT_POOL_ENABLED"):
+            yield self.get_pydruid_client()
+            return
+
+        url = self.get_base_url(self.broker_host, self.broker_port)
+        key = (url, self.broker_endpoint, self.broker_user, self.broker_pass)
+        pool = get_client_pool(
+            key,
+            lambda: DruidClientPool(
+                url,
+                self.broker_endpoint,
+                self.broker_user,
+                self.broker_pass,
+                max_idle=conf.get("DRUID_CLIENT_POOL_SIZE"),
+            ),
+        )
+        with pool.client() as cli:
+            yield cli
+
     def get_datasources(self) -> List[str]:
         endpoint = self.get_base_broker_url() + "/datasources"
         auth = requests.auth.HTTPBasicAuth(self.broker_user, self.broker_pass)
@@ -185,16 +221,22 @@ class DruidCluster(Model, AuditMixinNullable, ImportMixin):
         auth = requests.auth.HTTPBasicAuth(self.broker_user, self.broker_pass)
         return json.loads(requests.get(endpoint, auth=auth).text)["version"]
 
-    @property  # type: ignore
-    @utils.memoized
+    @property
     def druid_version(self) -> str:
-        return self.get_druid_version()
+        """The version of the cluster, cached for ``DRUID_VERSION_CACHE_TTL``"""
+        key = self.get_base_url(self.broker_host, self.broker_port)
+        version = druid_versions.get(key)
+        if version is None:
+            version = self.get_druid_version()
+            druid_versions.set(key, version)
+        return version
 
     def refresh_datasources(
         self,
         datasource_name: Optional[str] = None,
         merge_flag: bool = True,
         refresh_all: bool = True,
+        incremental: bool = False,
     ) -> None:
         """Refresh metadata of all datasources in the cluster
         If ``datasource_name`` is specified, only that datasource is updated
@@ -208,14 +250,27 @@ class DruidCluster(Model, AuditMixinNullable, ImportMixin):
             ds_refresh.append(datasource_name)
         else:
             return
-        self.refresh(ds_refresh, merge_flag, refresh_all)
+        self.refresh(ds_refresh, merge_flag, refresh_all, incremental)
 
     def refresh(
-        self, datasource_names: List[str], merge_flag: bool, refresh_all: bool
+        self,
+        datasource_names: List[str],
+        merge_flag: bool,
+        refresh_all: bool,
+        incremental: bool = False,
     ) -> None:
         """
         Fetches metadata for the specified datasources and
         merges to the Superset database
+
+        Segment metadata is fetched on up to ``DRUID_REFRESH_MAX_WORKERS``
+        threads before anything is written. Columns and metrics are then
+        merged ``DRUID_REFRESH_BATCH_SIZE`` datasources at a time, each batch
+        being committed on its own. If ``incremental`` is set, datasources
+        whose segment metadata hasn't changed since their last refresh are
+        left untouched. The segment metadata hash of a datasource is only
+        updated along with its columns and metrics, so that datasources whose
+        batch failed are refreshed again.
         """
         session = db.session
         ds_list = (
@@ -239,43 +294,100 @@ class DruidCluster(Model, AuditMixinNullable, ImportMixin):
                 continue
             datasource.cluster = self
             datasource.merge_flag = merge_flag
-        session.flush()
 
-        # Prepare multithreaded executation
-        pool = ThreadPool()
         ds_refresh = list(ds_map.values())
-        metadata = pool.map(_fetch_metadata_for, ds_refresh)
-        pool.close()
-        pool.join()
-
-        for i in range(0, len(ds_refresh)):
-            datasource = ds_refresh[i]
-            cols = metadata[i]
-            if cols:
-                col_objs_list = (
-                    session.query(DruidColumn)
-                    .filter(DruidColumn.datasource_id == datasource.id)
-                    .filter(DruidColumn.column_name.in_(cols.keys()))
+        metadata = utils.run_concurrently(
+            [partial(_fetch_metadata_for, datasource) for datasource in ds_refresh],
+            conf.get("DRUID_REFRESH_MAX_WORKERS"),
+        )
+        updated = []
+        for datasource, cols in zip(ds_refresh, metadata):
+            if not cols:
+                continue
+            metadata_hash = hashlib.sha1(
+                json.dumps(cols, sort_keys=True, default=str).encode("utf-8")
+            ).hexdigest()
+            if incremental and datasource.segment_metadata_hash == metadata_hash:
+                logging.info(
+                    "Segment metadata of [{}] is unchanged".format(datasource.name)
                 )
-                col_objs = {col.column_name: col for col in col_objs_list}
-                for col in cols:
-                    if col == "__time":  # skip the time column
-                        continue
-                    col_obj = col_objs.get(col)
-                    if not col_obj:
-                        col_obj = DruidColumn(
-                            datasource_id=datasource.id, column_name=col
-                        )
-                        with session.no_autoflush:
-                            session.add(col_obj)
-                    col_obj.type = cols[col]["type"]
-                    col_obj.datasource = datasource
-                    if col_obj.type == "STRING":
-                        col_obj.groupby = True
-                        col_obj.filterable = True
-                datasource.refresh_metrics()
+                continue
+            updated.append((datasource, cols, metadata_hash))
+        session.flush()
+        # committing expires the datasources, only keep their ids
+        updated_ids = [
+            (datasource.id, cols, metadata_hash)
+            for datasource, cols, metadata_hash in updated
+        ]
         session.commit()
 
+        batch_size = conf.get("DRUID_REFRESH_BATCH_SIZE")
+        for i in range(0, len(updated_ids), batch_size):
+            batch = updated_ids[i : i + batch_size]
+            try:
+                self.merge_metadata([(ds_id, cols) for ds_id, cols, _hash in batch])
+                for ds_id, _cols, metadata_hash in batch:
+                    session.query(DruidDatasource).filter_by(id=ds_id).update(
+                        {"segment_metadata_hash": metadata_hash},
+                        synchronize_session=False,
+                    )
+                session.commit()
+            except Exception:
+                session.rollback()
+                raise
+
+    @staticmethod
+    def merge_metadata(metadata: List[Tuple[int, Dict]]) -> None:
+        """Upserts the columns and metrics of datasources from their metadata
+
+        ``metadata`` lists (datasource id, segment metadata columns) tuples.
+        The existing columns and metrics of all the datasources are fetched
+        with a query each, and new ones are inserted in bulk.
+        """
+        session = db.session
+        ds_ids = [ds_id for ds_id, _ in metadata]
+        columns: Dict[int, Dict[str, DruidColumn]] = {ds_id: {} for ds_id in ds_ids}
+        for col_obj in session.query(DruidColumn).filter(
+            DruidColumn.datasource_id.in_(ds_ids)
+        ):
+            columns[col_obj.datasource_id][col_obj.column_name] = col_obj
+
+        new_objs: List[Union[DruidColumn, DruidMetric]] = []
+        for ds_id, cols in metadata:
+            for col, col_metadata in cols.items():
+                if col == "__time":  # skip the time column
+                    continue
+                col_obj = columns[ds_id].get(col)
+                if not col_obj:
+                    # new columns are groupable and filterable by default
+                    col_obj = DruidColumn(datasource_id=ds_id, column_name=col)
+                    columns[ds_id][col] = col_obj
+                    new_objs.append(col_obj)
+                elif col_metadata["type"] == "STRING":
+                    col_obj.groupby = True
+                    col_obj.filterable = True
+                col_obj.type = col_metadata["type"]
+
+        # Refresh metrics based on the column metadata
+        metric_objs = {
+            (metric.datasource_id, metric.metric_name): metric
+            for metric in session.query(DruidMetric).filter(
+                DruidMetric.datasource_id.in_(ds_ids)
+            )
+        }
+        for ds_id in ds_ids:
+            for col_obj in columns[ds_id].values():
+                for metric in col_obj.get_metrics().values():
+                    dbmetric = metric_objs.get((ds_id, metric.metric_name))
+                    if dbmetric:
+                        for attr in ["json", "metric_type"]:
+                            setattr(dbmetric, attr, getattr(metric, attr))
+                    else:
+                        metric.datasource_id = ds_id
+                        metric_objs[(ds_id, metric.metric_name)] = metric
+                        new_objs.append(metric)
+        session.bulk_save_objects(new_objs)
+
     @property
     def perm(self) -> str:
         return "[{obj.cluster_name}].(id:{obj.id})".format(obj=self)
@@ -478,6 +590,7 @@ class DruidDatasource(Model, BaseDatasource):
     is_hidden = Column(Boolean, default=False)
     filter_select_enabled = Column(Boolean, default=True)  # override default
     fetch_values_from = Column(String(100))
+    segment_metadata_hash = Column(String(40))
     cluster_name = Column(
         String(250), ForeignKey("clusters.cluster_name"), nullable=False
     )
@@ -496,6 +609,7 @@ class DruidDatasource(Model, BaseDatasource):
         "cluster_name",
         "offset",
         "cache_timeout",
+        "cache_max_staleness",
         "params",
         "filter_select_enabled",
     ]
@@ -975,9 +1089,9 @@ class DruidDatasource(Model, BaseDatasource):
             threshold=limit,
         )
 
-        client = self.cluster.get_pydruid_client()
-        client.topn(**qry)
-        df = client.export_pandas()
+        with self.cluster.pydruid_client() as client:
+            client.topn(**qry)
+            df = client.export_pandas()
         return df[column_name].to_list()
 
     def get_query_str(self, query_obj, phase=1, client=None):
@@ -1169,9 +1283,9 @@ class DruidDatasource(Model, BaseDatasource):
         metrics_dict = {m.metric_name: m for m in self.metrics}
         columns_dict = {c.column_name: c for c in self.columns}
 
-        if self.cluster and LooseVersion(
-            self.cluster.get_druid_version()
-        ) < LooseVersion("0.11.0"):
+        if self.cluster and LooseVersion(self.cluster.druid_version) < LooseVersion(
+            "0.11.0"
+        ):
             for metric in metrics:
                 self.sanitize_metric_object(metric)
             self.sanitize_metric_object(timeseries_limit_metric)
@@ -1361,16 +1475,51 @@ class DruidDatasource(Model, BaseDatasource):
         to having mixed types in the dataframe
 
         Here we replace None with <NULL> and make the whole series a
-        str instead of an object.
+        str instead of an object. Values are converted once per distinct
+        value rather than once per row.
         """
-        df[groupby_cols] = df[groupby_cols].fillna("<NULL>").astype("unicode")
+        for col in groupby_cols:
+            codes, uniques = pd.factorize(df[col])
+            # missing values have a code of -1, picking the trailing <NULL>
+            labels = np.array([str(v) for v in uniques] + ["<NULL>"], dtype=object)
+            df[col] = labels[codes]
         return df
 
+    @staticmethod
+    def increment_timestamps(timestamps: pd.Series, offset: int) -> pd.Series:
+        """Offsets Druid timestamps by ``offset`` milliseconds
+
+        The wall time of each timestamp is kept and set in ``DRUID_TZ``. ISO
+        formatted timestamps are parsed in a single vectorized pass, others
+        one by one with `utils.parse_human_datetime`.
+        """
+
+        def increment_timestamp(ts):
+            dt = utils.parse_human_datetime(ts).replace(tzinfo=DRUID_TZ)
+            return dt + timedelta(milliseconds=offset)
+
+        if timestamps.dtype == object:
+            try:
+                dttm = pd.to_datetime(timestamps)
+                if dttm.dt.tz is not None:
+                    dttm = dttm.dt.tz_localize(None)
+                dttm = dttm + pd.Timedelta(milliseconds=offset)
+                return dttm.dt.tz_localize(DRUID_TZ)
+            except (
+                AttributeError,
+                TypeError,
+                ValueError,
+                pytz.exceptions.InvalidTimeError,
+            ):
+                # mixed offsets, times repeated or skipped by DST changes, ...
+                pass
+        return timestamps.apply(increment_timestamp)
+
     def query(self, query_obj: Dict) -> QueryResult:
         qry_start_dttm = datetime.now()
-        client = self.cluster.get_pydruid_client()
-        query_str = self.get_query_str(client=client, query_obj=query_obj, phase=2)
-        df = client.export_pandas()
+        with self.cluster.pydruid_client() as client:
+            query_str = self.get_query_str(client=client, query_obj=query_obj, phase=2)
+            df = client.export_pandas()
 
         if df is None or df.size == 0:
             return QueryResult(
@@ -1403,13 +1552,8 @@ class DruidDatasource(Model, BaseDatasource):
         df = df[cols]
 
         time_offset = DruidDatasource.time_offset(query_obj["granularity"])
-
-        def increment_timestamp(ts):
-            dt = utils.parse_human_datetime(ts).replace(tzinfo=DRUID_TZ)
-            return dt + timedelta(milliseconds=time_offset)
-
         if DTTM_ALIAS in df.columns and time_offset:
-            df[DTTM_ALIAS] = df[DTTM_ALIAS].apply(increment_timestamp)
+            df[DTTM_ALIAS] = self.increment_timestamps(df[DTTM_ALIAS], time_offset)
 
         return QueryResult(
             df=df, query=query_str, duration=datetime.now() - qry_start_dttm
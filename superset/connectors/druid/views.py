@@ -205,6 +205,7 @@ class DruidClusterModelView(SupersetModelView, DeleteMixin, YamlExportMixin):
         "broker_pass",
         "broker_endpoint",
         "cache_timeout",
+        "cache_max_staleness",
         "cluster_name",
     ]
     edit_columns = add_columns
@@ -219,6 +220,7 @@ class DruidClusterModelView(SupersetModelView, DeleteMixin, YamlExportMixin):
         "broker_endpoint": _("Broker Endpoint"),
         "verbose_name": _("Verbose Name"),
         "cache_timeout": _("Cache Timeout"),
+        "cache_max_staleness": _("Cache Max Staleness"),
         "metadata_last_refreshed": _("Metadata Last Refreshed"),
     }
     description_columns = {
@@ -227,6 +229,12 @@ class DruidClusterModelView(SupersetModelView, DeleteMixin, YamlExportMixin):
             "A timeout of 0 indicates that the cache never expires. "
             "Note this defaults to the global timeout if undefined."
         ),
+        "cache_max_staleness": _(
+            "Duration (in seconds) during which the cached data of charts of "
+            "this cluster is still served after its caching timeout, while it's "
+            "refreshed in the background. "
+            "Note this defaults to the global duration if undefined."
+        ),
         "broker_user": _(
             "Druid supports basic authentication. See "
             "[auth](http://druid.io/docs/latest/design/auth.html) and "
@@ -292,6 +300,7 @@ class DruidDatasourceModelView(DatasourceModelView, DeleteMixin, YamlExportMixin
         "default_endpoint",
         "offset",
         "cache_timeout",
+        "cache_max_staleness",
     ]
     search_columns = ("datasource_name", "cluster", "description", "owners")
     add_columns = edit_columns
@@ -335,6 +344,12 @@ class DruidDatasourceModelView(DatasourceModelView, DeleteMixin, YamlExportMixin
             "A timeout of 0 indicates that the cache never expires. "
             "Note this defaults to the cluster timeout if undefined."
         ),
+        "cache_max_staleness": _(
+            "Duration (in seconds) during which the cached data of charts of "
+            "this datasource is still served after its caching timeout, while "
+            "it's refreshed in the background. "
+            "Note this defaults to the cluster duration if undefined."
+        ),
     }
     base_filters = [["id", DatasourceFilter, lambda: []]]
     label_columns = {
@@ -348,6 +363,7 @@ class DruidDatasourceModelView(DatasourceModelView, DeleteMixin, YamlExportMixin
         "default_endpoint": _("Default Endpoint"),
         "offset": _("Time Offset"),
         "cache_timeout": _("Cache Timeout"),
+        "cache_max_staleness": _("Cache Max Staleness"),
         "datasource_name": _("Datasource Name"),
         "fetch_values_from": _("Fetch Values From"),
         "changed_by_": _("Changed By"),
@@ -333,6 +333,7 @@ class SqlaTable(Model, BaseDatasource):
         "database_id",
         "offset",
         "cache_timeout",
+        "cache_max_staleness",
         "schema",
         "sql",
         "params",
@@ -248,6 +248,7 @@ class TableModelView(DatasourceModelView, DeleteMixin, YamlExportMixin):
         "default_endpoint",
         "offset",
         "cache_timeout",
+        "cache_max_staleness",
         "is_sqllab_view",
         "template_params",
     ]
@@ -306,6 +307,12 @@ class TableModelView(DatasourceModelView, DeleteMixin, YamlExportMixin):
             "A timeout of 0 indicates that the cache never expires. "
             "Note this defaults to the database timeout if undefined."
         ),
+        "cache_max_staleness": _(
+            "Duration (in seconds) during which the cached data of charts of "
+            "this table is still served after its caching timeout, while it's "
+            "refreshed in the background. "
+            "Note this defaults to the database duration if undefined."
+        ),
     }
     label_columns = {
         "slices": _("Associated Charts"),
@@ -319,6 +326,7 @@ class TableModelView(DatasourceModelView, DeleteMixin, YamlExportMixin):
         "default_endpoint": _("Default Endpoint"),
         "offset": _("Offset"),
         "cache_timeout": _("Cache Timeout"),
+        "cache_max_staleness": _("Cache Max Staleness"),
         "table_name": _("Table Name"),
         "fetch_values_predicate": _("Fetch Values Predicate"),
         "owners": _("Owners"),
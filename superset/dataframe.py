@@ -27,13 +27,17 @@ from datetime import date, datetime
 
 import numpy as np
 import pandas as pd
-from pandas.core.common import maybe_box_datetimelike
+from pandas.api.types import infer_dtype
+from pandas.arrays import IntegerArray
 from pandas.core.dtypes.dtypes import ExtensionDtype
 
+from superset.exceptions import QueryResultTooLargeException
 from superset.utils.core import JS_MAX_INTEGER
 
 INFER_COL_TYPES_THRESHOLD = 95
 INFER_COL_TYPES_SAMPLE_SIZE = 100
+# number of rows of a query result transposed into columns at once
+TRANSPOSE_CHUNK_SIZE = 10000
 
 
 def dedup(l, suffix="__", case_sensitive=True):
@@ -68,6 +72,126 @@ def is_numeric(dtype):
     return np.issubdtype(dtype, np.number)
 
 
+def df_from_cursor(cursor, columns, chunk_size=10000, max_bytes=None):
+    """Builds a DataFrame from the rows of an executed cursor, chunk by chunk
+
+    Rows are fetched `chunk_size` at a time and each chunk is converted to a
+    typed DataFrame before fetching the next one, so that only one chunk of
+    Python tuples is alive at a time. The conversion matches
+    ``pd.DataFrame.from_records(cursor.fetchall(), coerce_float=True)``.
+
+    When `max_bytes` is set, a `QueryResultTooLargeException` is raised as
+    soon as the chunks fetched so far use more memory than that.
+    """
+    chunks = []
+    size = 0
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        chunk = pd.DataFrame.from_records(
+            list(rows), columns=columns, coerce_float=True
+        )
+        if max_bytes:
+            size += chunk.memory_usage(index=False, deep=True).sum()
+            if size > max_bytes:
+                raise QueryResultTooLargeException(
+                    "The query result exceeds the {:.0f} MB memory limit, "
+                    "please add filters or lower the row limit".format(
+                        max_bytes / 1024 ** 2
+                    )
+                )
+        chunks.append(chunk)
+
+    if not chunks:
+        return pd.DataFrame.from_records([], columns=columns, coerce_float=True)
+    if len(chunks) == 1:
+        return chunks[0]
+
+    dtypes = {tuple(chunk.dtypes) for chunk in chunks}
+    if len(dtypes) == 1:
+        return pd.concat(chunks, ignore_index=True, copy=False)
+
+    # a column may be typed differently from one chunk to another, e.g. with
+    # integers in one and only nulls in the next: such columns are inferred
+    # again from all of their values, as if they were fetched in one chunk
+    series = []
+    for i in range(len(chunks[0].columns)):
+        parts = [chunk.iloc[:, i] for chunk in chunks]
+        if len({part.dtype for part in parts}) == 1:
+            series.append(pd.concat(parts, ignore_index=True, copy=False))
+        else:
+            values = np.concatenate([part.to_numpy(dtype="object") for part in parts])
+            series.append(
+                pd.DataFrame.from_records(
+                    [(value,) for value in values], coerce_float=True
+                ).iloc[:, 0]
+            )
+    df = pd.concat(series, axis=1, ignore_index=True)
+    df.columns = chunks[0].columns
+    return df
+
+
+def _integer_array(values):
+    mask = pd.isna(values)
+    if mask.any():
+        values = values.copy()
+        values[mask] = 0
+    return IntegerArray(values.astype(np.int64), mask)
+
+
+def build_column(values, dtype):
+    """Builds a Series of the given pandas dtype from a 1D object array
+
+    Float, nullable integer and datetime columns are written straight into
+    typed numpy buffers, other columns go through the regular pandas
+    conversion.
+    """
+    try:
+        if dtype == "float64":
+            return pd.Series(values.astype(np.float64))
+        if dtype == "Int64" and infer_dtype(values, skipna=True) in (
+            "integer",
+            "empty",
+        ):
+            return pd.Series(_integer_array(values))
+        if dtype == "datetime64[ns]":
+            series = pd.Series(pd.to_datetime(values))
+            if series.dtype == dtype:
+                return series
+    except (OverflowError, TypeError, ValueError):
+        pass
+    return pd.Series(values, dtype=dtype)
+
+
+def _to_object_array(data, width):
+    """Puts rows in a 2D object array, keeping sequences as single values"""
+    if not len(data):
+        return np.empty((0, width), dtype="object")
+    try:
+        array = np.array(data, dtype="object")
+        if array.ndim == 2:
+            return array
+    except ValueError:
+        pass
+    # some values are sequences numpy tried to unpack
+    return pd.DataFrame(list(data), dtype="object").values.reshape(-1, width)
+
+
+def transpose(data, width, chunk_size=TRANSPOSE_CHUNK_SIZE):
+    """Transposes rows into one 1D object array per column
+
+    Rows are put in a 2D object array `chunk_size` at a time, so that only one
+    chunk of rows is held twice while the columns are filled.
+    """
+    columns = [np.empty(len(data), dtype="object") for _ in range(width)]
+    for start in range(0, len(data), chunk_size):
+        array = _to_object_array(data[start : start + chunk_size], width)
+        for i, values in enumerate(columns):
+            values[start : start + len(array)] = array[:, i]
+    return columns
+
+
 class SupersetDataFrame(object):
     # Mapping numpy dtype.char to generic database types
     type_map = {
@@ -105,21 +229,21 @@ class SupersetDataFrame(object):
 
         self.column_names = column_names
 
-        if dtype:
-            # put data in a 2D array so we can efficiently access each column;
-            # the reshape ensures the shape is 2D in case data is empty
-            array = np.array(data, dtype="object").reshape(-1, len(column_names))
-            # convert each column in data into a Series of the proper dtype; we
-            # need to do this because we can not specify a mixed dtype when
-            # instantiating the DataFrame, and this allows us to have different
-            # dtypes for each column.
-            data = {
-                column: pd.Series(array[:, i], dtype=dtype[column])
-                for i, column in enumerate(column_names)
-            }
-            self.df = pd.DataFrame(data, columns=column_names)
-        else:
-            self.df = pd.DataFrame(list(data), columns=column_names).infer_objects()
+        # convert the columns one by one, releasing the values of each column
+        # as soon as it is converted; a dtype is specified for each column when
+        # the engine provides one, since a mixed dtype can not be given when
+        # instantiating the DataFrame
+        values = transpose(data, len(column_names))
+        columns = {}
+        for i, column in enumerate(column_names):
+            column_values, values[i] = values[i], None
+            if dtype:
+                columns[column] = build_column(column_values, dtype[column])
+            else:
+                columns[column] = pd.Series(column_values).infer_objects()
+        # the column names are not passed again, pandas would then box every
+        # single value to align the columns
+        self.df = pd.DataFrame(columns)
 
         self._type_dict = {}
         try:
@@ -146,22 +270,45 @@ class SupersetDataFrame(object):
 
     @classmethod
     def format_data(cls, df):
-        # work around for https://github.com/pandas-dev/pandas/issues/18372
-        data = [
-            dict(
-                (k, maybe_box_datetimelike(v))
-                for k, v in zip(df.columns, np.atleast_1d(row))
-            )
-            for row in df.values
-        ]
-        for d in data:
-            for k, v in list(d.items()):
-                # if an int is too big for Java Script to handle
-                # convert it to a string
-                if isinstance(v, int):
-                    if abs(v) > JS_MAX_INTEGER:
-                        d[k] = str(v)
-        return data
+        """Returns the rows of a DataFrame as a list of JSON friendly dicts"""
+        columns = cls.format_columns(df)
+        # zipping over an Index is much slower than over a list
+        names = df.columns.tolist()
+        return [dict(zip(names, row)) for row in zip(*columns)]
+
+    @classmethod
+    def format_columns(cls, df):
+        """Returns the columns of a DataFrame as lists of JSON friendly values
+
+        Datetimes are boxed as `Timestamp` and integers too big for JavaScript
+        to handle are converted to strings.
+        """
+        return [cls._format_column(df.iloc[:, i]) for i in range(len(df.columns))]
+
+    @staticmethod
+    def _format_column(series):
+        # `tolist` boxes datetimes as `Timestamp` and numbers as Python scalars
+        values = series.tolist()
+        if series.dtype.kind in ("i", "u"):
+            array = series.values
+            if isinstance(array, np.ndarray):
+                too_big = (array > JS_MAX_INTEGER) | (array < -JS_MAX_INTEGER)
+            else:
+                # nullable integers, missing values are never too big
+                too_big = series.abs().gt(JS_MAX_INTEGER).fillna(False)
+                too_big = too_big.to_numpy(dtype=bool)
+        elif series.dtype == np.object_ and infer_dtype(series, skipna=True) in (
+            "integer",
+            "mixed-integer",
+            "mixed-integer-float",
+            "mixed",
+        ):
+            too_big = [isinstance(v, int) and abs(v) > JS_MAX_INTEGER for v in values]
+        else:
+            return values
+        for i in np.flatnonzero(too_big):
+            values[i] = str(values[i])
+        return values
 
     @classmethod
     def db_type(cls, dtype):
@@ -18,11 +18,11 @@ import logging
 import re
 import textwrap
 import time
-from collections import defaultdict, deque
+from collections import deque
 from contextlib import closing
 from datetime import datetime
 from distutils.version import StrictVersion
-from typing import Any, cast, Dict, List, Optional, Tuple, TYPE_CHECKING
+from typing import Any, cast, Dict, List, Optional, Set, Tuple, TYPE_CHECKING
 from urllib import parse
 
 import simplejson as json
@@ -584,55 +584,42 @@ class PrestoEngineSpec(BaseEngineSpec):
         # expanding ROW types into new columns
         to_process = deque((column, 0) for column in columns)
         all_columns: List[dict] = []
+        all_column_names: Set[str] = set()
         expanded_columns = []
-        current_array_level = None
+        current_array_level = 0
+
+        # When unnesting arrays we need to keep track of the extra rows added for
+        # each original row. This is necessary when we expand multiple arrays, so
+        # that the arrays after the first reuse the rows added by the first. Rows
+        # are grouped in blocks made of an original row followed by its extra
+        # rows, which are appended to the block rather than inserted in the data
+        # set. Every time we change a level in the nested arrays each row becomes
+        # a block of its own again.
+        blocks = [[row] for row in data]
         while to_process:
             column, level = to_process.popleft()
-            if column["name"] not in [column["name"] for column in all_columns]:
+            name = column["name"]
+            if name not in all_column_names:
                 all_columns.append(column)
+                all_column_names.add(name)
 
-            # When unnesting arrays we need to keep track of how many extra rows
-            # were added, for each original row. This is necessary when we expand
-            # multiple arrays, so that the arrays after the first reuse the rows
-            # added by the first. every time we change a level in the nested arrays
-            # we reinitialize this.
             if level != current_array_level:
-                unnested_rows: Dict[int, int] = defaultdict(int)
+                blocks = [[row] for block in blocks for row in block]
                 current_array_level = level
 
-            name = column["name"]
-
             if column["type"].startswith("ARRAY("):
                 # keep processing array children; we append to the right so that
                 # multiple nested arrays are processed breadth-first
                 to_process.append((get_children(column)[0], level + 1))
 
                 # unnest array objects data into new rows
-                i = 0
-                while i < len(data):
-                    row = data[i]
-                    values = row.get(name)
+                for block in blocks:
+                    values = block[0].get(name)
                     if values:
-                        # how many extra rows we need to unnest the data?
-                        extra_rows = len(values) - 1
-
-                        # how many rows were already added for this row?
-                        current_unnested_rows = unnested_rows[i]
-
                         # add any necessary rows
-                        missing = extra_rows - current_unnested_rows
-                        for _ in range(missing):
-                            data.insert(i + current_unnested_rows + 1, {})
-                            unnested_rows[i] += 1
-
-                        # unnest array into rows
-                        for j, value in enumerate(values):
-                            data[i + j][name] = value
-
-                        # skip newly unnested rows
-                        i += unnested_rows[i]
-
-                    i += 1
+                        block.extend({} for _ in range(len(values) - len(block)))
+                        for row, value in zip(block, values):
+                            row[name] = value
 
             if column["type"].startswith("ROW("):
                 # expand columns; we append them to the left so they are added
@@ -642,12 +629,16 @@ class PrestoEngineSpec(BaseEngineSpec):
                 expanded_columns.extend(expanded)
 
                 # expand row objects into new columns
-                for row in data:
-                    for value, col in zip(row.get(name) or [], expanded):
-                        row[col["name"]] = value
+                for block in blocks:
+                    for row in block:
+                        for value, col in zip(row.get(name) or [], expanded):
+                            row[col["name"]] = value
 
+        names = [column["name"] for column in all_columns]
         data = [
-            {k["name"]: row.get(k["name"], "") for k in all_columns} for row in data
+            {name: row.get(name, "") for name in names}
+            for block in blocks
+            for row in block
         ]
 
         return all_columns, data, expanded_columns
@@ -54,3 +54,7 @@ class SpatialException(SupersetException):
 
 class DatabaseNotFound(SupersetException):
     status = 400
+
+
+class QueryResultTooLargeException(SupersetException):
+    status = 413
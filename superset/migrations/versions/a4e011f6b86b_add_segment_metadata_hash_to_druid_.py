@@ -0,0 +1,40 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+"""add segment_metadata_hash to druid datasources
+
+Revision ID: a4e011f6b86b
+Revises: 9847d62ead51
+Create Date: 2020-06-01 10:12:44.215263
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = "a4e011f6b86b"
+down_revision = "9847d62ead51"
+
+import sqlalchemy as sa
+from alembic import op
+
+
+def upgrade():
+    op.add_column(
+        "datasources", sa.Column("segment_metadata_hash", sa.String(40), nullable=True)
+    )
+
+
+def downgrade():
+    op.drop_column("datasources", "segment_metadata_hash")
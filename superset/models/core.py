@@ -26,7 +26,6 @@ from typing import List
 from urllib import parse
 
 import numpy
-import pandas as pd
 import sqlalchemy as sqla
 import sqlparse
 from flask import escape, g, Markup, request
@@ -55,17 +54,24 @@ from sqlalchemy_utils import EncryptedType
 
 from superset import app, db, db_engine_specs, is_feature_enabled, security_manager
 from superset.connectors.connector_registry import ConnectorRegistry
+from superset.dataframe import df_from_cursor
 from superset.legacy import update_time_range
 from superset.models.helpers import AuditMixinNullable, ImportMixin
 from superset.models.tags import ChartUpdater, DashboardUpdater, FavStarUpdater
 from superset.models.user_attributes import UserAttribute
 from superset.utils import cache as cache_util, core as utils
+from superset.utils.engine_pool import EnginePool, get_pool_params
 from superset.viz import viz_types
 
 config = app.config
 custom_password_store = config.get("SQLALCHEMY_CUSTOM_PASSWORD_STORE")
 stats_logger = config.get("STATS_LOGGER")
 log_query = config.get("QUERY_LOGGER")
+engine_pool = EnginePool(
+    max_engines=config.get("ENGINE_POOL_MAX_ENGINES"),
+    idle_timeout=config.get("ENGINE_POOL_IDLE_TIMEOUT"),
+    stats_logger=stats_logger,
+)
 metadata = Model.metadata  # pylint: disable=no-member
 
 PASSWORD_MASK = "X" * 10
@@ -727,6 +733,7 @@ class Database(Model, AuditMixinNullable, ImportMixin):
     sqlalchemy_uri = Column(String(1024))
     password = Column(EncryptedType(String(1024), config.get("SECRET_KEY")))
     cache_timeout = Column(Integer)
+    cache_max_staleness = Column(Integer)
     select_as_create_table_as = Column(Boolean, default=False)
     expose_in_sqllab = Column(Boolean, default=True)
     allow_run_async = Column(Boolean, default=False)
@@ -754,6 +761,7 @@ class Database(Model, AuditMixinNullable, ImportMixin):
         "database_name",
         "sqlalchemy_uri",
         "cache_timeout",
+        "cache_max_staleness",
         "expose_in_sqllab",
         "allow_run_async",
         "allow_ctas",
@@ -871,8 +879,37 @@ class Database(Model, AuditMixinNullable, ImportMixin):
                 effective_username = g.user.username
         return effective_username
 
-    @utils.memoized(watch=("impersonate_user", "sqlalchemy_uri_decrypted", "extra"))
     def get_sqla_engine(self, schema=None, nullpool=True, user_name=None, source=None):
+        """Returns an engine for the given schema and user
+
+        When ``ENGINE_POOL_ENABLED`` is set, engines come from a registry of
+        pooled engines shared across queries and ``nullpool`` is ignored.
+        """
+        if config.get("ENGINE_POOL_ENABLED"):
+            return self._get_pooled_sqla_engine(schema, user_name, source)
+        return self._get_sqla_engine(schema, nullpool, user_name, source)
+
+    @utils.memoized(watch=("impersonate_user", "sqlalchemy_uri_decrypted", "extra"))
+    def _get_sqla_engine(self, schema, nullpool, user_name, source):
+        url, params, _ = self._get_sqla_engine_args(schema, nullpool, user_name, source)
+        return create_engine(url, **params)
+
+    def _get_pooled_sqla_engine(self, schema, user_name, source):
+        url, params, effective_username = self._get_sqla_engine_args(
+            schema, False, user_name, source, pooled=True
+        )
+        # the URL and parameters reflect the current database settings, so
+        # engines built from stale settings are never handed out
+        key = (
+            self.id,
+            str(url),
+            effective_username,
+            schema,
+            repr(sorted(params.items(), key=lambda kv: kv[0])),
+        )
+        return engine_pool.get_engine(key, lambda: create_engine(url, **params))
+
+    def _get_sqla_engine_args(self, schema, nullpool, user_name, source, pooled=False):
         extra = self.get_extra()
         url = make_url(self.sqlalchemy_uri_decrypted)
         url = self.db_engine_spec.adjust_database_uri(url, schema)
@@ -890,6 +927,8 @@ class Database(Model, AuditMixinNullable, ImportMixin):
         params = extra.get("engine_params", {})
         if nullpool:
             params["poolclass"] = NullPool
+        elif pooled and "poolclass" not in params:
+            params = dict(get_pool_params(config), **params)
 
         # If using Hive, this will set hive.server2.proxy.user=$effective_username
         configuration = {}
@@ -908,7 +947,7 @@ class Database(Model, AuditMixinNullable, ImportMixin):
             url, params = DB_CONNECTION_MUTATOR(
                 url, params, effective_username, security_manager, source
             )
-        return create_engine(url, **params)
+        return url, params, effective_username
 
     def get_reserved_words(self):
         return self.get_dialect().preparer.reserved_words
@@ -955,8 +994,11 @@ class Database(Model, AuditMixinNullable, ImportMixin):
                 else:
                     columns = []
 
-                df = pd.DataFrame.from_records(
-                    data=list(cursor.fetchall()), columns=columns, coerce_float=True
+                df = df_from_cursor(
+                    cursor,
+                    columns,
+                    chunk_size=config.get("QUERY_FETCH_CHUNK_SIZE"),
+                    max_bytes=config.get("QUERY_RESULT_MAX_BYTES"),
                 )
 
                 if mutator:
@@ -1210,6 +1252,14 @@ sqla.event.listen(Database, "after_insert", security_manager.set_perm)
 sqla.event.listen(Database, "after_update", security_manager.set_perm)
 
 
+def dispose_database_engines(mapper, connection, target):
+    engine_pool.dispose_database(target.id)
+
+
+sqla.event.listen(Database, "after_update", dispose_database_engines)
+sqla.event.listen(Database, "after_delete", dispose_database_engines)
+
+
 class Log(Model):
 
     """ORM object used to log Superset actions to the database"""
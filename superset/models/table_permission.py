@@ -19,6 +19,7 @@ from datetime import datetime, timedelta
 
 from flask_appbuilder import Model
 from sqlalchemy import (
+    event,
     Table,
     Column,
     ForeignKey,
@@ -110,3 +111,11 @@ class TablePermission(Model, AuditMixinNullable):
     @status.setter
     def status(self, value):
         pass
+
+
+def clear_aics_table_permission_cache(*args, **kwargs):
+    security_manager.clear_aics_table_permission_cache()
+
+
+for event_name in ("after_insert", "after_update", "after_delete"):
+    event.listen(TablePermission, event_name, clear_aics_table_permission_cache)
@@ -17,7 +17,7 @@
 # pylint: disable=C,R,W
 """A set of constants and methods to manage permissions and security"""
 import logging
-from datetime import datetime
+from datetime import date, datetime
 from typing import Callable, List, Optional, Set, Tuple, TYPE_CHECKING, Union
 
 from flask import current_app, g
@@ -38,7 +38,7 @@ from sqlalchemy.orm.mapper import Mapper
 from superset import sql_parse
 from superset.connectors.connector_registry import ConnectorRegistry
 from superset.exceptions import SupersetSecurityException
-from superset.utils.core import DatasourceName
+from superset.utils.core import DatasourceName, LRUCache
 
 if TYPE_CHECKING:
     from superset.common.query_context import QueryContext
@@ -289,31 +289,99 @@ class SupersetSecurityManager(SecurityManager):
 
         return conf.get("PERMISSION_INSTRUCTIONS_LINK")
 
-    def _has_aics_table_permission(self, user: object, permission_name: str, view_name: str):
+    def get_aics_table_permissions(self, user: object) -> Set[Tuple[str, str]]:
         """
-        Customize table permission check
+        Return the set of (permission name, view-menu name) tuples granted to the user
+        through active, unexpired AICS table permissions.
+
+        The set is loaded with a single query once per request, and is shared across
+        requests for `AICS_TABLE_PERMISSION_CACHE_TTL` seconds if set. Shared entries
+        never outlive the earliest expiry date of the permissions they hold.
+
+        :param user: The FAB user
+        :returns: The set of granted permission/view-menu tuples
         """
 
+        request_cache = g.setdefault("aics_table_permissions", {})
+        if user.id in request_cache:
+            return request_cache[user.id]
+
+        cache = self._get_aics_table_permission_cache()
+        perms = cache.get(user.id) if cache is not None else None
+        if perms is None:
+            perms, min_expire_date = self._load_aics_table_permissions(user.id)
+            if cache is not None:
+                ttl = current_app.config["AICS_TABLE_PERMISSION_CACHE_TTL"]
+                if min_expire_date:
+                    expires_at = datetime.combine(min_expire_date, datetime.min.time())
+                    ttl = min(ttl, (expires_at - datetime.now()).total_seconds())
+                cache.set(user.id, perms, ttl=ttl)
+
+        request_cache[user.id] = perms
+        return perms
+
+    def _load_aics_table_permissions(self, user_id: int) -> Tuple[Set, Optional[date]]:
         from superset import db
-        from superset.models.table_permission import TablePermission
+        from superset.models.table_permission import (
+            assoc_tableperm_permissionview as assoc,
+            TablePermission,
+        )
+
+        pv_model = self.permissionview_model
+        rows = (
+            db.session.query(
+                self.permission_model.name,
+                self.viewmenu_model.name,
+                TablePermission.expire_date,
+            )
+            .select_from(TablePermission)
+            .join(assoc, assoc.c.tableperm_id == TablePermission.id)
+            .join(pv_model, pv_model.id == assoc.c.permissionview_id)
+            .join(
+                self.permission_model,
+                self.permission_model.id == pv_model.permission_id,
+            )
+            .join(self.viewmenu_model, self.viewmenu_model.id == pv_model.view_menu_id)
+            .filter(
+                TablePermission.user_id == user_id,
+                TablePermission.is_active == True,
+                TablePermission.expire_date > datetime.now().date(),
+            )
+            .all()
+        )
+        perms = {(perm_name, view_name) for perm_name, view_name, _ in rows}
+        min_expire_date = min((row[2] for row in rows), default=None)
+        return perms, min_expire_date
+
+    def _get_aics_table_permission_cache(self) -> Optional[LRUCache]:
+        ttl = current_app.config.get("AICS_TABLE_PERMISSION_CACHE_TTL")
+        if not ttl:
+            return None
+        if not getattr(self, "_aics_table_permission_cache", None):
+            self._aics_table_permission_cache = LRUCache(
+                maxsize=current_app.config["AICS_TABLE_PERMISSION_CACHE_SIZE"], ttl=ttl
+            )
+        return self._aics_table_permission_cache
+
+    def clear_aics_table_permission_cache(self) -> None:
+        """
+        Clear the AICS table permissions shared across requests, e.g., after table
+        permissions are granted or revoked.
+        """
+
+        if getattr(self, "_aics_table_permission_cache", None):
+            self._aics_table_permission_cache.clear()
+
+    def _has_aics_table_permission(self, user: object, permission_name: str, view_name: str):
+        """
+        Customize table permission check
+        """
 
         # Anonymous user is not allowed
         if user.is_anonymous:
             return False
 
-        # get permission of specified permission name and view name
-        perm = self.find_permission_view_menu( permission_name, view_name)
-
-        user_table_permissions = db.session.query(TablePermission).filter(
-            TablePermission.user_id == user.id,
-            TablePermission.is_active == True,
-            TablePermission.expire_date > datetime.now().date()
-        )
-
-        for table_perm in user_table_permissions:
-            if perm in table_perm.table_permissions:
-                return True
-                
+        return (permission_name, view_name) in self.get_aics_table_permissions(user)
 
     def _datasource_access_by_name(
         self, database: "Database", table_name: str, schema: str = None
@@ -15,20 +15,36 @@
 # specific language governing permissions and limitations
 # under the License.
 # pylint: disable=C,R,W
+import hashlib
 import logging
-from typing import List, Optional, Set
+from typing import FrozenSet, List, NamedTuple, Optional, Set, Tuple
 
 import sqlparse
 from sqlparse.sql import Identifier, IdentifierList, remove_quotes, Token, TokenList
 from sqlparse.tokens import Keyword, Name, Punctuation, String, Whitespace
 from sqlparse.utils import imt
 
+from superset.utils.core import LRUCache
+
 RESULT_OPERATIONS = {"UNION", "INTERSECT", "EXCEPT", "SELECT"}
 ON_KEYWORD = "ON"
 PRECEDES_TABLE_NAME = {"FROM", "JOIN", "DESCRIBE", "WITH", "LEFT JOIN", "RIGHT JOIN"}
 CTE_PREFIX = "CTE__"
 
 
+class ParseResult(NamedTuple):
+    statements: Tuple[str, ...]
+    tables: FrozenSet[str]
+    limit: Optional[int]
+    statement_type: Optional[str]
+
+
+# Parse results keyed by the SHA-256 of the SQL text, shared by all the
+# ParsedQuery instances of the process. A cryptographic hash is used since
+# the tables extracted here are used for access control.
+parse_cache = LRUCache(maxsize=256)
+
+
 class ParsedQuery(object):
     def __init__(self, sql_statement):
         self.sql: str = sql_statement
@@ -36,12 +52,35 @@ class ParsedQuery(object):
         self._alias_names: Set[str] = set()
         self._limit: Optional[int] = None
 
+        key = hashlib.sha256(self.sql.encode("utf-8")).hexdigest()
+        result = parse_cache.get(key)
+        if result is None:
+            result = self._parse()
+            parse_cache.set(key, result)
+        self._result: ParseResult = result
+        self._table_names = set(result.tables)
+        self._limit = result.limit
+
+    def _parse(self) -> ParseResult:
         logging.info("Parsing with sqlparse statement {}".format(self.sql))
-        self._parsed = sqlparse.parse(self.stripped())
-        for statement in self._parsed:
+        parsed = sqlparse.parse(self.stripped())
+        for statement in parsed:
             self.__extract_from_token(statement)
             self._limit = self._extract_limit_from_query(statement)
-        self._table_names = self._table_names - self._alias_names
+
+        statements = []
+        for statement in parsed:
+            if statement:
+                sql = str(statement).strip(" \n;\t")
+                if sql:
+                    statements.append(sql)
+
+        return ParseResult(
+            statements=tuple(statements),
+            tables=frozenset(self._table_names - self._alias_names),
+            limit=self._limit,
+            statement_type=parsed[0].get_type() if parsed else None,
+        )
 
     @property
     def tables(self) -> Set[str]:
@@ -52,7 +91,7 @@ class ParsedQuery(object):
         return self._limit
 
     def is_select(self) -> bool:
-        return self._parsed[0].get_type() == "SELECT"
+        return self._result.statement_type == "SELECT"
 
     def is_explain(self) -> bool:
         return self.stripped().upper().startswith("EXPLAIN")
@@ -66,13 +105,7 @@ class ParsedQuery(object):
 
     def get_statements(self) -> List[str]:
         """Returns a list of SQL statements as strings, stripped"""
-        statements = []
-        for statement in self._parsed:
-            if statement:
-                sql = str(statement).strip(" \n;\t")
-                if sql:
-                    statements.append(sql)
-        return statements
+        return list(self._result.statements)
 
     @staticmethod
     def __get_full_name(tlist: TokenList) -> Optional[str]:
@@ -215,7 +248,8 @@ class ParsedQuery(object):
         if not self._limit:
             return f"{self.stripped()}\nLIMIT {new_limit}"
         limit_pos = None
-        statement = self._parsed[0]
+        # parse again rather than altering the tokens of the shared parse result
+        statement = sqlparse.parse(self.stripped())[0]
         # Add all items to before_str until there is a limit
         for pos, item in enumerate(statement.tokens):
             if item.ttype in Keyword and item.value.lower() == "limit":
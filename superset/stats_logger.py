@@ -97,9 +97,12 @@ try:
         def timing(self, key, value):
             self.client.timing(key, value)
 
-        def gauge(self, key):
-            # pylint: disable=no-value-for-parameter
-            self.client.gauge(key)
+        def gauge(self, key, value=None):
+            if value is None:
+                # pylint: disable=no-value-for-parameter
+                self.client.gauge(key)
+            else:
+                self.client.gauge(key, value)
 
 
 except Exception:
@@ -18,17 +18,24 @@
 
 import json
 import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from itertools import chain, zip_longest
+from time import monotonic, sleep
 from urllib import request
 from urllib.error import URLError
 
 from celery.utils.log import get_task_logger
 from sqlalchemy import and_, func
 
-from superset import app, db
+from superset import app, cache, db, viz
+from superset.connectors.connector_registry import ConnectorRegistry
 from superset.models.core import Dashboard, Log, Slice
 from superset.models.tags import Tag, TaggedObject
 from superset.tasks.celery_app import app as celery_app
-from superset.utils.core import parse_human_datetime
+from superset.utils.core import parse_human_datetime, QueryStatus, run_concurrently
+from superset.utils.dates import now_as_float
 
 logger = get_task_logger(__name__)
 logger.setLevel(logging.INFO)
@@ -85,8 +92,11 @@ class Strategy:
     """
     A cache warm up strategy.
 
-    Each strategy defines a `get_urls` method that returns a list of URLs to
-    be fetched from the `/superset/warm_up_cache/` endpoint.
+    Each strategy defines a `get_charts` method that returns a list of
+    `(chart, dashboard)` tuples, the charts to warm up along with the
+    dashboard whose default filters apply to them, if any. Strategies may
+    define a `get_urls` method that returns a list of URLs to be fetched
+    instead.
 
     Strategies can be configured in `superset/config.py`:
 
@@ -107,8 +117,11 @@ class Strategy:
     def __init__(self):
         pass
 
+    def get_charts(self):
+        raise NotImplementedError("Subclasses must implement get_charts!")
+
     def get_urls(self):
-        raise NotImplementedError("Subclasses must implement get_urls!")
+        return [get_url(chart) for chart, _ in self.get_charts()]
 
 
 class DummyStrategy(Strategy):
@@ -129,11 +142,11 @@ class DummyStrategy(Strategy):
 
     name = "dummy"
 
-    def get_urls(self):
+    def get_charts(self):
         session = db.create_scoped_session()
         charts = session.query(Slice).all()
 
-        return [get_url(chart) for chart in charts]
+        return [(chart, None) for chart in charts]
 
 
 class TopNDashboardsStrategy(Strategy):
@@ -161,8 +174,8 @@ class TopNDashboardsStrategy(Strategy):
         self.top_n = top_n
         self.since = parse_human_datetime(since)
 
-    def get_urls(self):
-        urls = []
+    def get_charts(self):
+        charts = []
         session = db.create_scoped_session()
 
         records = (
@@ -177,9 +190,9 @@ class TopNDashboardsStrategy(Strategy):
         dashboards = session.query(Dashboard).filter(Dashboard.id.in_(dash_ids)).all()
         for dashboard in dashboards:
             for chart in dashboard.slices:
-                urls.append(get_url(chart))
+                charts.append((chart, dashboard))
 
-        return urls
+        return charts
 
 
 class DashboardTagsStrategy(Strategy):
@@ -204,8 +217,8 @@ class DashboardTagsStrategy(Strategy):
         super(DashboardTagsStrategy, self).__init__()
         self.tags = tags or []
 
-    def get_urls(self):
-        urls = []
+    def get_charts(self):
+        charts = []
         session = db.create_scoped_session()
 
         tags = session.query(Tag).filter(Tag.name.in_(self.tags)).all()
@@ -226,7 +239,7 @@ class DashboardTagsStrategy(Strategy):
         tagged_dashboards = session.query(Dashboard).filter(Dashboard.id.in_(dash_ids))
         for dashboard in tagged_dashboards:
             for chart in dashboard.slices:
-                urls.append(get_url(chart))
+                charts.append((chart, dashboard))
 
         # add charts that are tagged
         tagged_objects = (
@@ -242,12 +255,272 @@ class DashboardTagsStrategy(Strategy):
         chart_ids = [tagged_object.object_id for tagged_object in tagged_objects]
         tagged_charts = session.query(Slice).filter(Slice.id.in_(chart_ids))
         for chart in tagged_charts:
-            urls.append(get_url(chart))
+            charts.append((chart, None))
+
+        return charts
+
+
+class CostWeightedStrategy(Strategy):
+    """
+    Warm up the charts whose warm up saves the most waiting to their viewers.
+
+    Charts are ranked by their number of data requests since `since`, times
+    the longest duration of these requests, times the time by which warming
+    them up pushes back the expiry of their cache: the age of the cached data,
+    or the whole cache timeout when the data isn't cached. The best ranked
+    charts are warmed up until the sum of their durations reaches
+    `time_budget` seconds.
+
+        CELERYBEAT_SCHEDULE = {
+            'cache-warmup-hourly': {
+                'task': 'cache-warmup',
+                'schedule': crontab(minute=1, hour='*'),  # @hourly
+                'kwargs': {
+                    'strategy_name': 'cost_weighted',
+                    'since': '7 days ago',
+                    'time_budget': 600,
+                },
+            },
+        }
+    """
+
+    name = "cost_weighted"
+
+    # the actions logged when the data of a chart is requested
+    actions = ["explore_json", "slice_json"]
+
+    def __init__(self, since="7 days ago", time_budget=600):
+        super(CostWeightedStrategy, self).__init__()
+        self.since = parse_human_datetime(since)
+        self.time_budget = time_budget
+
+    def get_expiry_gain(self, chart):
+        """The seconds by which warming up a chart pushes back its expiry"""
+        form_data = chart.form_data
+        viz_obj = viz.viz_types[form_data["viz_type"]](
+            chart.datasource, form_data=form_data
+        )
+        age = viz_obj.get_cache_age()
+        if not viz_obj.cache_timeout:
+            # cached data never expires, missing data is worth the whole window
+            if age is not None:
+                return 0
+            return (datetime.now() - self.since).total_seconds()
+        if age is None:
+            return viz_obj.cache_timeout
+        return min(age, viz_obj.cache_timeout)
+
+    def get_charts(self):
+        session = db.create_scoped_session()
+
+        # cache hits are fast, the longest duration is the cost of the query
+        records = (
+            session.query(
+                Log.slice_id,
+                func.count(Log.id).label("views"),
+                func.max(Log.duration_ms).label("duration_ms"),
+            )
+            .filter(
+                and_(
+                    Log.slice_id > 0,
+                    Log.action.in_(self.actions),
+                    Log.dttm >= self.since,
+                )
+            )
+            .group_by(Log.slice_id)
+            .all()
+        )
+        usage = {
+            record.slice_id: (record.views, record.duration_ms or 0)
+            for record in records
+        }
+        charts = session.query(Slice).filter(Slice.id.in_(list(usage))).all()
+
+        scored_charts = []
+        for chart in charts:
+            views, duration_ms = usage[chart.id]
+            try:
+                gain = self.get_expiry_gain(chart)
+            except Exception:  # pylint: disable=broad-except
+                logger.exception(f"Error scoring chart {chart.id}")
+                continue
+            scored_charts.append((views * duration_ms * gain, duration_ms, chart))
+        scored_charts.sort(key=lambda scored_chart: scored_chart[0], reverse=True)
+
+        selected_charts = []
+        budget_ms = self.time_budget * 1000
+        for score, duration_ms, chart in scored_charts:
+            if score <= 0:
+                break
+            if duration_ms <= budget_ms:
+                budget_ms -= duration_ms
+                selected_charts.append((chart, None))
+
+        return selected_charts
+
+
+strategies = [
+    DummyStrategy,
+    TopNDashboardsStrategy,
+    DashboardTagsStrategy,
+    CostWeightedStrategy,
+]
+
+
+class RateLimiter:
+    """
+    Space out calls so that at most `rate` of them start per minute.
+
+    """
+
+    def __init__(self, rate):
+        self.interval = 60.0 / rate
+        self._next_start = monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self.interval
+        if start > now:
+            sleep(start - now)
+
+
+class WarmUpExecutor:
+    """
+    Warm up charts concurrently.
 
-        return urls
+    Charts are computed through the viz layer on up to `max_workers` threads,
+    unless the data of their main query is cached and fresh, or `force` is
+    set. At most `rate_limits[name]` charts per minute are computed on the
+    database named `name`, or `default_rate_limit` if the database isn't
+    listed. Charts are dispatched in turns across databases so that a rate
+    limited database doesn't hold up the others.
+
+    The summary of a warm up lists the charts that were computed in
+    `success`, those that were fresh in `skipped` and those that failed in
+    `errors`, along with how long each took.
+
+    """
+
+    def __init__(
+        self, max_workers=4, rate_limits=None, default_rate_limit=None, force=False
+    ):
+        self.max_workers = max_workers
+        self.rate_limits = rate_limits or {}
+        self.default_rate_limit = default_rate_limit
+        self.force = force
+        self._limiters = {}
+
+    @classmethod
+    def from_config(cls, config, **kwargs):
+        return cls(
+            max_workers=config.get("CACHE_WARMUP_MAX_WORKERS"),
+            rate_limits=config.get("CACHE_WARMUP_RATE_LIMITS"),
+            default_rate_limit=config.get("CACHE_WARMUP_DEFAULT_RATE_LIMIT"),
+            **kwargs,
+        )
+
+    def get_limiter(self, database_name):
+        rate = self.rate_limits.get(database_name, self.default_rate_limit)
+        if not rate:
+            return None
+        if database_name not in self._limiters:
+            self._limiters[database_name] = RateLimiter(rate)
+        return self._limiters[database_name]
+
+    def warm_up_charts(self, charts):
+        """Warm up a list of `(chart, dashboard)` tuples"""
+        tasks_by_database = OrderedDict()
+        seen = set()
+        for chart, dashboard in charts:
+            form_data = get_form_data(chart.id, dashboard)
+            key = (chart.id, json.dumps(form_data, sort_keys=True))
+            if key in seen:
+                continue
+            seen.add(key)
+            datasource = chart.datasource
+            database_name = datasource.database.name if datasource else None
+            tasks_by_database.setdefault(database_name, []).append(
+                (chart.id, form_data, self.get_limiter(database_name))
+            )
+
+        tasks = [
+            task
+            for task in chain.from_iterable(zip_longest(*tasks_by_database.values()))
+            if task is not None
+        ]
+        return self._summarize(
+            run_concurrently(
+                [lambda task=task: self.warm_up_chart(*task) for task in tasks],
+                self.max_workers,
+            )
+        )
 
+    def warm_up_chart(self, chart_id, form_data, limiter=None):
+        """Compute the data of a chart, returns its status and timing"""
+        result = {"chart_id": chart_id, "status": "success"}
+        start = now_as_float()
+        try:
+            with app.app_context():
+                chart = db.session.query(Slice).filter_by(id=chart_id).one()
+                chart_form_data = chart.form_data
+                chart_form_data.update(form_data)
+                viz_obj = viz.viz_types[chart_form_data["viz_type"]](
+                    chart.datasource, form_data=chart_form_data
+                )
+                if not self.force and viz_obj.is_cache_fresh():
+                    result["status"] = "skipped"
+                else:
+                    if limiter:
+                        limiter.wait()
+                        start = now_as_float()
+                    viz_obj.force = True
+                    payload_json, has_error = viz_obj.get_payload_json()
+                    payload = json.loads(payload_json) if has_error else {}
+                    # charts without data are warmed up as well
+                    if payload.get("status") == QueryStatus.FAILED:
+                        result["status"] = "errors"
+                        result["error"] = payload.get("error")
+        except Exception as e:  # pylint: disable=broad-except
+            logger.exception(f"Error warming up chart {chart_id}")
+            result["status"] = "errors"
+            result["error"] = str(e)
+        result["duration_ms"] = now_as_float() - start
+        logger.info(
+            f"Chart {chart_id}: {result['status']} in {result['duration_ms']:.0f}ms"
+        )
+        return result
+
+    def warm_up_urls(self, urls):
+        """Fetch a list of URLs, for strategies that don't list charts"""
+
+        def fetch(url):
+            result = {"url": url, "status": "success"}
+            start = now_as_float()
+            try:
+                logger.info(f"Fetching {url}")
+                request.urlopen(url)
+            except URLError as e:
+                logger.exception("Error warming up cache!")
+                result["status"] = "errors"
+                result["error"] = str(e)
+            result["duration_ms"] = now_as_float() - start
+            return result
+
+        return self._summarize(
+            run_concurrently(
+                [lambda url=url: fetch(url) for url in urls], self.max_workers
+            )
+        )
 
-strategies = [DummyStrategy, TopNDashboardsStrategy, DashboardTagsStrategy]
+    @staticmethod
+    def _summarize(results):
+        summary = {"success": [], "skipped": [], "errors": []}
+        for result in results:
+            summary[result.pop("status")].append(result)
+        return summary
 
 
 @celery_app.task(name="cache-warmup")
@@ -255,7 +528,8 @@ def cache_warmup(strategy_name, *args, **kwargs):
     """
     Warm up cache.
 
-    This task periodically hits charts to warm up the cache.
+    This task periodically computes charts to warm up the cache, see
+    `WarmUpExecutor`.
 
     """
     logger.info("Loading strategy")
@@ -277,14 +551,39 @@ def cache_warmup(strategy_name, *args, **kwargs):
         logger.exception(message)
         return message
 
-    results = {"success": [], "errors": []}
-    for url in strategy.get_urls():
-        try:
-            logger.info(f"Fetching {url}")
-            request.urlopen(url)
-            results["success"].append(url)
-        except URLError:
-            logger.exception("Error warming up cache!")
-            results["errors"].append(url)
-
-    return results
+    executor = WarmUpExecutor.from_config(app.config)
+    try:
+        charts = strategy.get_charts()
+    except NotImplementedError:
+        return executor.warm_up_urls(strategy.get_urls())
+    return executor.warm_up_charts(charts)
+
+
+@celery_app.task(name="cache-refresh-chart-data")
+def refresh_chart_data(datasource_type, datasource_id, form_data, cache_key):
+    """
+    Refresh the cached data of a chart.
+
+    This task is queued when the cached data of a chart is served past its
+    cache timeout, see `BaseViz.refresh_cache`. `cache_key` is the key of the
+    data that was served.
+
+    """
+    try:
+        with app.app_context():
+            datasource = ConnectorRegistry.get_datasource(
+                datasource_type, datasource_id, db.session
+            )
+            if not datasource:
+                logger.warning(
+                    f"Datasource {datasource_type} {datasource_id} not found"
+                )
+                return
+            viz_type = form_data.get("viz_type", "table")
+            viz_obj = viz.viz_types[viz_type](
+                datasource, form_data=form_data, force=True
+            )
+            logger.info(f"Refreshing the data of key {cache_key}")
+            viz_obj.get_payload_json()
+    finally:
+        cache.delete(viz.refresh_marker_key(cache_key))
@@ -0,0 +1,183 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+# pylint: disable=C,R,W
+"""Codecs used to (de)serialize chart data payloads stored in the cache
+
+A cached chart payload is a dict holding a DataFrame under the ``df`` key and
+a few small JSON-able values (``dttm``, ``query``, ...). Every encoded entry
+starts with a fixed header recording the codec and the compression used, so
+that readers can decode entries written with any registered codec. Entries
+written before codecs existed are raw pickles and are still readable.
+"""
+import logging
+import pickle as pkl
+import struct
+from typing import Any, Dict, Optional, Tuple
+
+import pyarrow as pa
+import simplejson as json
+
+MAGIC = b"SCC\x00"
+# magic, codec id, compression id, metadata length, uncompressed payload length
+HEADER = struct.Struct(">4sBBIQ")
+
+COMPRESSIONS = {None: 0, "lz4": 1, "zstd": 2, "gzip": 3, "snappy": 4, "brotli": 5}
+COMPRESSION_NAMES = {v: k for k, v in COMPRESSIONS.items()}
+
+
+class CacheCodecException(Exception):
+    pass
+
+
+class BaseCacheCodec(object):
+    """Base class for chart cache codecs
+
+    ``codec_id`` is written in the entry header and must never be reused once
+    a codec has been released, since it's how readers find the right decoder.
+    """
+
+    codec_id: int = 0
+    name: str = ""
+
+    def encode(self, value: Dict[str, Any]) -> Tuple[bytes, Any]:
+        """Returns a (metadata, payload) tuple of bytes-like objects"""
+        raise NotImplementedError()
+
+    def decode(self, metadata: memoryview, payload: pa.Buffer) -> Dict[str, Any]:
+        raise NotImplementedError()
+
+
+class PickleCacheCodec(BaseCacheCodec):
+    codec_id = 1
+    name = "pickle"
+
+    def encode(self, value):
+        return b"", pkl.dumps(value, protocol=pkl.HIGHEST_PROTOCOL)
+
+    def decode(self, metadata, payload):
+        return pkl.loads(memoryview(payload))
+
+
+class ArrowCacheCodec(BaseCacheCodec):
+    """Stores the DataFrame as an Arrow IPC stream
+
+    The non-DataFrame values are stored as JSON in the metadata section.
+    Reading maps the Arrow stream straight from the cached bytes, without
+    copying them into intermediate Python objects.
+    """
+
+    codec_id = 2
+    name = "arrow"
+
+    def encode(self, value):
+        df = value.get("df")
+        metadata = {k: v for k, v in value.items() if k != "df"}
+        metadata["has_df"] = df is not None
+        if df is None:
+            return json.dumps(metadata).encode("utf-8"), b""
+
+        if not all(isinstance(col, str) for col in df.columns):
+            # Arrow would stringify column labels, making the round trip lossy
+            raise CacheCodecException("Arrow requires string column labels")
+        table = pa.Table.from_pandas(df)
+        sink = pa.BufferOutputStream()
+        writer = pa.RecordBatchStreamWriter(sink, table.schema)
+        writer.write_table(table)
+        writer.close()
+        return json.dumps(metadata).encode("utf-8"), sink.getvalue()
+
+    def decode(self, metadata, payload):
+        value = json.loads(bytes(metadata).decode("utf-8"))
+        has_df = value.pop("has_df", False)
+        value["df"] = None
+        if has_df:
+            reader = pa.ipc.open_stream(payload)
+            value["df"] = reader.read_all().to_pandas()
+        return value
+
+
+CODECS: Dict[str, BaseCacheCodec] = {
+    codec.name: codec for codec in (PickleCacheCodec(), ArrowCacheCodec())
+}
+CODECS_BY_ID = {codec.codec_id: codec for codec in CODECS.values()}
+
+
+def register_codec(codec: BaseCacheCodec) -> None:
+    """Makes a custom codec available for reading and writing"""
+    CODECS[codec.name] = codec
+    CODECS_BY_ID[codec.codec_id] = codec
+
+
+def dumps(
+    value: Dict[str, Any], codec: str = "arrow", compression: Optional[str] = None
+) -> bytes:
+    """Serializes a chart cache value with the given codec
+
+    If the value can't be represented by the codec (for instance an object
+    column with mixed types for Arrow), the pickle codec is used instead so
+    that the entry can still be cached.
+    """
+    if codec not in CODECS:
+        raise CacheCodecException("Unknown cache codec: {}".format(codec))
+    if compression not in COMPRESSIONS:
+        raise CacheCodecException("Unknown cache compression: {}".format(compression))
+
+    encoder = CODECS[codec]
+    try:
+        metadata, payload = encoder.encode(value)
+    except (CacheCodecException, pa.ArrowException, TypeError, ValueError) as e:
+        if encoder.name == PickleCacheCodec.name:
+            raise
+        logging.info(
+            "Falling back to pickle for cache value, {} failed: {}".format(codec, e)
+        )
+        encoder = CODECS[PickleCacheCodec.name]
+        metadata, payload = encoder.encode(value)
+
+    raw_size = len(payload)
+    if compression and raw_size:
+        payload = pa.compress(payload, codec=compression, asbytes=True)
+    elif isinstance(payload, pa.Buffer):
+        payload = payload.to_pybytes()
+
+    header = HEADER.pack(
+        MAGIC, encoder.codec_id, COMPRESSIONS[compression], len(metadata), raw_size
+    )
+    return b"".join((header, metadata, payload))
+
+
+def loads(blob: bytes) -> Dict[str, Any]:
+    """Deserializes a chart cache value written by `dumps` or a legacy pickle"""
+    if not blob.startswith(MAGIC):
+        return pkl.loads(blob)
+
+    _, codec_id, compression_id, metadata_size, raw_size = HEADER.unpack_from(blob)
+    decoder = CODECS_BY_ID.get(codec_id)
+    compression = COMPRESSION_NAMES.get(compression_id, "unknown")
+    if not decoder or compression == "unknown":
+        raise CacheCodecException(
+            "Unsupported cache entry (codec: {}, compression: {})".format(
+                codec_id, compression_id
+            )
+        )
+
+    buf = pa.py_buffer(blob)
+    metadata = memoryview(blob)[HEADER.size : HEADER.size + metadata_size]
+    payload = buf.slice(HEADER.size + metadata_size)
+    if compression and raw_size:
+        payload = pa.decompress(payload, decompressed_size=raw_size, codec=compression)
+    return decoder.decode(metadata, payload)
@@ -0,0 +1,151 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+# pylint: disable=C,R,W
+"""Clustering of map points by zoom level, in the fashion of supercluster
+
+Points are projected to Web Mercator coordinates between 0 and 1. At each
+zoom level, from the deepest one up, the clusters of the level below are
+merged when they fall in the same cell of a grid whose cells are ``radius``
+pixels wide at that zoom, tiles being ``extent`` pixels wide. A cluster is
+placed at the centroid of its points and keeps what's needed to aggregate
+the metric of its points.
+"""
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = [
+    "x",
+    "y",
+    "point_count",
+    "metric_count",
+    "metric_sum",
+    "metric_sumsq",
+    "metric_min",
+    "metric_max",
+    "point",
+]
+
+
+def lng_x(lon: np.ndarray) -> np.ndarray:
+    return lon / 360 + 0.5
+
+
+def lat_y(lat: np.ndarray) -> np.ndarray:
+    sin = np.sin(lat * np.pi / 180)
+    with np.errstate(divide="ignore"):
+        y = 0.5 - 0.25 * np.log((1 + sin) / (1 - sin)) / np.pi
+    return np.clip(y, 0, 1)
+
+
+def x_lng(x: np.ndarray) -> np.ndarray:
+    return (x - 0.5) * 360
+
+
+def y_lat(y: np.ndarray) -> np.ndarray:
+    y2 = (180 - y * 360) * np.pi / 180
+    return 360 * np.arctan(np.exp(y2)) / np.pi - 90
+
+
+def cluster_points(
+    lon: np.ndarray,
+    lat: np.ndarray,
+    metric: np.ndarray,
+    radius: float,
+    min_zoom: int = 0,
+    max_zoom: int = 16,
+    extent: int = 512,
+) -> Dict[int, pd.DataFrame]:
+    """Clusters points for each zoom level between ``min_zoom`` and ``max_zoom``
+
+    :param metric: The metric of the points, NaN for the ones without
+    :returns: The clusters of each zoom level, with their position (``x``
+        and ``y``), number of points, and the count, sum, sum of squares,
+        minimum and maximum of the metric of their points. Clusters of a
+        single point have the index of that point in ``point``, -1 otherwise.
+        Points without a position are left out.
+    """
+    has_metric = ~np.isnan(metric)
+    level = pd.DataFrame(
+        {
+            "x": lng_x(lon),
+            "y": lat_y(lat),
+            "point_count": 1,
+            "metric_count": has_metric.astype(int),
+            "metric_sum": np.where(has_metric, metric, 0),
+            "metric_sumsq": np.where(has_metric, metric * metric, 0),
+            "metric_min": metric,
+            "metric_max": metric,
+            "point": np.arange(len(lon)),
+        }
+    ).dropna(subset=["x", "y"])
+
+    clusters = {}
+    for zoom in range(max_zoom, min_zoom - 1, -1):
+        cell_size = radius / (extent * 2 ** zoom)
+        cells = [
+            np.floor(level["x"].values / cell_size),
+            np.floor(level["y"].values / cell_size),
+        ]
+        # the centroids are weighted by the number of points of the clusters
+        level = level.assign(
+            x=level["x"] * level["point_count"], y=level["y"] * level["point_count"]
+        )
+        level = (
+            level.groupby(cells, sort=False)
+            .agg(
+                {
+                    "x": "sum",
+                    "y": "sum",
+                    "point_count": "sum",
+                    "metric_count": "sum",
+                    "metric_sum": "sum",
+                    "metric_sumsq": "sum",
+                    "metric_min": "min",
+                    "metric_max": "max",
+                    "point": "first",
+                }
+            )
+            .reset_index(drop=True)
+        )
+        level["x"] /= level["point_count"]
+        level["y"] /= level["point_count"]
+        level.loc[level["point_count"] > 1, "point"] = -1
+        clusters[zoom] = level[COLUMNS]
+    return clusters
+
+
+def aggregate_metric(clusters: pd.DataFrame, aggregator: str) -> np.ndarray:
+    """The metric of clusters, NaN for the clusters without metric
+
+    :param aggregator: One of sum, min, max, mean, var and std (or stdev),
+        which defaults to sum
+    """
+    count = clusters["metric_count"].values.astype(float)
+    count[count == 0] = np.nan
+    if aggregator == "min":
+        return clusters["metric_min"].values
+    if aggregator == "max":
+        return clusters["metric_max"].values
+    mean = clusters["metric_sum"].values / count
+    if aggregator == "mean":
+        return mean
+    if aggregator in ("var", "std", "stdev"):
+        var = np.maximum(clusters["metric_sumsq"].values / count - mean * mean, 0)
+        return var if aggregator == "var" else np.sqrt(var)
+    return np.where(np.isnan(count), np.nan, clusters["metric_sum"].values)
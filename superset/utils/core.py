@@ -24,17 +24,30 @@ import logging
 import os
 import signal
 import smtplib
+import threading
 import traceback
 import uuid
 import zlib
+from collections import OrderedDict
 from datetime import date, datetime, time, timedelta
 from email.mime.application import MIMEApplication
 from email.mime.image import MIMEImage
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.utils import formatdate
-from time import struct_time
-from typing import Iterator, List, NamedTuple, Optional, Tuple, Union
+from multiprocessing.pool import ThreadPool
+from time import monotonic, struct_time
+from typing import (
+    Any,
+    Callable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 from urllib.parse import unquote_plus
 
 import bleach
@@ -46,7 +59,16 @@ import parsedatetime
 import sqlalchemy as sa
 from dateutil.parser import parse
 from dateutil.relativedelta import relativedelta
-from flask import current_app, flash, Flask, g, Markup, render_template
+from flask import (
+    _request_ctx_stack,
+    current_app,
+    flash,
+    Flask,
+    g,
+    has_app_context,
+    Markup,
+    render_template,
+)
 from flask_appbuilder.security.sqla.models import User
 from flask_babel import gettext as __, lazy_gettext as _
 from flask_caching import Cache
@@ -158,6 +180,123 @@ def memoized(func=None, watch=None):
         return wrapper
 
 
+class LRUCache:
+    """Thread-safe, process-local LRU cache with an optional time-to-live
+
+    At most ``maxsize`` entries are kept, the least recently used ones being
+    evicted first. Entries older than ``ttl`` seconds are treated as missing,
+    a ``ttl`` of ``None`` keeps them until evicted. Lookups are counted in
+    ``hits`` and ``misses``.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                value, expires_at = item
+                if expires_at is None or expires_at > monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def bind_flask_context(func: Callable[[], Any]) -> Callable[[], Any]:
+    """Wraps ``func`` so that it runs in a copy of the caller's Flask context
+
+    The copy shares the caller's request, if any, and the attributes of
+    ``g``, so that ``func`` can be called from another thread.
+    """
+    if not has_app_context():
+        return func
+    app = current_app._get_current_object()
+    g_vars = dict(vars(g._get_current_object()))
+    request_ctx = _request_ctx_stack.top
+
+    def wrapper():
+        ctx = request_ctx.copy() if request_ctx else app.app_context()
+        with ctx:
+            vars(g._get_current_object()).update(g_vars)
+            return func()
+
+    return wrapper
+
+
+def run_concurrently(
+    funcs: Sequence[Callable[[], Any]], max_workers: int = 4
+) -> List[Any]:
+    """Calls functions on at most ``max_workers`` threads
+
+    The results are returned in the order of ``funcs``, once all the calls
+    are done. The first exception raised by a call is raised again. The
+    functions run in a copy of the caller's Flask context.
+    """
+    if len(funcs) <= 1 or max_workers <= 1:
+        return [func() for func in funcs]
+    bound = [bind_flask_context(func) for func in funcs]
+    pool = ThreadPool(min(max_workers, len(bound)))
+    try:
+        return pool.map(lambda func: func(), bound)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def iter_concurrently(
+    funcs: Sequence[Callable[[], Any]], max_workers: int = 4
+) -> Iterator[Tuple[int, Any]]:
+    """Calls functions on at most ``max_workers`` threads
+
+    Yields the index of each function along with its result as soon as the
+    call is done, in the order the calls complete. The first exception
+    raised by a call is raised again. The functions run in a copy of the
+    caller's Flask context.
+    """
+    if len(funcs) <= 1 or max_workers <= 1:
+        for i, func in enumerate(funcs):
+            yield i, func()
+        return
+    bound = [bind_flask_context(func) for func in funcs]
+    pool = ThreadPool(min(max_workers, len(bound)))
+    try:
+        yield from pool.imap_unordered(
+            lambda item: (item[0], item[1]()), enumerate(bound)
+        )
+    finally:
+        # don't start the remaining calls if the caller stopped iterating
+        pool.terminate()
+
+
 def parse_js_uri_path_item(
     item: Optional[str], unquote: bool = True, eval_undefined: bool = False
 ) -> Optional[str]:
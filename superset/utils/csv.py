@@ -0,0 +1,78 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+# pylint: disable=C,R,W
+"""Block-wise CSV encoding used to stream query results
+
+Every non-null field is enclosed in double quotes, with embedded double
+quotes doubled, as per RFC 4180. Null fields are written as empty, unquoted
+fields so that they can be told apart from empty strings.
+"""
+
+from itertools import islice
+from time import sleep
+from typing import Any, Iterable, Iterator, List, Sequence
+
+LINE_TERMINATOR = "\n"
+
+
+def _encode_column(values: Sequence[Any]) -> List[str]:
+    return [
+        ""
+        if value is None
+        else '"'
+        + (value if type(value) is str else str(value)).replace('"', '""')
+        + '"'
+        for value in values
+    ]
+
+
+def encode_rows(rows: Sequence[Sequence[Any]]) -> str:
+    """Encodes a block of rows into CSV lines in one pass
+
+    The block is transposed so that each column is encoded by a single list
+    comprehension, then the fields are joined back into lines.
+    """
+    if not rows:
+        return ""
+    columns = [_encode_column(column) for column in zip(*rows)]
+    lines = map(",".join, zip(*columns))
+    return LINE_TERMINATOR.join(lines) + LINE_TERMINATOR
+
+
+def encode_header(columns: Sequence[str]) -> str:
+    return encode_rows([columns])
+
+
+def chunk_rows(rows: Iterable[Sequence[Any]], size: int) -> Iterator[List]:
+    """Groups an iterable of rows into lists of at most `size` rows"""
+    rows = iter(rows)
+    chunk = list(islice(rows, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(rows, size))
+
+
+def stream_csv(
+    columns: Sequence[str], blocks: Iterable[Sequence[Sequence[Any]]]
+) -> Iterator[str]:
+    """Yields the CSV header, then one string per block of rows"""
+    yield encode_header(columns)
+    for block in blocks:
+        # give the worker a break between blocks to update its heartbeat and
+        # keep the connection and worker process alive
+        sleep(0)
+        yield encode_rows(block)
@@ -14,8 +14,10 @@
 # KIND, either express or implied.  See the License for the
 # specific language governing permissions and limitations
 # under the License.
-from datetime import datetime
+from datetime import datetime, timedelta
 
+import numpy as np
+import pandas as pd
 import pytz
 
 EPOCH = datetime(1970, 1, 1)
@@ -29,5 +31,12 @@ def datetime_to_epoch(dttm):
     return (dttm - EPOCH).total_seconds() * 1000
 
 
+def datetime_index_to_epoch(index: pd.DatetimeIndex) -> np.ndarray:
+    """Vectorized `datetime_to_epoch`, NaT being converted to NaN"""
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return np.asarray((index - EPOCH) / timedelta(milliseconds=1))
+
+
 def now_as_float():
     return datetime_to_epoch(datetime.utcnow())
@@ -52,7 +52,8 @@ def etag_cache(max_age, check_perms=bool):
 
     If a cache is set, the decorator will cache GET responses, bypassing the
     dataframe serialization. POST requests will still benefit from the
-    dataframe cache for requests that produce the same SQL.
+    dataframe cache for requests that produce the same SQL, and from the
+    chart payload cache when ``CHART_PAYLOAD_CACHE_ENABLED`` is set.
 
     """
 
@@ -64,7 +65,7 @@ def etag_cache(max_age, check_perms=bool):
 
             # for POST requests we can't set cache headers, use the response
             # cache nor use conditional requests; this will still use the
-            # dataframe cache in `superset/viz.py`, though.
+            # dataframe and payload caches in `superset/viz.py`, though.
             if request.method == "POST":
                 return f(*args, **kwargs)
 
@@ -0,0 +1,173 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+# pylint: disable=C,R,W
+"""Registry of pooled SQLAlchemy engines shared across queries
+
+By default a fresh engine using a ``NullPool`` is created for each query,
+which opens and tears down a database connection every time. In pooled mode
+engines are kept in a process-wide registry keyed by database, effective URL,
+impersonated user, schema and engine parameters, each with a bounded
+``QueuePool``. Engines left unused for a while are disposed of.
+"""
+import logging
+import os
+import threading
+from collections import OrderedDict
+from time import monotonic
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+from superset.utils.dates import now_as_float
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool reporting checkout wait time and pool usage to a stats logger"""
+
+    stats_logger = None
+
+    def _do_get(self):
+        start = now_as_float()
+        try:
+            return super()._do_get()
+        finally:
+            if self.stats_logger:
+                self.stats_logger.timing(
+                    "engine_pool.checkout_wait", now_as_float() - start
+                )
+                self.stats_logger.gauge("engine_pool.checkedout", self.checkedout())
+
+    def _do_return_conn(self, conn):
+        super()._do_return_conn(conn)
+        if self.stats_logger:
+            self.stats_logger.gauge("engine_pool.checkedout", self.checkedout())
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.stats_logger = self.stats_logger
+        return pool
+
+
+class EnginePool(object):
+    """Process-wide registry of pooled engines
+
+    At most ``max_engines`` engines are kept, the least recently used ones
+    being disposed of first. Engines that haven't been used for
+    ``idle_timeout`` seconds and have no connection checked out are disposed
+    of as well. Engines are never shared with forked processes.
+    """
+
+    def __init__(
+        self,
+        max_engines: int = 100,
+        idle_timeout: Optional[float] = 600,
+        stats_logger=None,
+    ) -> None:
+        self.max_engines = max_engines
+        self.idle_timeout = idle_timeout
+        self.stats_logger = stats_logger
+        self._engines: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def get_engine(
+        self, key: Tuple[Hashable, ...], create: Callable[[], Engine]
+    ) -> Engine:
+        """Returns the engine registered under ``key``, creating it if needed
+
+        The first item of ``key`` identifies the database, so that all of its
+        engines can be disposed of at once with `dispose_database`.
+        """
+        with self._lock:
+            self._check_pid()
+            now = monotonic()
+            item = self._engines.get(key)
+            if item is not None:
+                engine = item[0]
+                self._engines[key] = (engine, now)
+                self._engines.move_to_end(key)
+                self._incr("hit")
+            else:
+                engine = create()
+                if isinstance(engine.pool, InstrumentedQueuePool):
+                    engine.pool.stats_logger = self.stats_logger
+                self._engines[key] = (engine, now)
+                self._incr("miss")
+            self._evict(now)
+            if self.stats_logger:
+                self.stats_logger.gauge("engine_pool.engines", len(self._engines))
+            return engine
+
+    def dispose_database(self, database_id: Any) -> None:
+        """Disposes of all the engines of a database, for instance on update"""
+        with self._lock:
+            for key in [key for key in self._engines if key[0] == database_id]:
+                self._engines.pop(key)[0].dispose()
+
+    def dispose(self) -> None:
+        with self._lock:
+            while self._engines:
+                self._engines.popitem()[1][0].dispose()
+
+    def __len__(self) -> int:
+        return len(self._engines)
+
+    def _check_pid(self) -> None:
+        if self._pid != os.getpid():
+            # connections inherited from the parent process can't be shared,
+            # drop them without closing them under the parent's feet
+            self._engines = OrderedDict()
+            self._pid = os.getpid()
+
+    def _evict(self, now: float) -> None:
+        while len(self._engines) > self.max_engines:
+            self._engines.popitem(last=False)[1][0].dispose()
+            self._incr("evicted")
+        if self.idle_timeout is None:
+            return
+        expired = [
+            key
+            for key, (engine, last_used) in self._engines.items()
+            if now - last_used > self.idle_timeout and not _checkedout(engine)
+        ]
+        for key in expired:
+            self._engines.pop(key)[0].dispose()
+            self._incr("evicted")
+        if expired:
+            logging.info("Disposed of {} idle engines".format(len(expired)))
+
+    def _incr(self, key: str) -> None:
+        if self.stats_logger:
+            self.stats_logger.incr("engine_pool.{}".format(key))
+
+
+def _checkedout(engine: Engine) -> int:
+    checkedout = getattr(engine.pool, "checkedout", None)
+    return checkedout() if checkedout else 0
+
+
+def get_pool_params(config: Dict[str, Any]) -> Dict[str, Any]:
+    """Returns the `create_engine` pool parameters defined in the config"""
+    return {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": config.get("ENGINE_POOL_SIZE"),
+        "max_overflow": config.get("ENGINE_POOL_MAX_OVERFLOW"),
+        "pool_timeout": config.get("ENGINE_POOL_TIMEOUT"),
+        "pool_recycle": config.get("ENGINE_POOL_RECYCLE"),
+        "pool_pre_ping": True,
+    }
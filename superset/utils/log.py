@@ -16,19 +16,25 @@
 # under the License.
 # pylint: disable=C,R,W
 import os
+import atexit
 import functools
 import inspect
 import json
 import logging
+import queue
 import textwrap
+import threading
+import time
 from abc import ABC, abstractmethod
 from datetime import datetime
-from typing import Any, cast, Type
+from typing import Any, Callable, cast, List, Optional, Type
 
-from flask import current_app, g, request
+from flask import current_app, g, has_app_context, request
 
 from applicationinsights import TelemetryClient
 
+from superset.utils.dates import now_as_float
+
 
 class AbstractEventLogger(ABC):
     @abstractmethod
@@ -55,7 +61,8 @@ class AbstractEventLogger(ABC):
                 slice_id = int(
                     slice_id or json.loads(d.get("form_data")).get("slice_id")
                 )
-            except (ValueError, TypeError):
+            except (AttributeError, ValueError, TypeError):
+                # e.g. the list of form data posted to explore_json_batch
                 slice_id = 0
 
             self.stats_logger.incr(f.__name__)
@@ -142,17 +149,147 @@ def get_event_logger_from_cfg_value(cfg_value: object) -> AbstractEventLogger:
     logging.info(f"Configured event logger of type {type(result)}")
     return cast(AbstractEventLogger, result)
 
+
+class EventQueue(object):
+    """Bounded in-process queue drained by a background thread in batches
+
+    Queued items are handed to `write_batch` once `batch_size` of them are
+    pending, or `flush_interval` seconds after the oldest pending one was
+    queued, whichever comes first. When the queue is full, new items are
+    dropped rather than blocking the request thread. The worker thread is
+    started lazily, and restarted in forked processes (gunicorn workers).
+    """
+
+    _stop = object()
+
+    def __init__(
+        self,
+        write_batch: Callable[[List[Any]], None],
+        maxsize: int = 10000,
+        batch_size: int = 500,
+        flush_interval: float = 5,
+        stats_logger=None,
+        stats_prefix: str = "event_logger",
+    ):
+        self.write_batch = write_batch
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.stats_logger = stats_logger
+        self.stats_prefix = stats_prefix
+        self._maxsize = maxsize
+        self._queue: queue.Queue = queue.Queue(maxsize)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        atexit.register(self.shutdown)
+
+    def put(self, item) -> bool:
+        """Queues an item without blocking, returns False if it was dropped"""
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self._incr("dropped")
+            return False
+        return True
+
+    def shutdown(self, timeout: float = 10) -> None:
+        """Writes the pending items and stops the worker thread"""
+        if not self._is_running():
+            return
+        try:
+            self._queue.put(self._stop, timeout=timeout)
+        except queue.Full:
+            logging.warning("Event queue is full, pending events may be lost")
+        self._thread.join(timeout)
+
+    def _is_running(self) -> bool:
+        return bool(
+            self._thread and self._thread.is_alive() and self._pid == os.getpid()
+        )
+
+    def _ensure_worker(self) -> None:
+        if self._is_running():
+            return
+        with self._lock:
+            if self._is_running():
+                return
+            if self._pid != os.getpid():
+                # the queue was inherited from the parent process, which
+                # remains in charge of writing the events it queued
+                self._queue = queue.Queue(self._maxsize)
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run, name=self.stats_prefix, daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        batch: List[Any] = []
+        deadline = None
+        while True:
+            timeout = self.flush_interval
+            if deadline is not None:
+                timeout = max(deadline - time.monotonic(), 0)
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            else:
+                if item is self._stop:
+                    self._flush(batch)
+                    return
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+            if batch and (
+                len(batch) >= self.batch_size or time.monotonic() >= deadline
+            ):
+                self._flush(batch)
+                batch = []
+                deadline = None
+
+    def _flush(self, batch: List[Any]) -> None:
+        if not batch:
+            return
+        start = now_as_float()
+        try:
+            self.write_batch(batch)
+        except Exception as e:
+            self._incr("failed")
+            logging.exception(e)
+        if self.stats_logger:
+            self.stats_logger.timing(
+                f"{self.stats_prefix}.flush", now_as_float() - start
+            )
+            self.stats_logger.gauge(f"{self.stats_prefix}.batch_size", len(batch))
+            self.stats_logger.gauge(
+                f"{self.stats_prefix}.queue_size", self._queue.qsize()
+            )
+
+    def _incr(self, key: str) -> None:
+        if self.stats_logger:
+            self.stats_logger.incr(f"{self.stats_prefix}.{key}")
+
+
 INSTRUMENTATION_KEY=os.environ.get('INSTRUMENTATION_KEY')
 tc = TelemetryClient(INSTRUMENTATION_KEY)
 class DBEventLogger(AbstractEventLogger):
+    """Writes events to the `logs` table and to App Insights
+
+    With `EVENT_LOGGER_ASYNC` enabled, events are queued and written in
+    batches by a background thread instead of within the request.
+    """
+
+    def __init__(self):
+        self._queue: Optional[EventQueue] = None
+        self._app = None
+
     def appinsights(self, data):
         print(f'appinsights triggerd with {data}')
         tc.track_event('medical.superset', data)
-        tc.flush()
-    
-    def log(self, user_id, action, *args, **kwargs):
-        from superset.models.core import Log
 
+    def log(self, user_id, action, *args, **kwargs):
         records = kwargs.get("records", list())
         dashboard_id = kwargs.get("dashboard_id")
         slice_id = kwargs.get("slice_id")
@@ -167,21 +304,23 @@ class DBEventLogger(AbstractEventLogger):
         success = "true" if err_msg == None else "false"
 
         logs = list()
+        events = list()
         for record in records:
             try:
                 json_string = json.dumps(record)
             except Exception:
                 json_string = None
-            log = Log(
-                action=action,
-                json=json_string,
-                dashboard_id=dashboard_id,
-                slice_id=slice_id,
-                duration_ms=duration_ms,
-                referrer=referrer,
-                user_id=user_id,
+            logs.append(
+                dict(
+                    action=action,
+                    json=json_string,
+                    dashboard_id=dashboard_id,
+                    slice_id=slice_id,
+                    duration_ms=duration_ms,
+                    referrer=referrer,
+                    user_id=user_id,
+                )
             )
-            logs.append(log)
             json_log = {
                 'level': 'info',
                 'success': success,
@@ -202,8 +341,49 @@ class DBEventLogger(AbstractEventLogger):
             if log_msg != None:
                 json_log['log_msg'] = str(log_msg)
 
-            self.appinsights(json_log)
+            events.append(json_log)
+
+        if current_app.config.get("EVENT_LOGGER_ASYNC"):
+            self.get_queue().put((logs, events))
+        else:
+            self.write_batch([(logs, events)])
+
+    def get_queue(self) -> EventQueue:
+        if not self._queue:
+            config = current_app.config
+            self._app = current_app._get_current_object()
+            self._queue = EventQueue(
+                self.write_batch,
+                maxsize=config.get("EVENT_LOGGER_QUEUE_SIZE"),
+                batch_size=config.get("EVENT_LOGGER_BATCH_SIZE"),
+                flush_interval=config.get("EVENT_LOGGER_FLUSH_INTERVAL"),
+                stats_logger=self.stats_logger,
+            )
+        return self._queue
+
+    def write_batch(self, batch):
+        """Writes a list of (logs, events) tuples built by `log`"""
+        from superset.models.core import Log
+
+        for _, events in batch:
+            for event in events:
+                self.appinsights(event)
+        tc.flush()
+
+        logs = [Log(**log) for log_dicts, _ in batch for log in log_dicts]
+        if not has_app_context():
+            # running on the background thread of the queue
+            with self._app.app_context():
+                self._save_logs(logs)
+        else:
+            self._save_logs(logs)
 
+    @staticmethod
+    def _save_logs(logs):
         sesh = current_app.appbuilder.get_session
-        sesh.bulk_save_objects(logs)
-        sesh.commit()
+        try:
+            sesh.bulk_save_objects(logs)
+            sesh.commit()
+        except Exception:
+            sesh.rollback()
+            raise
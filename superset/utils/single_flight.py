@@ -0,0 +1,86 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+# pylint: disable=C,R,W
+"""Coalescing of identical computations of a cache value across processes
+
+The first process missing a cache key takes a lock stored next to it on the
+cache backend and computes the value, while the processes missing the same
+key in the meantime wait for the value to be set instead of computing it
+again. ``add`` being the only atomic operation offered by all the cache
+backends, locks are taken with it and expire after a timeout in case their
+holder dies. Processes that can't reach the cache backend don't coalesce.
+"""
+import logging
+import uuid
+from time import monotonic, sleep
+from typing import Any, Optional
+
+from flask_caching import Cache
+
+LOCK_KEY_PREFIX = "single_flight_"
+
+
+def lock_key(key: str) -> str:
+    return LOCK_KEY_PREFIX + key
+
+
+def acquire(cache: Cache, key: str, timeout: int) -> Optional[str]:
+    """Takes the lock of ``key`` for at most ``timeout`` seconds
+
+    :returns: A token to release the lock with, or None if the lock is held by
+        another process
+    """
+    token = uuid.uuid4().hex
+    try:
+        if not cache.add(lock_key(key), token, timeout=timeout):
+            return None
+    except Exception as e:
+        logging.exception(e)
+    return token
+
+
+def release(cache: Cache, key: str, token: str) -> None:
+    """Releases the lock of ``key``, unless it expired and was taken again"""
+    try:
+        if cache.get(lock_key(key)) == token:
+            cache.delete(lock_key(key))
+    except Exception as e:
+        logging.exception(e)
+
+
+def wait(cache: Cache, key: str, timeout: float, interval: float = 0.1) -> Any:
+    """Waits for the holder of the lock of ``key`` to set its value
+
+    :returns: The value of ``key``, or None if the lock was released without
+        the value being set or if the value wasn't set within ``timeout``
+        seconds
+    """
+    deadline = monotonic() + timeout
+    try:
+        while True:
+            value = cache.get(key)
+            if value is not None:
+                return value
+            if cache.get(lock_key(key)) is None:
+                # the value may have been set right before the lock was released
+                return cache.get(key)
+            if monotonic() >= deadline:
+                return None
+            sleep(interval)
+    except Exception as e:
+        logging.exception(e)
+        return None
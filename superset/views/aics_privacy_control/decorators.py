@@ -2,11 +2,58 @@ import functools
 import logging
 
 from flask import request, g
-from flask_appbuilder.security.sqla import models as ab_models
+from sqlalchemy import event
 
-from superset import db, security_manager
+from superset import app, db, security_manager
 from superset.models.user_attributes import UserAttribute
-from superset.views.base import json_error_response, get_user_roles
+from superset.utils.core import LRUCache
+from superset.views.base import json_error_response
+
+config = app.config
+stats_logger = config.get("STATS_LOGGER")
+
+# access_key -> (user_id, role names), local to each process: changes made
+# through another process are picked up once the entries expire
+access_key_cache = LRUCache(
+    maxsize=config.get("ACCESS_KEY_CACHE_SIZE"), ttl=config.get("ACCESS_KEY_CACHE_TTL")
+)
+
+
+def clear_access_key_cache(*args, **kwargs):
+    access_key_cache.clear()
+
+
+for model in (UserAttribute, security_manager.user_model, security_manager.role_model):
+    for event_name in ("after_insert", "after_update", "after_delete"):
+        event.listen(model, event_name, clear_access_key_cache)
+
+
+def resolve_access_key(access_key):
+    """Returns the (user_id, role names) tuple of an access key
+
+    Returns None for unknown access keys, and access keys of deleted users,
+    which are not cached.
+    """
+    if config.get("ACCESS_KEY_CACHE_TTL"):
+        resolved = access_key_cache.get(access_key)
+        if resolved:
+            stats_logger.incr("access_key_cache.hit")
+            return resolved
+        stats_logger.incr("access_key_cache.miss")
+
+    session = db.session()
+    user_id = session.query(UserAttribute.user_id).filter_by(access_key=access_key).first()
+    if not user_id:
+        return None
+
+    user = security_manager.get_user_by_id(user_id[0])
+    if not user:
+        return None
+    resolved = (user.id, frozenset(role.name for role in user.roles))
+    if config.get("ACCESS_KEY_CACHE_TTL"):
+        access_key_cache.set(access_key, resolved)
+    return resolved
+
 
 def aics_access_key_verification(require_admin=False):
     def _decorator(func):
@@ -15,21 +62,29 @@ def aics_access_key_verification(require_admin=False):
             req_json = request.get_json()
             access_key: str = req_json.get("access_key")
 
-            session = db.session()
-            user_id: int = session.query(UserAttribute.user_id).filter_by(access_key=access_key).first()
+            resolved = resolve_access_key(access_key)
 
-            if not user_id:
+            if not resolved:
                 err_msg = f"Invalid access_key: {str(access_key)}"
                 logging.warning(err_msg)
                 extra_info = {'err_msg': f'{err_msg}, request: {str(req_json)}'}
 
                 return json_error_response(err_msg), extra_info
 
-            user_id = user_id[0]
+            user_id, role_names = resolved
             extra_info = {'user_id': user_id}
+            # the user is loaded on each request, so that users deactivated or
+            # deleted through another process are rejected right away
             g.user = security_manager.get_user_by_id(user_id)
 
-            if g.user.active == 0:
+            if g.user is None:
+                err_msg = f"Invalid user: user (id: {user_id}) doesn't exist"
+                logging.warning(err_msg)
+                extra_info = {'err_msg': f'{err_msg}, request: {str(req_json)}'}
+
+                return json_error_response(err_msg), extra_info
+
+            if not g.user.active:
                 err_msg = f"Invalid user: {g.user}(id: {user_id}) is inactive"
                 logging.warning(err_msg)
                 extra_info = {'err_msg': f'{err_msg}, request: {str(req_json)}'}
@@ -37,9 +92,7 @@ def aics_access_key_verification(require_admin=False):
                 return json_error_response(err_msg), extra_info
 
             if require_admin:
-                Role = ab_models.Role
-                admin_role = session.query(Role).filter(Role.name == "Admin").one_or_none()
-                if not admin_role in get_user_roles():
+                if "Admin" not in role_names:
                     err_msg = f"Permission denied: {g.user}(id: {user_id}) is not Admin"
                     logging.warning(err_msg)
                     extra_info = {'err_msg': f'{err_msg}, request: {str(req_json)}'}
@@ -19,6 +19,7 @@ import logging
 import re
 from contextlib import closing
 from datetime import datetime, timedelta
+from functools import partial
 from typing import Dict, List, Optional, Union
 from urllib import parse
 
@@ -36,6 +37,7 @@ from flask import (
     render_template,
     request,
     Response,
+    stream_with_context,
     url_for,
 )
 from flask_appbuilder import expose
@@ -81,7 +83,8 @@ from superset.models.user_attributes import UserAttribute
 from superset.models.table_permission import TablePermission
 from superset.sql_parse import ParsedQuery
 from superset.sql_validators import get_validator_by_name
-from superset.utils import core as utils, dashboard_import_export
+from superset.tasks.cache import WarmUpExecutor
+from superset.utils import core as utils, csv as csv_utils, dashboard_import_export
 from superset.utils.dates import now_as_float
 from superset.utils.decorators import etag_cache, stats_timing
 from superset.views.aics_privacy_control.decorators import aics_access_key_verification
@@ -104,16 +107,17 @@ from .base import (
 )
 from .database import api as database_api, views as in_views
 from .utils import (
+    apply_columnar_shape,
     apply_display_max_row_limit,
     bootstrap_user_data,
     get_datasource_info,
     get_form_data,
     get_viz,
+    resolve_form_data,
 )
 
 from clickhouse_driver import Client
 import os
-from time import sleep
 from urllib.parse import urlparse
 
 config = app.config
@@ -204,8 +208,18 @@ def check_slice_perms(self, slice_id):
     security_manager.assert_viz_permission(viz_obj)
 
 
+def _batch_line(index: int, status: int, payload_json: str) -> str:
+    """A line of the response of `explore_json_batch`"""
+    return '{{"index": {}, "status": {}, "payload": {}}}\n'.format(
+        index, status, payload_json
+    )
+
+
 def _deserialize_results_payload(
-    payload: Union[bytes, str], query, use_msgpack: Optional[bool] = False
+    payload: Union[bytes, str],
+    query,
+    use_msgpack: Optional[bool] = False,
+    columnar: bool = False,
 ) -> dict:
     logging.debug(f"Deserializing from msgpack: {use_msgpack}")
     if use_msgpack:
@@ -217,7 +231,18 @@ def _deserialize_results_payload(
         with stats_timing("sqllab.query.results_backend_pa_deserialize", stats_logger):
             df = pa.deserialize(ds_payload["data"])
 
-        # TODO: optimize this, perhaps via df.to_dict, then traversing
+        if columnar:
+            # nested data isn't expanded in the columnar shape
+            ds_payload.update(
+                {
+                    "data": dataframe.SupersetDataFrame.format_columns(df),
+                    "columns": ds_payload["selected_columns"],
+                    "expanded_columns": [],
+                    "dataShape": "columnar",
+                }
+            )
+            return ds_payload
+
         ds_payload["data"] = dataframe.SupersetDataFrame.format_data(df) or []
 
         db_engine_spec = query.database.db_engine_spec
@@ -1017,8 +1042,7 @@ class Superset(BaseSupersetView):
         if samples:
             return self.get_samples(viz_obj)
 
-        payload = viz_obj.get_payload()
-        return data_payload_response(*viz_obj.payload_json_and_has_error(payload))
+        return data_payload_response(*viz_obj.get_payload_json())
 
     @event_logger.log_this
     @api
@@ -1099,6 +1123,123 @@ class Superset(BaseSupersetView):
             viz_obj, csv=csv, query=query, results=results, samples=samples
         )
 
+    @event_logger.log_this
+    @api
+    @has_access_api
+    @handle_api_exception
+    @expose("/explore_json_batch/", methods=["POST"])
+    def explore_json_batch(self):
+        """Serves the payloads of several charts, e.g. those of a dashboard
+
+        The ``form_data`` POST parameter holds a list of form data. The
+        datasource of the charts and the permission to access it are resolved
+        once per datasource, then the charts run on up to
+        ``EXPLORE_JSON_BATCH_MAX_WORKERS`` threads. The response is streamed as
+        newline-delimited JSON, one ``{"index": ..., "status": ...,
+        "payload": ...}`` line per chart as soon as its payload is ready, where
+        ``index`` is the position of the chart in the list and ``status`` the
+        HTTP status `explore_json` would have answered with."""
+        force = request.args.get("force") == "true"
+        try:
+            form_datas = json.loads(request.form.get("form_data") or "[]")
+        except ValueError as e:
+            return json_error_response(utils.error_msg_from_exception(e), status=400)
+        if not isinstance(form_datas, list) or not all(
+            isinstance(form_data, dict) for form_data in form_datas
+        ):
+            return json_error_response(
+                __("The form data must be a list of charts"), status=400
+            )
+
+        datasources: Dict = {}
+        errors = []
+        viz_objs = []
+        for index, form_data in enumerate(form_datas):
+            try:
+                form_data = resolve_form_data(form_data)[0]
+                datasource_id, datasource_type = get_datasource_info(
+                    None, None, form_data
+                )
+                datasource = self._get_batch_datasource(
+                    datasources, datasource_type, datasource_id
+                )
+                viz_type = form_data.get("viz_type", "table")
+                if viz_type not in viz.viz_types:
+                    raise SupersetException(
+                        __("Unknown chart type: %(viz_type)s", viz_type=viz_type)
+                    )
+                viz_obj = viz.viz_types[viz_type](
+                    datasource, form_data=form_data, force=force
+                )
+            except SupersetException as e:
+                logging.exception(e)
+                errors.append((index, e.status, self._batch_error_json(e)))
+            else:
+                viz_objs.append((index, viz_obj))
+
+        def get_payload_line(index, viz_obj):
+            try:
+                payload_json, has_error = viz_obj.get_payload_json()
+                status = 400 if has_error else 200
+            except Exception as e:
+                logging.exception(e)
+                status = getattr(e, "status", 500)
+                payload_json = self._batch_error_json(e)
+            return _batch_line(index, status, payload_json)
+
+        def generate():
+            for index, status, payload_json in errors:
+                yield _batch_line(index, status, payload_json)
+            funcs = [partial(get_payload_line, *item) for item in viz_objs]
+            max_workers = config.get("EXPLORE_JSON_BATCH_MAX_WORKERS")
+            for _index, line in utils.iter_concurrently(funcs, max_workers):
+                yield line
+
+        return Response(
+            stream_with_context(generate()), mimetype="application/x-ndjson"
+        )
+
+    @staticmethod
+    def _get_batch_datasource(datasources, datasource_type, datasource_id):
+        """Returns a datasource the user can access, resolved once per batch"""
+        key = (datasource_type, datasource_id)
+        if key not in datasources:
+            try:
+                datasource = ConnectorRegistry.get_datasource(
+                    datasource_type, datasource_id, db.session
+                )
+                if not datasource:
+                    raise SupersetException(
+                        __("The datasource associated with this chart no longer exists")
+                    )
+                security_manager.assert_datasource_permission(datasource)
+                # load what the charts need from the metadata database
+                # beforehand, the session of the datasource can't be shared
+                # with the threads running them
+                datasource.columns
+                datasource.metrics
+                datasource.database
+                datasources[key] = datasource
+            except KeyError:
+                datasources[key] = SupersetException(
+                    __("Unknown datasource type: %(type)s", type=datasource_type)
+                )
+            except SupersetException as e:
+                datasources[key] = e
+        if isinstance(datasources[key], SupersetException):
+            raise datasources[key]
+        return datasources[key]
+
+    @staticmethod
+    def _batch_error_json(e: Exception) -> str:
+        payload = {
+            "error": utils.error_msg_from_exception(e),
+            "stacktrace": utils.get_stacktrace(),
+        }
+        if getattr(e, "link", None):
+            payload["link"] = e.link
+        return json.dumps(payload, default=utils.json_iso_dttm_ser, ignore_nan=True)
+
     @event_logger.log_this
     @has_access
     @expose("/import_dashboards", methods=["GET", "POST"])
@@ -1957,7 +2098,8 @@ class Superset(BaseSupersetView):
     def warm_up_cache(self):
         """Warms up the cache for the slice or table.
 
-        Note for slices a force refresh occurs.
+        Note for slices a force refresh occurs. The slices of a table are
+        computed concurrently, see `WarmUpExecutor`.
         """
         slices = None
         session = db.session()
@@ -2004,18 +2146,10 @@ class Superset(BaseSupersetView):
                 .all()
             )
 
-        for slc in slices:
-            try:
-                form_data = get_form_data(slc.id, use_slice_data=True)[0]
-                obj = get_viz(
-                    datasource_type=slc.datasource.type,
-                    datasource_id=slc.datasource.id,
-                    form_data=form_data,
-                    force=True,
-                )
-                obj.get_json()
-            except Exception as e:
-                return json_error_response(utils.error_msg_from_exception(e))
+        executor = WarmUpExecutor.from_config(config, force=True)
+        summary = executor.warm_up_charts([(slc, None) for slc in slices])
+        if summary["errors"]:
+            return json_error_response(summary["errors"][0]["error"])
         return json_success(
             json.dumps(
                 [{"slice_id": slc.id, "slice_name": slc.slice_name} for slc in slices]
@@ -2446,15 +2580,17 @@ class Superset(BaseSupersetView):
                 security_manager.get_table_access_error_msg(rejected_tables), status=403
             )
 
+        columnar = request.args.get("dataShape") == "columnar"
         payload = utils.zlib_decompress(blob, decode=not results_backend_use_msgpack)
-        obj = _deserialize_results_payload(payload, query, results_backend_use_msgpack)
+        obj = _deserialize_results_payload(
+            payload, query, results_backend_use_msgpack, columnar
+        )
+        obj = apply_display_max_row_limit(obj)
+        if columnar:
+            obj = apply_columnar_shape(obj)
 
         return json_success(
-            json.dumps(
-                apply_display_max_row_limit(obj),
-                default=utils.json_iso_dttm_ser,
-                ignore_nan=True,
-            )
+            json.dumps(obj, default=utils.json_iso_dttm_ser, ignore_nan=True)
         )
 
     @has_access_api
@@ -2594,13 +2730,18 @@ class Superset(BaseSupersetView):
         return resp
 
     def _sql_json_sync(
-        self, session: Session, rendered_query: str, query: Query
+        self,
+        session: Session,
+        rendered_query: str,
+        query: Query,
+        columnar: bool = False,
     ) -> str:
         """
             Execute SQL query (sql json)
 
         :param rendered_query: The rendered query (included templates)
         :param query: The query SQL (SQLAlchemy) object
+        :param columnar: Whether to lay out the data set column by column
         :return: String JSON response
         """
         try:
@@ -2615,8 +2756,11 @@ class Superset(BaseSupersetView):
                     user_name=g.user.username if g.user else None,
                 )
 
+            data = apply_display_max_row_limit(data)
+            if columnar:
+                data = apply_columnar_shape(data)
             payload = json.dumps(
-                apply_display_max_row_limit(data),
+                data,
                 default=utils.pessimistic_json_iso_dttm_ser,
                 ignore_nan=True,
                 encoding=None,
@@ -2659,6 +2803,7 @@ class Superset(BaseSupersetView):
         client_id: str = request.json.get("client_id") or utils.shortid()[:10]
         sql_editor_id: str = request.json.get("sql_editor_id")
         tab_name: str = request.json.get("tab")
+        columnar: bool = request.json.get("dataShape") == "columnar"
         status: bool = QueryStatus.PENDING if async_flag else QueryStatus.RUNNING
 
         session = db.session()
@@ -2743,7 +2888,10 @@ class Superset(BaseSupersetView):
             return self._sql_json_async(session, rendered_query, query)
         
         # Sync request.
-        return self._sql_json_sync(session, rendered_query, query), extra_info
+        return (
+            self._sql_json_sync(session, rendered_query, query, columnar),
+            extra_info,
+        )
 
     def _streaming_csv(self, query, client_id, extra_info):
 
@@ -2797,6 +2945,7 @@ class Superset(BaseSupersetView):
 
         database = query.database
         db_dialect = re.sub(r':.*', '', database.sqlalchemy_uri)
+        block_size = config.get("CSV_STREAMING_BLOCK_SIZE")
 
         if 'clickhouse' in db_dialect.lower():
             # Fetch Clickhouse secrets from ENVs
@@ -2806,8 +2955,14 @@ class Superset(BaseSupersetView):
             CLICKHOUSE_UNAME = os.environ.get('CLICKHOUSE_UNAME')
             CLICKHOUSE_PWD = os.environ.get('CLICKHOUSE_PWD')
             client = Client(host=CLICKHOUSE_HOST, database=query.schema, user=CLICKHOUSE_UNAME, password=CLICKHOUSE_PWD, port=CLICKHOUSE_PORT)
-            src_data = client.execute_iter(sql, with_column_types=True, settings={'max_block_size': 10000})
-            header_has_type = True
+
+            def generate():
+                # The first item holds the (name, type) tuples of the columns,
+                # rows are then regrouped into blocks of the server block size
+                rows = client.execute_iter(sql, with_column_types=True, settings={'max_block_size': block_size})
+                columns = [col[0] for col in next(rows, [])]
+                yield from csv_utils.stream_csv(columns, csv_utils.chunk_rows(rows, block_size))
+
         else:
             engine = database.get_sqla_engine(
                 schema=query.schema,
@@ -2816,59 +2971,25 @@ class Superset(BaseSupersetView):
                 source=utils.sources.get("sql_lab", None),
             )
 
-            def stream_data_gen():
+            def fetch_blocks(data_stream):
+                chunk = data_stream.fetchmany(block_size)
+                while chunk:
+                    yield chunk
+                    chunk = data_stream.fetchmany(block_size)
+                data_stream.close()
+
+            def generate():
                 # Streaming results at least available for psycopg2, mysqldb and pymysql
                 # TODO: deal with DBAPIs that is not support streaming result
                 # ref: https://docs.sqlalchemy.org/en/13/core/connections.html#sqlalchemy.engine.Connection.execution_options.params.stream_results
                 data_stream = engine.execution_options(stream_results=True).execute(sql)
-                batch=1000
-                data_count = 0
-                chunk = data_stream.fetchmany(batch)
-                # Return header as first row
-                yield data_stream.keys()
-                while chunk:
-                    for row in chunk:
-                        data_count += 1
-                        yield row
-                    chunk = data_stream.fetchmany(batch)
-                data_stream.close()
-
-            header_has_type = False
-            src_data = stream_data_gen()
-
-        # Utilize the generator pattern to stream CSV contents
-        # ref: https://flask.palletsprojects.com/en/1.1.x/patterns/streaming/
-        # ref: https://clickhouse-driver.readthedocs.io/en/latest/quickstart.html#streaming-results
-        def generate(header_has_type):
-
-            for row in src_data:
-                # We add sleep(0) between generator iterations to give the worker a break
-                # to update the heartbeat file and keep the connection and worker process alive.
-                sleep(0)
-                s = ''
-                # Determine whether this row is CSV header(columns) or not
-                if header_has_type:
-                    # Transform headers from a list of tuples to a comma-seperated string
-                    s = ','.join([f'"{col[0]}"' for col in row])
-                    header_has_type = False
-                    yield s+ '\n'
-                    continue
-
-                for item in row:
-                    # Avoid converting None to "None"
-                    if item == None:
-                        s += ','
-                    else:
-                        # Escape double quotes
-                        if '"' in str(item):
-                            item = item.replace('"', '""')
-                        s += f'"{item}",'
-                # Replace the latest "," with newline
-                s = s[:-1] + '\n'
-                yield s
+                yield from csv_utils.stream_csv(data_stream.keys(), fetch_blocks(data_stream))
 
         try:
-            response = Response(generate(header_has_type=header_has_type), mimetype='text/csv')
+            # Utilize the generator pattern to stream CSV contents, one block at a time
+            # ref: https://flask.palletsprojects.com/en/1.1.x/patterns/streaming/
+            # ref: https://clickhouse-driver.readthedocs.io/en/latest/quickstart.html#streaming-results
+            response = Response(generate(), mimetype='text/csv')
         except Exception as e:
             extra_info['err_msg'] = str(e)
 
@@ -85,6 +85,7 @@ class DatabaseMixin:
         "database_name",
         "sqlalchemy_uri",
         "cache_timeout",
+        "cache_max_staleness",
         "expose_in_sqllab",
         "allow_run_async",
         "allow_csv_upload",
@@ -107,6 +108,7 @@ class DatabaseMixin:
     show_columns = [
         "tables",
         "cache_timeout",
+        "cache_max_staleness",
         "extra",
         "database_name",
         "sqlalchemy_uri",
@@ -187,6 +189,12 @@ class DatabaseMixin:
             "A timeout of 0 indicates that the cache never expires. "
             "Note this defaults to the global timeout if undefined."
         ),
+        "cache_max_staleness": _(
+            "Duration (in seconds) during which the cached data of charts of "
+            "this database is still served after its caching timeout, while "
+            "it's refreshed in the background. "
+            "Note this defaults to the global duration if undefined."
+        ),
         "allow_csv_upload": _(
             "If selected, please set the schemas allowed for csv upload in Extra."
         ),
@@ -202,6 +210,7 @@ class DatabaseMixin:
         "changed_on_": _("Last Changed"),
         "sqlalchemy_uri": _("SQLAlchemy URI"),
         "cache_timeout": _("Chart Cache Timeout"),
+        "cache_max_staleness": _("Chart Cache Max Staleness"),
         "extra": _("Extra"),
         "allow_run_async": _("Asynchronous Query Execution"),
         "impersonate_user": _("Impersonate the logged on user"),
@@ -113,6 +113,20 @@ def get_form_data(slice_id=None, use_slice_data=False):
             url_form_data.update(form_data)
             form_data = url_form_data
 
+    return resolve_form_data(form_data, slice_id, use_slice_data)
+
+
+def resolve_form_data(
+    form_data: Dict[str, Any], slice_id=None, use_slice_data: bool = False
+) -> Tuple[Dict[str, Any], Optional[models.Slice]]:
+    """Merges form data with the one of its chart and sets its time range
+
+    :param form_data: The form data sent by the client
+    :param slice_id: The ID of the chart, if not part of the form data
+    :param use_slice_data: Whether to merge the saved form data of the chart
+        even if the form data has other keys than the chart's ID and filters
+    :returns: The resolved form data and the chart, if any
+    """
     form_data = {k: v for k, v in form_data.items() if k not in FORM_DATA_KEY_BLACKLIST}
 
     # When a slice_id is present, load from DB and override
@@ -193,6 +207,35 @@ def apply_display_max_row_limit(sql_results: Dict[str, Any]) -> Dict[str, Any]:
         and sql_results["status"] == QueryStatus.SUCCESS
         and display_limit < sql_results["query"]["rows"]
     ):
-        sql_results["data"] = sql_results["data"][:display_limit]
+        if sql_results.get("dataShape") == "columnar":
+            sql_results["data"] = [
+                values[:display_limit] for values in sql_results["data"]
+            ]
+        else:
+            sql_results["data"] = sql_results["data"][:display_limit]
         sql_results["displayLimitReached"] = True
     return sql_results
+
+
+def apply_columnar_shape(sql_results: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Given a `sql_results` nested structure, lays out its data set column by column
+
+    The list of row dicts under `data` is replaced by one list of values per
+    column, in the order of `columns`, and a `dataShape: "columnar"` flag is added
+    so that clients can tell both shapes apart. Column names are then sent once
+    rather than once per row.
+
+    :param sql_results: The results of a sql query from sql_lab.get_sql_results
+    :returns: The mutated sql_results structure
+    """
+    if (
+        sql_results.get("status") != QueryStatus.SUCCESS
+        or sql_results.get("dataShape") == "columnar"
+    ):
+        return sql_results
+    names = [column["name"] for column in sql_results.get("columns") or []]
+    rows = sql_results.get("data") or []
+    sql_results["data"] = [[row.get(name) for row in rows] for name in names]
+    sql_results["dataShape"] = "columnar"
+    return sql_results
@@ -25,14 +25,13 @@ import hashlib
 import inspect
 import logging
 import math
-import pickle as pkl
 import re
 import uuid
 from collections import defaultdict, OrderedDict
 from datetime import datetime, timedelta
-from functools import reduce
+from functools import partial, reduce
 from itertools import product
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import geohash
 import numpy as np
@@ -48,13 +47,14 @@ from pandas.tseries.frequencies import to_offset
 
 from superset import app, cache, get_css_manifest_files
 from superset.exceptions import NullValueException, SpatialException
-from superset.utils import core as utils
+from superset.utils import cache_codec, clustering, core as utils, single_flight
 from superset.utils.core import (
     DTTM_ALIAS,
     JS_MAX_INTEGER,
     merge_extra_filters,
     to_adhoc,
 )
+from superset.utils.dates import datetime_index_to_epoch, now_as_float
 
 config = app.config
 stats_logger = config.get("STATS_LOGGER")
@@ -73,6 +73,17 @@ METRIC_KEYS = [
 ]
 
 
+def cache_age(cached_dttm: str) -> float:
+    """The age in seconds of data cached at ``cached_dttm``"""
+    age = datetime.utcnow() - datetime.strptime(cached_dttm, "%Y-%m-%dT%H:%M:%S")
+    return age.total_seconds()
+
+
+def refresh_marker_key(cache_key: str) -> str:
+    """The key of the marker of a refresh of the data at ``cache_key``"""
+    return "refreshing_" + cache_key
+
+
 class BaseViz(object):
 
     """All visualizations derive this base class"""
@@ -83,6 +94,9 @@ class BaseViz(object):
     is_timeseries = False
     cache_type = "df"
     enforce_numerical_metrics = True
+    # whether the data of the time series queries of the viz can be cached by
+    # day, see `get_df_incremental`
+    incremental_cache = False
 
     def __init__(self, datasource, form_data, force=False):
         if not datasource:
@@ -338,6 +352,16 @@ class BaseViz(object):
             return self.datasource.database.cache_timeout
         return config.get("CACHE_DEFAULT_TIMEOUT")
 
+    @property
+    def cache_max_staleness(self) -> Optional[int]:
+        """For how long expired data is served while it's refreshed, if at all"""
+        if getattr(self.datasource, "cache_max_staleness", None) is not None:
+            return self.datasource.cache_max_staleness
+        database = getattr(self.datasource, "database", None)
+        if getattr(database, "cache_max_staleness", None) is not None:
+            return database.cache_max_staleness
+        return config.get("CACHE_DEFAULT_MAX_STALENESS")
+
     def get_json(self):
         return json.dumps(
             self.get_payload(), default=utils.json_int_dttm_ser, ignore_nan=True
@@ -362,7 +386,8 @@ class BaseViz(object):
         for k in ["from_dttm", "to_dttm"]:
             del cache_dict[k]
 
-        cache_dict["time_range"] = self.form_data.get("time_range")
+        if "time_range" not in extra:
+            cache_dict["time_range"] = self.form_data.get("time_range")
         cache_dict["datasource"] = self.datasource.uid
         cache_dict["extra_cache_keys"] = self.datasource.get_extra_cache_keys(query_obj)
         json_data = self.json_dumps(cache_dict, sort_keys=True)
@@ -397,24 +422,40 @@ class BaseViz(object):
             cache_value = cache.get(cache_key)
             if cache_value:
                 stats_logger.incr("loaded_from_cache")
-                try:
-                    cache_value = pkl.loads(cache_value)
-                    df = cache_value["df"]
-                    self.query = cache_value["query"]
-                    self._any_cached_dttm = cache_value["dttm"]
-                    self._any_cache_key = cache_key
-                    self.status = utils.QueryStatus.SUCCESS
-                    is_loaded = True
-                except Exception as e:
-                    logging.exception(e)
-                    logging.error(
-                        "Error reading cache: " + utils.error_msg_from_exception(e)
-                    )
+                is_loaded, df = self._load_cache_value(cache_key, cache_value)
                 logging.info("Serving from cache")
 
+        lock_token = None
+        if (
+            query_obj
+            and not is_loaded
+            and cache_key
+            and cache
+            and not self.force
+            and config.get("CHART_SINGLE_FLIGHT_ENABLED")
+        ):
+            # let a single process run the query while the others wait for
+            # its results to be cached
+            lock_token = single_flight.acquire(
+                cache, cache_key, config.get("CHART_SINGLE_FLIGHT_LOCK_TIMEOUT")
+            )
+            if lock_token is None:
+                start = now_as_float()
+                cache_value = single_flight.wait(
+                    cache, cache_key, config.get("CHART_SINGLE_FLIGHT_WAIT_TIMEOUT")
+                )
+                stats_logger.timing("single_flight.wait", now_as_float() - start)
+                if cache_value:
+                    is_loaded, df = self._load_cache_value(cache_key, cache_value)
+                if is_loaded:
+                    stats_logger.incr("single_flight.coalesced")
+                else:
+                    # the query failed or is taking too long, run it as well
+                    stats_logger.incr("single_flight.fallback")
+
         if query_obj and not is_loaded:
             try:
-                df = self.get_df(query_obj)
+                df = self.get_df_incremental(query_obj)
                 if self.status != utils.QueryStatus.FAILED:
                     stats_logger.incr("loaded_from_source")
                     is_loaded = True
@@ -437,20 +478,30 @@ class BaseViz(object):
                         df=df if df is not None else None,
                         query=self.query,
                     )
-                    cache_value = pkl.dumps(cache_value, protocol=pkl.HIGHEST_PROTOCOL)
+                    cache_value = cache_codec.dumps(
+                        cache_value,
+                        config.get("CHART_CACHE_CODEC"),
+                        config.get("CHART_CACHE_COMPRESSION"),
+                    )
 
                     logging.info(
                         "Caching {} chars at key {}".format(len(cache_value), cache_key)
                     )
 
                     stats_logger.incr("set_cache_key")
-                    cache.set(cache_key, cache_value, timeout=self.cache_timeout)
+                    timeout = self.cache_timeout
+                    if timeout and self.cache_max_staleness:
+                        # keep the data around to serve it while it's refreshed
+                        timeout += self.cache_max_staleness
+                    cache.set(cache_key, cache_value, timeout=timeout)
                 except Exception as e:
                     # cache.set call can fail if the backend is down or if
                     # the key is too large or whatever other reasons
                     logging.warning("Could not cache key {}".format(cache_key))
                     logging.exception(e)
                     cache.delete(cache_key)
+            if lock_token:
+                single_flight.release(cache, cache_key, lock_token)
         return {
             "cache_key": self._any_cache_key,
             "cached_dttm": self._any_cached_dttm,
@@ -465,6 +516,298 @@ class BaseViz(object):
             "rowcount": len(df.index) if df is not None else 0,
         }
 
+    def get_df_payloads(self, queries):
+        """Runs independent queries concurrently, handling caching around each
+
+        :param queries: The query objects along with the extra arguments of
+            their cache keys, as passed to `get_df_payload`
+        :returns: The df payloads of the queries, in order
+
+        The queries run on copies of the viz, the status, the errors, the
+        queries and the cache status of which are merged back into the viz
+        once they're all done.
+        """
+        if not queries:
+            return []
+
+        # load what the queries need from the metadata database beforehand,
+        # the session of the datasource can't be shared with the threads
+        self.datasource.columns
+        self.datasource.metrics
+        self.datasource.database
+
+        viz_objs = [copy.copy(self) for _ in queries]
+        payloads = utils.run_concurrently(
+            [
+                partial(viz_obj.get_df_payload, qry, **kwargs)
+                for viz_obj, (qry, kwargs) in zip(viz_objs, queries)
+            ],
+            config.get("EXTRA_QUERIES_MAX_WORKERS"),
+        )
+
+        self.status = utils.QueryStatus.SUCCESS
+        self.error_message = None
+        for viz_obj in viz_objs:
+            if viz_obj.status == utils.QueryStatus.FAILED:
+                self.status = utils.QueryStatus.FAILED
+                self.error_message = self.error_message or viz_obj.error_message
+            if viz_obj._any_cache_key:
+                self._some_from_cache = True
+                self._any_cache_key = viz_obj._any_cache_key
+                self._any_cached_dttm = viz_obj._any_cached_dttm
+        self.query = ";\n\n".join(
+            viz_obj.query for viz_obj in viz_objs if viz_obj.query
+        )
+        return payloads
+
+    def get_partitions(
+        self, query_obj: Dict[str, Any]
+    ) -> Optional[List[Tuple[datetime, datetime]]]:
+        """The days the data of ``query_obj`` is cached by, if it can be
+
+        The first and last days are cut to the time range of the query. Data
+        can be cached by day when the query groups it by a time grain of a
+        day or less, all the groups of a day then being found in that day.
+
+        :returns: The bounds of the days, None if the data can't be cached
+            by day or spans a single day
+        """
+        if not (
+            self.incremental_cache
+            and cache
+            and config.get("CHART_INCREMENTAL_CACHE_ENABLED")
+            and self.datasource.type == "table"
+            and query_obj.get("is_timeseries")
+            and query_obj.get("granularity")
+            and not query_obj.get("timeseries_limit")
+        ):
+            return None
+        from_dttm = query_obj.get("from_dttm")
+        to_dttm = query_obj.get("to_dttm")
+        if not from_dttm or not to_dttm or from_dttm.tzinfo or to_dttm.tzinfo:
+            return None
+        time_grain = (query_obj.get("extras") or {}).get("time_grain_sqla")
+        if time_grain and time_grain != "P1D" and not time_grain.startswith("PT"):
+            return None
+
+        bounds = [from_dttm]
+        day = datetime.combine(from_dttm.date(), datetime.min.time())
+        day += timedelta(days=1)
+        while day < to_dttm:
+            bounds.append(day)
+            day += timedelta(days=1)
+        bounds.append(to_dttm)
+        if len(bounds) < 3:
+            return None
+        return list(zip(bounds[:-1], bounds[1:]))
+
+    def get_df_incremental(self, query_obj: Dict[str, Any]) -> Optional[pd.DataFrame]:
+        """Returns the dataframe of ``query_obj``, querying only the days
+        missing from the cache when its data can be cached by day
+
+        Consecutive missing days are queried at once, and the days that
+        ended less than ``CHART_INCREMENTAL_CACHE_LAG`` seconds ago are
+        always queried. Days queried along with others that reach the row
+        limit aren't cached, and the whole time range is queried again if the
+        merged data reaches it, as the days might have been truncated.
+        """
+        partitions = self.get_partitions(query_obj)
+        if not partitions:
+            return self.get_df(query_obj)
+
+        keys = [
+            self.cache_key(
+                query_obj,
+                partition=[start.isoformat(), end.isoformat()],
+                time_range=None,
+                time_shift=str(self.time_shift),
+            )
+            for start, end in partitions
+        ]
+        settled_dttm = datetime.now() - timedelta(
+            seconds=config.get("CHART_INCREMENTAL_CACHE_LAG") or 0
+        )
+        settled = [end <= settled_dttm for _, end in partitions]
+
+        values: List[Optional[Dict[str, Any]]] = [None] * len(partitions)
+        if not self.force:
+            try:
+                cache_values = cache.get_many(*keys)
+            except Exception as e:
+                logging.exception(e)
+                cache_values = []
+            for i, cache_value in enumerate(cache_values):
+                if cache_value and settled[i]:
+                    try:
+                        values[i] = cache_codec.loads(cache_value)
+                        stats_logger.incr("loaded_partition_from_cache")
+                    except Exception as e:
+                        logging.exception(e)
+
+        row_limit = query_obj.get("row_limit")
+        sources = len(partitions) - values.count(None)
+        start = 0
+        while start < len(partitions):
+            if values[start] is not None:
+                start += 1
+                continue
+            end = start
+            while end < len(partitions) and values[end] is None:
+                end += 1
+            qry = dict(
+                query_obj,
+                from_dttm=partitions[start][0],
+                to_dttm=partitions[end - 1][1],
+            )
+            df = self.get_df(qry)
+            if self.status == utils.QueryStatus.FAILED:
+                return df
+            cached_dttm = datetime.utcnow().isoformat().split(".")[0]
+            sources += 1
+            dfs = self.split_by_partition(df, partitions[start:end])
+            is_cacheable = dfs is not None and not (
+                row_limit and len(df.index) >= row_limit
+            )
+            if dfs is None:
+                dfs = [df] + [None] * (end - start - 1)
+            for i, partition_df in enumerate(dfs, start):
+                stats_logger.incr("loaded_partition_from_source")
+                values[i] = dict(dttm=cached_dttm, df=partition_df, query=self.query)
+                if not (is_cacheable and settled[i]):
+                    continue
+                try:
+                    cache_value = cache_codec.dumps(
+                        values[i],
+                        config.get("CHART_CACHE_CODEC"),
+                        config.get("CHART_CACHE_COMPRESSION"),
+                    )
+                    cache.set(keys[i], cache_value, timeout=self.cache_timeout)
+                except Exception as e:
+                    logging.warning("Could not cache key {}".format(keys[i]))
+                    logging.exception(e)
+            start = end
+
+        dfs = [value["df"] for value in values if value["df"] is not None]
+        # empty days are left out, their columns not being typed
+        non_empty_dfs = [df for df in dfs if not df.empty]
+        if non_empty_dfs:
+            df = pd.concat(non_empty_dfs, ignore_index=True)
+        else:
+            df = dfs[0] if dfs else None
+        if sources > 1 and df is not None and row_limit and len(df.index) >= row_limit:
+            return self.get_df(query_obj)
+
+        queries = []
+        for value in values:
+            if value["query"] and value["query"] not in queries:
+                queries.append(value["query"])
+        self.query = ";\n\n".join(queries)
+        self.status = utils.QueryStatus.SUCCESS
+        return df
+
+    def split_by_partition(
+        self, df: Optional[pd.DataFrame], partitions: List[Tuple[datetime, datetime]]
+    ) -> Optional[List[pd.DataFrame]]:
+        """Splits the dataframe of a query on consecutive days by day
+
+        Rows go to the day their timestamp, before the offset of the
+        datasource and the time shift, falls in.
+
+        :returns: The dataframes of the days, None if ``df`` has no timestamps
+        """
+        if df is None or DTTM_ALIAS not in df.columns:
+            return None
+        if df.empty:
+            # the timestamps of empty results aren't converted by `get_df`
+            return [df] * len(partitions)
+        dttm = df[DTTM_ALIAS]
+        if dttm.dt.tz is not None:
+            dttm = dttm.dt.tz_localize(None)
+        dttm = dttm - timedelta(hours=self.datasource.offset or 0) - self.time_shift
+        starts = np.array([start for start, _ in partitions], dtype="datetime64[ns]")
+        positions = np.searchsorted(starts, dttm.values, side="right") - 1
+        positions = np.clip(positions, 0, len(partitions) - 1)
+        return [
+            df[positions == i].reset_index(drop=True) for i in range(len(partitions))
+        ]
+
+    def _load_cache_value(self, cache_key, cache_value):
+        """Loads the data cached at ``cache_key``
+
+        :returns: Whether the data could be loaded, and its dataframe
+        """
+        try:
+            cache_value = cache_codec.loads(cache_value)
+        except Exception as e:
+            logging.exception(e)
+            logging.error("Error reading cache: " + utils.error_msg_from_exception(e))
+            return False, None
+
+        max_staleness = self.cache_max_staleness
+        if self.cache_timeout and max_staleness:
+            staleness = cache_age(cache_value["dttm"]) - self.cache_timeout
+            if staleness > max_staleness:
+                return False, None
+            if staleness > 0:
+                stats_logger.incr("loaded_stale_from_cache")
+                self.refresh_cache(cache_key)
+
+        self.query = cache_value["query"]
+        self._any_cached_dttm = cache_value["dttm"]
+        self._any_cache_key = cache_key
+        self.status = utils.QueryStatus.SUCCESS
+        return True, cache_value["df"]
+
+    def is_cache_fresh(self) -> bool:
+        """Whether the data of the main query of the chart is cached and fresh"""
+        query_obj = self.query_obj()
+        if not cache or not query_obj:
+            return False
+        cache_value = cache.get(self.cache_key(query_obj))
+        if not cache_value:
+            return False
+        if not (self.cache_timeout and self.cache_max_staleness):
+            # the data is evicted once it expires
+            return True
+        cached_dttm = cache_codec.loads(cache_value)["dttm"]
+        return cache_age(cached_dttm) <= self.cache_timeout
+
+    def get_cache_age(self) -> Optional[float]:
+        """The age in seconds of the cached data of the main query of the chart
+
+        :returns: The age, or None if the data isn't cached
+        """
+        query_obj = self.query_obj()
+        if not cache or not query_obj:
+            return None
+        cache_value = cache.get(self.cache_key(query_obj))
+        if not cache_value:
+            return None
+        return cache_age(cache_codec.loads(cache_value)["dttm"])
+
+    def refresh_cache(self, cache_key: str) -> None:
+        """Queues a refresh of the data of the chart, unless one is in progress
+
+        The refresh-in-progress marker stored next to ``cache_key`` expires
+        after ``CHART_CACHE_REFRESH_TIMEOUT`` seconds, should the refresh fail.
+        """
+        marker_key = refresh_marker_key(cache_key)
+        timeout = config.get("CHART_CACHE_REFRESH_TIMEOUT")
+        try:
+            if not cache.add(marker_key, True, timeout=timeout):
+                return
+            # imported here to avoid a circular import
+            from superset.tasks.cache import refresh_chart_data
+
+            refresh_chart_data.delay(
+                self.datasource.type, self.datasource.id, self.form_data, cache_key
+            )
+            stats_logger.incr("queued_cache_refresh")
+        except Exception as e:
+            logging.warning("Could not refresh key {}".format(cache_key))
+            logging.exception(e)
+            cache.delete(marker_key)
+
     def json_dumps(self, obj, sort_keys=False):
         return json.dumps(
             obj, default=utils.json_int_dttm_ser, ignore_nan=True, sort_keys=sort_keys
@@ -477,6 +820,83 @@ class BaseViz(object):
         )
         return self.json_dumps(payload), has_error
 
+    def payload_cache_key(self, cache_key: str) -> str:
+        """The key of the serialized payload built from the data at ``cache_key``
+
+        The payload also depends on the post-processing parameters, which
+        are all part of the form data.
+        """
+        cache_dict = {
+            "cache_key": cache_key,
+            "viz_type": self.viz_type,
+            "form_data": self.form_data,
+        }
+        json_data = self.json_dumps(cache_dict, sort_keys=True)
+        return "payload_" + hashlib.md5(json_data.encode("utf-8")).hexdigest()
+
+    def get_payload_json(self) -> Tuple[str, bool]:
+        """Returns the serialized payload and whether it holds an error
+
+        When ``CHART_PAYLOAD_CACHE_ENABLED`` is set, successful payloads are
+        cached once serialized, for as long as the data they were built from,
+        so that requests for the same chart, POST ones included, skip the
+        post-processing and the serialization. Forced requests rebuild them.
+        """
+        query_obj = None
+        if cache and config.get("CHART_PAYLOAD_CACHE_ENABLED"):
+            query_obj = self.query_obj()
+        if not query_obj:
+            return self.payload_json_and_has_error(self.get_payload(query_obj))
+
+        payload_key = self.payload_cache_key(self.cache_key(query_obj))
+        if not self.force:
+            try:
+                cache_value = cache.get(payload_key)
+            except Exception as e:
+                logging.exception(e)
+                cache_value = None
+            if cache_value:
+                stats_logger.incr("loaded_payload_from_cache")
+                cache_key, cached_dttm, payload_json = cache_value
+                fields = {
+                    "cache_key": cache_key,
+                    "cached_dttm": cached_dttm,
+                    "is_cached": True,
+                }
+                return self._prepend_json_fields(fields, payload_json), False
+
+        payload = self.get_payload(query_obj)
+        fields = {
+            k: payload.pop(k, None) for k in ("cache_key", "cached_dttm", "is_cached")
+        }
+        payload_json, has_error = self.payload_json_and_has_error(payload)
+        cached_dttm = (
+            fields["cached_dttm"] or datetime.utcnow().isoformat().split(".")[0]
+        )
+        cache_timeout = timeout = self.cache_timeout
+        if cache_timeout:
+            # don't outlive the data the payload was built from
+            timeout = int(cache_timeout - cache_age(cached_dttm))
+        if not has_error and (not cache_timeout or timeout > 0):
+            try:
+                stats_logger.incr("set_payload_cache_key")
+                cache.set(
+                    payload_key,
+                    (fields["cache_key"], cached_dttm, payload_json),
+                    timeout=timeout,
+                )
+            except Exception as e:
+                logging.warning("Could not cache key {}".format(payload_key))
+                logging.exception(e)
+        return self._prepend_json_fields(fields, payload_json), has_error
+
+    def _prepend_json_fields(self, fields: Dict[str, Any], payload_json: str) -> str:
+        """Adds ``fields`` to a serialized object without parsing it again"""
+        fields_json = self.json_dumps(fields)
+        if payload_json == "{}":
+            return fields_json
+        return fields_json[:-1] + ", " + payload_json[1:]
+
     @property
     def data(self):
         """This is the data object serialized to the js layer"""
@@ -1085,8 +1505,13 @@ class NVD3TimeSeriesViz(NVD3Viz):
     verbose_name = _("Time Series - Line Chart")
     sort_series = False
     is_timeseries = True
+    incremental_cache = True
 
-    def to_series(self, df, classed="", title_suffix=""):
+    def iter_series(self, df, title_suffix=""):
+        """Yields the title and the values of the numeric series of ``df``
+
+        Series without any non null value are skipped.
+        """
         cols = []
         for col in df.columns:
             if col == "":
@@ -1096,12 +1521,15 @@ class NVD3TimeSeriesViz(NVD3Viz):
             else:
                 cols.append(col)
         df.columns = cols
-        series = df.to_dict("series")
 
-        chart_data = []
-        for name in df.T.index.tolist():
-            ys = series[name]
-            if df[name].dtype.kind not in "biufc":
+        for name in df.columns:
+            values = df[name].values
+            if values.dtype.kind not in "biufc":
+                continue
+            if values.dtype.kind in "fc":
+                if np.isnan(values).all():
+                    continue
+            elif not len(values):
                 continue
             if isinstance(name, list):
                 series_title = [str(title) for title in name]
@@ -1121,25 +1549,39 @@ class NVD3TimeSeriesViz(NVD3Viz):
                     series_title = (series_title, title_suffix)
                 elif isinstance(series_title, (list, tuple)):
                     series_title = series_title + (title_suffix,)
+            yield series_title, values
 
-            values = []
-            non_nan_cnt = 0
-            for ds in df.index:
-                if ds in ys:
-                    d = {"x": ds, "y": ys[ds]}
-                    if not np.isnan(ys[ds]):
-                        non_nan_cnt += 1
-                else:
-                    d = {}
-                values.append(d)
+    def to_series(self, df, classed="", title_suffix=""):
+        chart_data = []
+        xs = df.index.tolist()
+        for series_title, values in self.iter_series(df, title_suffix):
+            d = {
+                "key": series_title,
+                "values": [{"x": x, "y": y} for x, y in zip(xs, values.tolist())],
+            }
+            if classed:
+                d["classed"] = classed
+            chart_data.append(d)
+        return chart_data
 
-            if non_nan_cnt == 0:
-                continue
+    def to_columnar_series(self, df, x_arrays, classed="", title_suffix=""):
+        """Columnar counterpart of `to_series`
 
-            d = {"key": series_title, "values": values}
+        Instead of a list of points, each series has a ``y`` array and the
+        index in ``x_arrays`` of the ``x`` array it shares with the other
+        series of ``df``, which is appended to ``x_arrays``.
+        """
+        chart_data = []
+        for series_title, values in self.iter_series(df, title_suffix):
+            d = {"key": series_title, "x": len(x_arrays), "y": values.tolist()}
             if classed:
                 d["classed"] = classed
             chart_data.append(d)
+        if chart_data:
+            if isinstance(df.index, pd.DatetimeIndex):
+                x_arrays.append(datetime_index_to_epoch(df.index).tolist())
+            else:
+                x_arrays.append(df.index.tolist())
         return chart_data
 
     def process_data(self, df, aggregate=False):
@@ -1202,6 +1644,7 @@ class NVD3TimeSeriesViz(NVD3Viz):
         if not isinstance(time_compare, list):
             time_compare = [time_compare]
 
+        queries = []
         for option in time_compare:
             query_object = self.query_obj()
             delta = utils.parse_past_timedelta(option)
@@ -1217,25 +1660,33 @@ class NVD3TimeSeriesViz(NVD3Viz):
                 )
             query_object["from_dttm"] -= delta
             query_object["to_dttm"] -= delta
+            queries.append((query_object, {"time_compare": option}))
 
-            df2 = self.get_df_payload(query_object, time_compare=option).get("df")
+        payloads = self.get_df_payloads(queries)
+        for option, payload in zip(time_compare, payloads):
+            df2 = payload.get("df")
             if df2 is not None and DTTM_ALIAS in df2:
                 label = "{} offset".format(option)
-                df2[DTTM_ALIAS] += delta
+                df2[DTTM_ALIAS] += utils.parse_past_timedelta(option)
                 df2 = self.process_data(df2)
                 self._extra_chart_data.append((label, df2))
 
     def get_data(self, df):
         fd = self.form_data
         comparison_type = fd.get("comparison_type") or "values"
+        x_arrays = []
+        if fd.get("columnar_series"):
+            to_series = partial(self.to_columnar_series, x_arrays=x_arrays)
+        else:
+            to_series = self.to_series
         df = self.process_data(df)
         if comparison_type == "values":
             # Filter out series with all NaN
-            chart_data = self.to_series(df.dropna(axis=1, how="all"))
+            chart_data = to_series(df.dropna(axis=1, how="all"))
 
             for i, (label, df2) in enumerate(self._extra_chart_data):
                 chart_data.extend(
-                    self.to_series(
+                    to_series(
                         df2, classed="time-shift-{}".format(i), title_suffix=label
                     )
                 )
@@ -1265,13 +1716,15 @@ class NVD3TimeSeriesViz(NVD3Viz):
                 diff = diff[diff.first_valid_index() : diff.last_valid_index()]
 
                 chart_data.extend(
-                    self.to_series(
+                    to_series(
                         diff, classed="time-shift-{}".format(i), title_suffix=label
                     )
                 )
 
         if not self.sort_series:
             chart_data = sorted(chart_data, key=lambda x: tuple(x["key"]))
+        if fd.get("columnar_series"):
+            return {"x": x_arrays, "series": chart_data}
         return chart_data
 
 
@@ -1802,18 +2255,23 @@ class FilterBoxViz(BaseViz):
         qry = super().query_obj()
         filters = self.form_data.get("filter_configs") or []
         qry["row_limit"] = self.filter_row_limit
-        self.dataframes = {}
+        cols = []
+        queries = []
         for flt in filters:
             col = flt.get("column")
             if not col:
                 raise Exception(
                     _("Invalid filter configuration, please select a column")
                 )
-            qry["groupby"] = [col]
             metric = flt.get("metric")
-            qry["metrics"] = [metric] if metric else []
-            df = self.get_df_payload(query_obj=qry).get("df")
-            self.dataframes[col] = df
+            cols.append(col)
+            queries.append(
+                (dict(qry, groupby=[col], metrics=[metric] if metric else []), {})
+            )
+        payloads = self.get_df_payloads(queries)
+        self.dataframes = {
+            col: payload.get("df") for col, payload in zip(cols, payloads)
+        }
 
     def get_data(self, df):
         filters = self.form_data.get("filter_configs") or []
@@ -2009,52 +2467,148 @@ class MapboxViz(BaseViz):
                 )
         return d
 
+    # limiting geo precision as long decimal values trigger issues
+    # around json-bignumber in Mapbox
+    GEO_PRECISION = 10
+
+    @classmethod
+    def round_coordinates(cls, column):
+        return [round(value, cls.GEO_PRECISION) for value in column.tolist()]
+
+    @staticmethod
+    def get_geo_json(lons, lats, metrics, radii):
+        return {
+            "type": "FeatureCollection",
+            "features": [
+                {
+                    "type": "Feature",
+                    "properties": {"metric": metric, "radius": radius},
+                    "geometry": {"type": "Point", "coordinates": [lon, lat]},
+                }
+                for lon, lat, metric, radius in zip(lons, lats, metrics, radii)
+            ],
+        }
+
+    def get_clusters(self, lons, lats, metrics, radii):
+        """GeoJSON collections of the clusters of points of each zoom level
+
+        The clusters are cached next to the data they're built from. Clusters
+        of a single point are that point, the others have the number of
+        their points and the aggregate of their metrics.
+        """
+        fd = self.form_data
+        max_zoom = config.get("MAPBOX_CLUSTERING_MAX_ZOOM")
+        radius = int(fd.get("clustering_radius"))
+        aggregator = fd.get("pandas_aggfunc")
+        clusters_key = None
+        query_obj = self.query_obj()
+        if cache and query_obj:
+            cache_dict = {
+                "cache_key": self.cache_key(query_obj),
+                "max_zoom": max_zoom,
+                "radius": radius,
+                "aggregator": aggregator,
+                "columns": [
+                    fd.get("all_columns_x"),
+                    fd.get("all_columns_y"),
+                    fd.get("mapbox_label"),
+                    fd.get("point_radius"),
+                ],
+            }
+            json_data = self.json_dumps(cache_dict, sort_keys=True)
+            clusters_key = (
+                "mapbox_clusters_" + hashlib.md5(json_data.encode("utf-8")).hexdigest()
+            )
+            if not self.force:
+                try:
+                    clusters = cache.get(clusters_key)
+                except Exception as e:
+                    logging.exception(e)
+                    clusters = None
+                if clusters:
+                    stats_logger.incr("loaded_clusters_from_cache")
+                    return clusters
+
+        point_lons = np.array(lons, dtype=float)
+        point_lats = np.array(lats, dtype=float)
+        point_metrics = pd.to_numeric(pd.Series(metrics), errors="coerce").values
+        levels = clustering.cluster_points(
+            point_lons,
+            point_lats,
+            point_metrics.astype(float),
+            radius,
+            max_zoom=max_zoom,
+        )
+        clusters = {}
+        for zoom, level in levels.items():
+            points = level["point"].tolist()
+            cluster_lons = np.round(
+                clustering.x_lng(level["x"].values), self.GEO_PRECISION
+            )
+            cluster_lats = np.round(
+                clustering.y_lat(level["y"].values), self.GEO_PRECISION
+            )
+            cluster_metrics = clustering.aggregate_metric(level, aggregator).tolist()
+            geo_json = self.get_geo_json(
+                [
+                    lons[point] if point >= 0 else lon
+                    for point, lon in zip(points, cluster_lons.tolist())
+                ],
+                [
+                    lats[point] if point >= 0 else lat
+                    for point, lat in zip(points, cluster_lats.tolist())
+                ],
+                [
+                    metrics[point] if point >= 0 else metric
+                    for point, metric in zip(points, cluster_metrics)
+                ],
+                [radii[point] if point >= 0 else None for point in points],
+            )
+            for feature, point, count in zip(
+                geo_json["features"], points, level["point_count"].tolist()
+            ):
+                if point < 0:
+                    feature["properties"]["cluster"] = True
+                    feature["properties"]["point_count"] = count
+            clusters[zoom] = geo_json
+
+        if clusters_key:
+            try:
+                cache.set(clusters_key, clusters, timeout=self.cache_timeout)
+            except Exception as e:
+                logging.warning("Could not cache key {}".format(clusters_key))
+                logging.exception(e)
+        return clusters
+
     def get_data(self, df):
         if df is None:
             return None
         fd = self.form_data
         label_col = fd.get("mapbox_label")
         has_custom_metric = label_col is not None and len(label_col) > 0
-        metric_col = [None] * len(df.index)
+        metrics = [None] * len(df.index)
         if has_custom_metric:
             if label_col[0] == fd.get("all_columns_x"):
-                metric_col = df[fd.get("all_columns_x")]
+                metrics = df[fd.get("all_columns_x")].tolist()
             elif label_col[0] == fd.get("all_columns_y"):
-                metric_col = df[fd.get("all_columns_y")]
+                metrics = df[fd.get("all_columns_y")].tolist()
             else:
-                metric_col = df[label_col[0]]
-        point_radius_col = (
+                metrics = df[label_col[0]].tolist()
+        radii = (
             [None] * len(df.index)
             if fd.get("point_radius") == "Auto"
-            else df[fd.get("point_radius")]
+            else df[fd.get("point_radius")].tolist()
         )
 
-        # limiting geo precision as long decimal values trigger issues
-        # around json-bignumber in Mapbox
-        GEO_PRECISION = 10
-        # using geoJSON formatting
-        geo_json = {
-            "type": "FeatureCollection",
-            "features": [
-                {
-                    "type": "Feature",
-                    "properties": {"metric": metric, "radius": point_radius},
-                    "geometry": {
-                        "type": "Point",
-                        "coordinates": [
-                            round(lon, GEO_PRECISION),
-                            round(lat, GEO_PRECISION),
-                        ],
-                    },
-                }
-                for lon, lat, metric, point_radius in zip(
-                    df[fd.get("all_columns_x")],
-                    df[fd.get("all_columns_y")],
-                    metric_col,
-                    point_radius_col,
-                )
-            ],
-        }
+        lons = self.round_coordinates(df[fd.get("all_columns_x")])
+        lats = self.round_coordinates(df[fd.get("all_columns_y")])
+        clusters = None
+        if fd.get("server_side_clustering") and int(fd.get("clustering_radius") or 0):
+            clusters = self.get_clusters(lons, lats, metrics, radii)
+            geo_json = None
+        else:
+            # using geoJSON formatting
+            geo_json = self.get_geo_json(lons, lats, metrics, radii)
 
         x_series, y_series = df[fd.get("all_columns_x")], df[fd.get("all_columns_y")]
         south_west = [x_series.min(), y_series.min()]
@@ -2062,6 +2616,7 @@ class MapboxViz(BaseViz):
 
         return {
             "geoJSON": geo_json,
+            "clusters": clusters,
             "hasCustomMetric": has_custom_metric,
             "mapboxApiKey": config.get("MAPBOX_API_KEY"),
             "mapStyle": fd.get("mapbox_style"),
@@ -2103,6 +2658,14 @@ class DeckGLMultiLayer(BaseViz):
         }
 
 
+# the values of the characters of geohashes indexed by their ASCII codes, -1
+# for the characters geohashes can't contain
+GEOHASH_BASE32_VALUES = np.full(128, -1, dtype=np.int64)
+GEOHASH_BASE32_VALUES[
+    np.frombuffer(b"0123456789bcdefghjkmnpqrstuvwxyz", dtype=np.uint8)
+] = np.arange(32)
+
+
 class BaseDeckGLViz(BaseViz):
 
     """Base class for deck.gl visualizations"""
@@ -2140,11 +2703,83 @@ class BaseDeckGLViz(BaseViz):
         except Exception:
             raise SpatialException(_("Invalid spatial point encountered: %s" % s))
 
+    @classmethod
+    def parse_coordinates_column(cls, column):
+        """Vectorized `parse_coordinates`
+
+        Points made of a latitude and a longitude in decimal degrees are
+        parsed at once, the other formats are left to geopy.
+        """
+        coordinates = (
+            column.astype(str)
+            .str.extract(
+                r"^\s*([-+]?\d+(?:\.\d+)?)\s*[,;\s]\s*([-+]?\d+(?:\.\d+)?)\s*$"
+            )
+            .astype(float)
+        )
+        # geopy normalizes -0 to 0
+        lat = coordinates[0].values + 0.0
+        lon = coordinates[1].values + 0.0
+        # geopy rejects or normalizes the coordinates at and beyond the limits
+        parsed = column.notnull().values & (np.abs(lat) < 90) & (np.abs(lon) < 180)
+        points = pd.Series(
+            list(zip(lat.tolist(), lon.tolist())), dtype=object
+        ).to_numpy(copy=True)
+        if not parsed.all():
+            points[~parsed] = column[~parsed].apply(cls.parse_coordinates).values
+        return pd.Series(points, index=column.index)
+
     @staticmethod
     def reverse_geohash_decode(geohash_code):
         lat, lng = geohash.decode(geohash_code)
         return (lng, lat)
 
+    @classmethod
+    def reverse_geohash_decode_column(cls, column):
+        """Vectorized `reverse_geohash_decode`
+
+        Geohashes of up to 12 characters are decoded at once, their 60 bits
+        fitting in integers, the longer or invalid ones one by one.
+        """
+        codes = column.astype(str)
+        lengths = codes.str.len().values
+        codes = codes.values
+        decodable = column.notnull().values & (lengths >= 1) & (lengths <= 12)
+        points = np.full(len(column), None, dtype=object)
+        for length in np.unique(lengths[decodable]).astype(int):
+            (rows,) = np.nonzero(decodable & (lengths == length))
+            # the characters that aren't ASCII are replaced by invalid ones
+            chars = np.frombuffer(
+                "".join(codes[rows]).encode("ascii", "replace"), dtype=np.uint8
+            ).reshape(-1, length)
+            values = GEOHASH_BASE32_VALUES[chars]
+            invalid = (values < 0).any(axis=1)
+            decodable[rows[invalid]] = False
+            rows = rows[~invalid]
+            values = values[~invalid]
+            lat = np.zeros(len(values), dtype=np.int64)
+            lon = np.zeros(len(values), dtype=np.int64)
+            # the bits alternate between the longitude and the latitude
+            for i in range(length * 5):
+                bit = (values[:, i // 5] >> (4 - i % 5)) & 1
+                if i % 2:
+                    lat = (lat << 1) | bit
+                else:
+                    lon = (lon << 1) | bit
+            lat_bits = length * 5 // 2
+            lon_bits = length * 5 - lat_bits
+            # the center of the cells, as computed by geohash.decode
+            lat = 180.0 * ((lat << 1) + 1 - (1 << lat_bits)) / (1 << (lat_bits + 1))
+            lon = 360.0 * ((lon << 1) + 1 - (1 << lon_bits)) / (1 << (lon_bits + 1))
+            points[rows] = pd.Series(
+                list(zip(lon.tolist(), lat.tolist())), dtype=object
+            ).values
+        if not decodable.all():
+            points[~decodable] = (
+                column[~decodable].map(cls.reverse_geohash_decode).values
+            )
+        return pd.Series(points, index=column.index)
+
     @staticmethod
     def reverse_latlong(df, key):
         df[key] = [tuple(reversed(o)) for o in df[key] if isinstance(o, (list, tuple))]
@@ -2157,16 +2792,16 @@ class BaseDeckGLViz(BaseViz):
         if spatial.get("type") == "latlong":
             df[key] = list(
                 zip(
-                    pd.to_numeric(df[spatial.get("lonCol")], errors="coerce"),
-                    pd.to_numeric(df[spatial.get("latCol")], errors="coerce"),
+                    pd.to_numeric(df[spatial.get("lonCol")], errors="coerce").tolist(),
+                    pd.to_numeric(df[spatial.get("latCol")], errors="coerce").tolist(),
                 )
             )
         elif spatial.get("type") == "delimited":
             lon_lat_col = spatial.get("lonlatCol")
-            df[key] = df[lon_lat_col].apply(self.parse_coordinates)
+            df[key] = self.parse_coordinates_column(df[lon_lat_col])
             del df[lon_lat_col]
         elif spatial.get("type") == "geohash":
-            df[key] = df[spatial.get("geohashCol")].map(self.reverse_geohash_decode)
+            df[key] = self.reverse_geohash_decode_column(df[spatial.get("geohashCol")])
             del df[spatial.get("geohashCol")]
 
         if spatial.get("reverseCheckbox"):
@@ -2231,6 +2866,39 @@ class BaseDeckGLViz(BaseViz):
         cols = self.form_data.get("js_columns") or []
         return {col: d.get(col) for col in cols}
 
+    @staticmethod
+    def get_column(df, col):
+        """The values of a column as a list, None if there's no such column"""
+        if not col or col not in df:
+            return None
+        if df[col].dtype.kind == "M":
+            return datetime_index_to_epoch(pd.DatetimeIndex(df[col])).tolist()
+        return df[col].tolist()
+
+    @staticmethod
+    def get_positions(df, key):
+        """The points of a spatial column as a flat list of coordinates"""
+        points = [
+            point if isinstance(point, (list, tuple)) else (None, None)
+            for point in df[key]
+        ]
+        return np.array(points, dtype=float).reshape(-1).tolist()
+
+    def get_weights(self, df):
+        weights = self.get_column(df, self.metric_label)
+        if weights is None:
+            return 1
+        return [weight or 1 for weight in weights]
+
+    def get_property_columns(self, df):
+        """The properties of the features as columns, for a columnar payload
+
+        Spatial properties are flat lists of coordinates, and properties
+        that are the same for all the features are single values. Layers
+        without a columnar payload return None.
+        """
+        return None
+
     def get_data(self, df):
         if df is None:
             return None
@@ -2239,6 +2907,21 @@ class BaseDeckGLViz(BaseViz):
         for key in self.spatial_control_keys:
             df = self.process_spatial_data_obj(key, df)
 
+        if self.form_data.get("columnar_features"):
+            columns = self.get_property_columns(df)
+            if columns is not None:
+                cols = self.form_data.get("js_columns") or []
+                if cols:
+                    columns["extraProps"] = {
+                        col: self.get_column(df, col) for col in cols
+                    }
+                return {
+                    "columns": columns,
+                    "length": len(df.index),
+                    "mapboxApiKey": config.get("MAPBOX_API_KEY"),
+                    "metricLabels": self.metric_labels,
+                }
+
         features = []
         for d in df.to_dict(orient="records"):
             feature = self.get_properties(d)
@@ -2293,6 +2976,16 @@ class DeckScatterViz(BaseDeckGLViz):
             DTTM_ALIAS: d.get(DTTM_ALIAS),
         }
 
+    def get_property_columns(self, df):
+        metric = self.get_column(df, self.metric_label)
+        return {
+            "metric": metric,
+            "radius": self.fixed_value if self.fixed_value else metric,
+            "cat_color": self.get_column(df, self.dim),
+            "position": self.get_positions(df, "spatial"),
+            DTTM_ALIAS: self.get_column(df, DTTM_ALIAS),
+        }
+
     def get_data(self, df):
         fd = self.form_data
         self.metric_label = utils.get_metric_name(self.metric) if self.metric else None
@@ -2325,6 +3018,16 @@ class DeckScreengrid(BaseDeckGLViz):
             "__timestamp": d.get(DTTM_ALIAS) or d.get("__time"),
         }
 
+    def get_property_columns(self, df):
+        timestamps = self.get_column(df, DTTM_ALIAS)
+        return {
+            "position": self.get_positions(df, "spatial"),
+            "weight": self.get_weights(df),
+            "__timestamp": self.get_column(df, "__time")
+            if timestamps is None
+            else timestamps,
+        }
+
     def get_data(self, df):
         self.metric_label = utils.get_metric_name(self.metric)
         return super().get_data(df)
@@ -2341,6 +3044,12 @@ class DeckGrid(BaseDeckGLViz):
     def get_properties(self, d):
         return {"position": d.get("spatial"), "weight": d.get(self.metric_label) or 1}
 
+    def get_property_columns(self, df):
+        return {
+            "position": self.get_positions(df, "spatial"),
+            "weight": self.get_weights(df),
+        }
+
     def get_data(self, df):
         self.metric_label = utils.get_metric_name(self.metric)
         return super().get_data(df)
@@ -2445,6 +3154,12 @@ class DeckHex(BaseDeckGLViz):
     def get_properties(self, d):
         return {"position": d.get("spatial"), "weight": d.get(self.metric_label) or 1}
 
+    def get_property_columns(self, df):
+        return {
+            "position": self.get_positions(df, "spatial"),
+            "weight": self.get_weights(df),
+        }
+
     def get_data(self, df):
         self.metric_label = utils.get_metric_name(self.metric)
         return super(DeckHex, self).get_data(df)
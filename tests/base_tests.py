@@ -111,7 +111,9 @@ class SupersetTestCase(unittest.TestCase):
         mock_dttm_col = Mock()
         datasource.get_col = Mock(return_value=mock_dttm_col)
         datasource.query = Mock(return_value=results)
+        datasource.cache_max_staleness = None
         datasource.database = Mock()
+        datasource.database.cache_max_staleness = None
         datasource.database.db_engine_spec = Mock()
         datasource.database.db_engine_spec.mutate_expression_label = lambda x: x
         return datasource
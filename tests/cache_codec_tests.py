@@ -0,0 +1,78 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+"""Unit tests for the chart cache codecs"""
+import pickle as pkl
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from superset.utils import cache_codec
+
+
+class CacheCodecTestCase(unittest.TestCase):
+    def get_value(self, df):
+        return {"dttm": "2019-01-01T00:00:00", "df": df, "query": "SELECT 1"}
+
+    def get_df(self):
+        return pd.DataFrame(
+            {
+                "__timestamp": pd.to_datetime(["2019-01-01", "2019-01-02", None]),
+                "name": ["a", None, "c"],
+                "sum__num": [1, 2, 3],
+                "avg__num": [1.5, np.nan, 3.0],
+            }
+        )
+
+    def test_arrow_roundtrip(self):
+        df = self.get_df()
+        for compression in (None, "lz4", "zstd"):
+            blob = cache_codec.dumps(self.get_value(df), "arrow", compression)
+            self.assertTrue(blob.startswith(cache_codec.MAGIC))
+            value = cache_codec.loads(blob)
+            pd.testing.assert_frame_equal(value["df"], df)
+            self.assertEqual(value["query"], "SELECT 1")
+            self.assertEqual(value["dttm"], "2019-01-01T00:00:00")
+
+    def test_pickle_roundtrip(self):
+        df = self.get_df()
+        value = cache_codec.loads(cache_codec.dumps(self.get_value(df), "pickle"))
+        pd.testing.assert_frame_equal(value["df"], df)
+
+    def test_no_df(self):
+        value = cache_codec.loads(cache_codec.dumps(self.get_value(None)))
+        self.assertIsNone(value["df"])
+        self.assertEqual(value["query"], "SELECT 1")
+
+    def test_legacy_pickle(self):
+        df = self.get_df()
+        blob = pkl.dumps(self.get_value(df), protocol=pkl.HIGHEST_PROTOCOL)
+        pd.testing.assert_frame_equal(cache_codec.loads(blob)["df"], df)
+
+    def test_fallback_to_pickle(self):
+        df = pd.DataFrame({"mixed": [1, "a"], 0: [1, 2]})
+        blob = cache_codec.dumps(self.get_value(df), "arrow")
+        codec_id = cache_codec.HEADER.unpack_from(blob)[1]
+        self.assertEqual(codec_id, cache_codec.PickleCacheCodec.codec_id)
+        pd.testing.assert_frame_equal(cache_codec.loads(blob)["df"], df)
+
+    def test_unknown_codec(self):
+        with self.assertRaises(cache_codec.CacheCodecException):
+            cache_codec.dumps(self.get_value(None), "foo")
+        blob = cache_codec.HEADER.pack(cache_codec.MAGIC, 99, 0, 0, 0)
+        with self.assertRaises(cache_codec.CacheCodecException):
+            cache_codec.loads(blob)
@@ -41,6 +41,7 @@ from superset.models.sql_lab import Query
 from superset.utils import core as utils
 from superset.views import core as views
 from superset.views.database.views import DatabaseView
+from superset.views.utils import apply_columnar_shape
 
 from .base_tests import SupersetTestCase
 from .fixtures.pyodbcRow import Row
@@ -790,6 +791,29 @@ class CoreTests(SupersetTestCase):
             data["error"], "The datasource associated with this chart no longer exists"
         )
 
+    def test_explore_json_batch(self):
+        self.login(username="admin")
+        girls = self.get_slice("Girls", db.session)
+        boys = self.get_slice("Boys", db.session)
+        form_datas = [girls.form_data, {"viz_type": "table"}, boys.form_data]
+        resp = self.get_resp(
+            "/superset/explore_json_batch/", {"form_data": json.dumps(form_datas)}
+        )
+        lines = [json.loads(line) for line in resp.splitlines()]
+        lines = {line["index"]: line for line in lines}
+        self.assertEqual(set(lines), {0, 1, 2})
+        for index in (0, 2):
+            self.assertEqual(lines[index]["status"], 200)
+            self.assertEqual(
+                lines[index]["payload"]["status"], utils.QueryStatus.SUCCESS
+            )
+        self.assertNotEqual(lines[0]["payload"]["data"], lines[2]["payload"]["data"])
+        self.assertEqual(lines[1]["status"], 500)
+        self.assertEqual(
+            lines[1]["payload"]["error"],
+            "The datasource associated with this chart no longer exists",
+        )
+
     @mock.patch("superset.security.SupersetSecurityManager.schemas_accessible_by_user")
     @mock.patch("superset.security.SupersetSecurityManager.database_access")
     @mock.patch("superset.security.SupersetSecurityManager.all_datasource_access")
@@ -906,6 +930,38 @@ class CoreTests(SupersetTestCase):
             self.assertDictEqual(deserialized_payload, payload)
             expand_data.assert_called_once()
 
+    def test_results_msgpack_deserialization_columnar(self):
+        data = [("a", 4, 4.0), ("b", 2 ** 60, None)]
+        cursor_descr = (("a", "string"), ("b", "int"), ("c", "float"))
+        db_engine_spec = BaseEngineSpec()
+        cdf = dataframe.SupersetDataFrame(data, cursor_descr, db_engine_spec)
+        serialized_data, selected_columns, all_columns, expanded_columns = sql_lab._serialize_and_expand_data(
+            cdf, db_engine_spec, True
+        )
+        payload = {
+            "status": utils.QueryStatus.SUCCESS,
+            "data": serialized_data,
+            "columns": all_columns,
+            "selected_columns": selected_columns,
+            "expanded_columns": expanded_columns,
+            "query": {"rows": 2},
+        }
+        serialized_payload = sql_lab._serialize_payload(payload, True)
+
+        deserialized_payload = views._deserialize_results_payload(
+            serialized_payload, mock.Mock(), True, columnar=True
+        )
+        self.assertEqual(deserialized_payload["dataShape"], "columnar")
+        self.assertEqual(deserialized_payload["columns"], selected_columns)
+        self.assertEqual(
+            deserialized_payload["data"][:2], [["a", "b"], [4, str(2 ** 60)]]
+        )
+
+        # row dicts from the JSON results backend are laid out the same way
+        payload["data"] = cdf.data
+        payload = apply_columnar_shape(payload)
+        self.assertEqual(payload["data"][:2], [["a", "b"], [4, str(2 ** 60)]])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,49 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+"""Unit tests for the block-wise CSV encoder"""
+
+import csv
+import io
+import unittest
+
+from superset.utils import csv as csv_utils
+
+
+class CsvTestCase(unittest.TestCase):
+    def test_encode_rows(self):
+        rows = [(1, None, 'a "b"'), ("", 2.5, "c,d\ne")]
+        self.assertEqual(
+            csv_utils.encode_rows(rows), '"1",,"a ""b"""\n"","2.5","c,d\ne"\n'
+        )
+        self.assertEqual(csv_utils.encode_rows([]), "")
+
+    def test_roundtrip_with_csv_reader(self):
+        rows = [("x", 'say "hi"', "multi\nline"), ("1", "", ",")]
+        encoded = csv_utils.encode_rows(rows)
+        self.assertEqual([tuple(r) for r in csv.reader(io.StringIO(encoded))], rows)
+
+    def test_chunk_rows(self):
+        chunks = list(csv_utils.chunk_rows(iter(range(7)), 3))
+        self.assertEqual(chunks, [[0, 1, 2], [3, 4, 5], [6]])
+        self.assertEqual(list(csv_utils.chunk_rows([], 3)), [])
+
+    def test_stream_csv(self):
+        blocks = [[(1, "a")], [(2, None)]]
+        self.assertEqual(
+            list(csv_utils.stream_csv(["id", "name"], blocks)),
+            ['"id","name"\n', '"1","a"\n', '"2",\n'],
+        )
@@ -14,12 +14,15 @@
 # KIND, either express or implied.  See the License for the
 # specific language governing permissions and limitations
 # under the License.
+import sqlite3
+
 import numpy as np
 import pandas as pd
 
-from superset.dataframe import dedup, SupersetDataFrame
+from superset.dataframe import dedup, df_from_cursor, SupersetDataFrame, transpose
 from superset.db_engine_specs import BaseEngineSpec
 from superset.db_engine_specs.presto import PrestoEngineSpec
+from superset.exceptions import QueryResultTooLargeException
 
 from .base_tests import SupersetTestCase
 
@@ -157,3 +160,90 @@ class SupersetDataFrameTestCase(SupersetTestCase):
         cdf = SupersetDataFrame(data, cursor_descr, PrestoEngineSpec)
         self.assertEqual(cdf.raw_df.dtypes[0], np.dtype("O"))
         self.assertEqual(cdf.raw_df.dtypes[1], pd.Int64Dtype())
+
+    def test_typed_columns(self):
+        data = [
+            (1, 1, [1, 2], "a"),
+            (None, None, [3, 4], None),
+            (2 ** 40, 2.5, [], "c"),
+        ]
+        cursor_descr = [
+            ("int", "bigint", None, None, None, None, True),
+            ("float", "double", None, None, None, None, True),
+            ("array", "array(integer)", None, None, None, None, True),
+            ("varchar", "varchar", None, None, None, None, True),
+        ]
+        cdf = SupersetDataFrame(data, cursor_descr, PrestoEngineSpec)
+        self.assertEqual(cdf.raw_df.dtypes[0], pd.Int64Dtype())
+        self.assertEqual(cdf.raw_df.dtypes[1], np.dtype("float64"))
+        self.assertEqual(cdf.raw_df.dtypes[2], np.dtype("O"))
+        self.assertEqual(cdf.raw_df["int"].isna().tolist(), [False, True, False])
+        self.assertEqual(cdf.raw_df["int"].sum(), 1 + 2 ** 40)
+        self.assertEqual(cdf.raw_df["array"].tolist(), [[1, 2], [3, 4], []])
+
+    def test_wide_data(self):
+        types = ["bigint", "timestamp", "array(integer)"] * 9
+        data = [tuple((i, "2019-01-01 00:00:00.000", [i]) * 9) for i in (1, None, 3)]
+        cursor_descr = [
+            (f"col_{i}", type_, None, None, None, None, True)
+            for i, type_ in enumerate(types)
+        ]
+        expected = pd.DataFrame(list(data), columns=[col[0] for col in cursor_descr])
+        cdf = SupersetDataFrame(data, cursor_descr, BaseEngineSpec)
+        pd.testing.assert_frame_equal(cdf.raw_df, expected.infer_objects())
+
+        cdf = SupersetDataFrame(data, cursor_descr, PrestoEngineSpec)
+        self.assertEqual(cdf.column_names, expected.columns.tolist())
+        self.assertEqual(
+            cdf.raw_df.dtypes.tolist(),
+            [pd.Int64Dtype(), np.dtype("<M8[ns]"), np.dtype("O")] * 9,
+        )
+        self.assertEqual(cdf.raw_df["col_24"].isna().tolist(), [False, True, False])
+        self.assertEqual(cdf.raw_df["col_25"][0], pd.Timestamp("2019-01-01"))
+        self.assertEqual(cdf.raw_df["col_26"].tolist(), [[1], [None], [3]])
+
+    def test_transpose(self):
+        data = [(i, [i, i]) for i in range(5)]
+        columns = transpose(data, 2, chunk_size=2)
+        self.assertEqual([column.dtype for column in columns], [np.dtype("O")] * 2)
+        self.assertEqual(columns[0].tolist(), [0, 1, 2, 3, 4])
+        self.assertEqual(columns[1].tolist(), [[i, i] for i in range(5)])
+        self.assertEqual([column.tolist() for column in transpose([], 2)], [[], []])
+
+    def test_format_data(self):
+        df = pd.DataFrame(
+            {
+                "int": [1, 2 ** 60],
+                "nullable": pd.Series([None, -(2 ** 60)], dtype="Int64"),
+                "object": ["a", 2 ** 60],
+                "ts": pd.to_datetime(["2019-01-01", None]),
+            }
+        )
+        data = SupersetDataFrame.format_data(df)
+        self.assertEqual(data[0]["int"], 1)
+        self.assertEqual(data[1]["int"], str(2 ** 60))
+        self.assertEqual(data[1]["nullable"], str(-(2 ** 60)))
+        self.assertEqual(data[1]["object"], str(2 ** 60))
+        self.assertEqual(data[0]["ts"], pd.Timestamp("2019-01-01"))
+        self.assertIs(data[1]["ts"], pd.NaT)
+        self.assertEqual(SupersetDataFrame.format_columns(df)[2], ["a", str(2 ** 60)])
+
+    def test_df_from_cursor(self):
+        data = [(1, None, "a"), (None, None, "b"), (3, 2.5, None), (4, 1, "d")]
+        columns = ["one", "two", "three"]
+        expected = pd.DataFrame.from_records(data, columns=columns, coerce_float=True)
+        for chunk_size in (1, 2, 3, 10):
+            cursor = sqlite3.connect(":memory:").execute(
+                "SELECT * FROM (VALUES (1, NULL, 'a'), (NULL, NULL, 'b'), "
+                "(3, 2.5, NULL), (4, 1, 'd'))"
+            )
+            df = df_from_cursor(cursor, columns, chunk_size=chunk_size)
+            pd.testing.assert_frame_equal(df, expected)
+
+    def test_df_from_cursor_max_bytes(self):
+        cursor = sqlite3.connect(":memory:").execute(
+            "WITH RECURSIVE t(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM t) "
+            "SELECT x FROM t LIMIT 1000"
+        )
+        with self.assertRaises(QueryResultTooLargeException):
+            df_from_cursor(cursor, ["x"], chunk_size=100, max_bytes=4000)
@@ -628,6 +628,36 @@ class DbEngineSpecsTestCase(SupersetTestCase):
         self.assertEqual(actual_data, expected_data)
         self.assertEqual(actual_expanded_cols, expected_expanded_cols)
 
+    @mock.patch.dict(
+        "superset._feature_flags", {"PRESTO_EXPAND_DATA": True}, clear=True
+    )
+    def test_presto_expand_data_with_multiple_array_columns(self):
+        cols = [
+            {"name": "array_a", "type": "ARRAY(BIGINT)"},
+            {"name": "array_b", "type": "ARRAY(BIGINT)"},
+        ]
+        data = [
+            {"array_a": [1], "array_b": [2, 3, 4]},
+            {"array_a": [5, 6, 7], "array_b": [8, 9]},
+            {"array_a": [], "array_b": [10]},
+        ]
+        actual_cols, actual_data, actual_expanded_cols = PrestoEngineSpec.expand_data(
+            cols, data
+        )
+        # arrays of the same row share the rows added to unnest them
+        expected_data = [
+            {"array_a": 1, "array_b": 2},
+            {"array_a": "", "array_b": 3},
+            {"array_a": "", "array_b": 4},
+            {"array_a": 5, "array_b": 8},
+            {"array_a": 6, "array_b": 9},
+            {"array_a": 7, "array_b": ""},
+            {"array_a": [], "array_b": 10},
+        ]
+        self.assertEqual(actual_cols, cols)
+        self.assertEqual(actual_data, expected_data)
+        self.assertEqual(actual_expanded_cols, [])
+
     def test_presto_extra_table_metadata(self):
         db = mock.Mock()
         db.get_indexes = mock.Mock(return_value=[{"column_names": ["ds", "hour"]}])
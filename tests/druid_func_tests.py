@@ -16,10 +16,19 @@
 # under the License.
 import json
 import unittest
-from unittest.mock import Mock
+from datetime import datetime, timedelta
+from unittest.mock import Mock, patch
+
+import pandas as pd
+from dateutil.tz import gettz
 
 import superset.connectors.druid.models as models
-from superset.connectors.druid.models import DruidColumn, DruidDatasource, DruidMetric
+from superset.connectors.druid.models import (
+    DruidCluster,
+    DruidColumn,
+    DruidDatasource,
+    DruidMetric,
+)
 from superset.exceptions import SupersetException
 
 from .base_tests import SupersetTestCase
@@ -1091,3 +1100,68 @@ class DruidFuncTestCase(unittest.TestCase):
         self.assertRaises(
             SupersetException, ds.get_aggregations, metrics_dict, metric_names
         )
+
+    @patch("superset.connectors.druid.models.druid_versions", models.utils.LRUCache())
+    def test_druid_version_cache(self):
+        cluster = DruidCluster(broker_host="localhost", broker_port=8082)
+        cluster.get_druid_version = Mock(return_value="0.15.0")
+        self.assertEqual(cluster.druid_version, "0.15.0")
+        self.assertEqual(cluster.druid_version, "0.15.0")
+        cluster.get_druid_version.assert_called_once_with()
+
+        other_cluster = DruidCluster(broker_host="localhost", broker_port=8082)
+        other_cluster.get_druid_version = Mock(return_value="0.16.0")
+        self.assertEqual(other_cluster.druid_version, "0.15.0")
+
+    def test_homogenize_types(self):
+        df = pd.DataFrame(
+            {
+                "dim1": ["a", None, "b", "a"],
+                "dim2": [1.5, 2.0, None, 1.5],
+                "metric": [1, 2, 3, 4],
+            }
+        )
+        df = DruidDatasource.homogenize_types(df, ["dim1", "dim2"])
+        self.assertEqual(df["dim1"].tolist(), ["a", "<NULL>", "b", "a"])
+        self.assertEqual(df["dim2"].tolist(), ["1.5", "2.0", "<NULL>", "1.5"])
+        self.assertEqual(df["metric"].tolist(), [1, 2, 3, 4])
+
+    def test_increment_timestamps(self):
+        offset = DruidDatasource.time_offset("week_ending_saturday")
+        timestamps = pd.Series(["2019-01-05T00:00:00.000Z", "2019-01-12T00:00:00.000Z"])
+        expected = [
+            datetime(2019, 1, 11, tzinfo=models.DRUID_TZ),
+            datetime(2019, 1, 18, tzinfo=models.DRUID_TZ),
+        ]
+        result = DruidDatasource.increment_timestamps(timestamps, offset)
+        self.assertEqual([ts.to_pydatetime() for ts in result], expected)
+
+        # mixed offsets are parsed one by one, keeping their wall time
+        timestamps = pd.Series(["2019-01-05T00:00:00+01:00", "2019-01-12T00:00:00Z"])
+        result = DruidDatasource.increment_timestamps(timestamps, offset)
+        self.assertEqual([ts.to_pydatetime() for ts in result], expected)
+
+    def test_increment_timestamps_dst(self):
+        tz = gettz("America/New_York")
+        # hourly timestamps repeated, then skipped, by DST changes
+        timestamps = pd.Series(
+            [
+                "2019-11-03T00:00:00.000Z",
+                "2019-11-03T01:00:00.000Z",
+                "2019-11-03T02:00:00.000Z",
+                "2020-03-08T01:00:00.000Z",
+                "2020-03-08T02:00:00.000Z",
+                "2020-03-08T03:00:00.000Z",
+            ]
+        )
+        # they are set in the timezone one by one
+        expected = pd.Series(
+            [
+                models.utils.parse_human_datetime(ts).replace(tzinfo=tz)
+                + timedelta(hours=1)
+                for ts in timestamps
+            ]
+        )
+        with patch("superset.connectors.druid.models.DRUID_TZ", tz):
+            result = DruidDatasource.increment_timestamps(timestamps, 3600 * 1000)
+        self.assertEqual(result.tolist(), expected.tolist())
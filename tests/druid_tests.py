@@ -17,6 +17,7 @@
 """Unit tests for Superset"""
 import json
 import unittest
+from copy import deepcopy
 from datetime import datetime
 from unittest.mock import Mock, patch
 
@@ -454,6 +455,78 @@ class DruidTests(SupersetTestCase):
 
             self.assertEqual(metric.json_obj["type"], "long{}".format(agg.capitalize()))
 
+    @unittest.skipUnless(
+        SupersetTestCase.is_module_installed("pydruid"), "pydruid not installed"
+    )
+    @patch("superset.connectors.druid.models.PyDruid")
+    def test_refresh_metadata_incremental(self, PyDruid):
+        self.login(username="admin")
+        cluster = self.get_cluster(PyDruid)
+        cluster.refresh_datasources()
+        datasource_id = cluster.datasources[0].id
+
+        def get_column():
+            return (
+                db.session.query(DruidColumn)
+                .filter(DruidColumn.datasource_id == datasource_id)
+                .filter(DruidColumn.column_name == "dim1")
+            ).one()
+
+        get_column().type = "CHANGED"
+        db.session.commit()
+
+        # the segment metadata is unchanged, the datasource is skipped
+        cluster.refresh_datasources(incremental=True)
+        self.assertEqual(get_column().type, "CHANGED")
+
+        metadata = deepcopy(SEGMENT_METADATA)
+        metadata[0]["columns"]["dim3"] = metadata[0]["columns"]["dim1"]
+        PyDruid.return_value.segment_metadata.return_value = metadata
+        cluster.refresh_datasources(incremental=True)
+        self.assertEqual(get_column().type, "STRING")
+        self.assertEqual(
+            {"dim1", "dim2", "dim3", "metric1"},
+            {col.column_name for col in cluster.datasources[0].columns},
+        )
+
+    @unittest.skipUnless(
+        SupersetTestCase.is_module_installed("pydruid"), "pydruid not installed"
+    )
+    @patch("superset.connectors.druid.models.PyDruid")
+    def test_refresh_metadata_incremental_failure(self, PyDruid):
+        self.login(username="admin")
+        cluster = self.get_cluster(PyDruid)
+        cluster.refresh_datasources()
+        datasource_id = cluster.datasources[0].id
+
+        def get_hash():
+            return (
+                db.session.query(DruidDatasource.segment_metadata_hash)
+                .filter_by(id=datasource_id)
+                .scalar()
+            )
+
+        metadata_hash = get_hash()
+        self.assertIsNotNone(metadata_hash)
+
+        # the hash isn't updated when the columns and metrics can't be merged
+        metadata = deepcopy(SEGMENT_METADATA)
+        metadata[0]["columns"]["dim3"] = metadata[0]["columns"]["dim1"]
+        PyDruid.return_value.segment_metadata.return_value = metadata
+        with patch.object(
+            DruidCluster, "merge_metadata", side_effect=Exception("merge failed")
+        ):
+            with self.assertRaises(Exception):
+                cluster.refresh_datasources(incremental=True)
+        self.assertEqual(get_hash(), metadata_hash)
+
+        # so the datasource is refreshed the next time
+        cluster.refresh_datasources(incremental=True)
+        self.assertNotEqual(get_hash(), metadata_hash)
+        self.assertIn(
+            "dim3", {col.column_name for col in cluster.datasources[0].columns}
+        )
+
     @unittest.skipUnless(
         SupersetTestCase.is_module_installed("pydruid"), "pydruid not installed"
     )
@@ -15,9 +15,15 @@
 # specific language governing permissions and limitations
 # under the License.
 import logging
+import threading
 import unittest
+from unittest.mock import Mock
 
-from superset.utils.log import DBEventLogger, get_event_logger_from_cfg_value
+from superset.utils.log import (
+    DBEventLogger,
+    EventQueue,
+    get_event_logger_from_cfg_value,
+)
 
 
 class TestEventLogger(unittest.TestCase):
@@ -42,3 +48,54 @@ class TestEventLogger(unittest.TestCase):
         # test that assignment of non AbstractEventLogger derived type raises TypeError
         with self.assertRaises(TypeError):
             get_event_logger_from_cfg_value(logging.getLogger())
+
+
+class TestEventQueue(unittest.TestCase):
+    def test_flushes_by_batch_size(self):
+        batches = []
+        flushed = threading.Event()
+
+        def write_batch(batch):
+            batches.append(batch)
+            flushed.set()
+
+        event_queue = EventQueue(write_batch, batch_size=3, flush_interval=60)
+        for i in range(3):
+            self.assertTrue(event_queue.put(i))
+        self.assertTrue(flushed.wait(5))
+        self.assertEqual(batches, [[0, 1, 2]])
+        event_queue.shutdown()
+
+    def test_flushes_by_interval_and_on_shutdown(self):
+        batches = []
+        event_queue = EventQueue(batches.append, batch_size=100, flush_interval=0.01)
+        event_queue.put("a")
+        event_queue.shutdown()
+        event_queue.put("b")
+        event_queue.shutdown()
+        self.assertEqual([item for batch in batches for item in batch], ["a", "b"])
+
+    def test_drops_when_full(self):
+        release = threading.Event()
+        stats_logger = Mock()
+        event_queue = EventQueue(
+            lambda batch: release.wait(5),
+            maxsize=1,
+            batch_size=1,
+            stats_logger=stats_logger,
+        )
+        event_queue.put(1)  # picked up by the worker, which then blocks
+        results = [event_queue.put(i) for i in range(3)]
+        self.assertIn(False, results)
+        stats_logger.incr.assert_called_with("event_logger.dropped")
+        release.set()
+        event_queue.shutdown()
+
+    def test_write_errors_are_counted(self):
+        stats_logger = Mock()
+        event_queue = EventQueue(
+            Mock(side_effect=Exception("boom")), batch_size=1, stats_logger=stats_logger
+        )
+        event_queue.put(1)
+        event_queue.shutdown()
+        stats_logger.incr.assert_called_with("event_logger.failed")
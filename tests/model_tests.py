@@ -16,13 +16,16 @@
 # under the License.
 import textwrap
 import unittest
+from unittest import mock
 
 import pandas
 from sqlalchemy.engine.url import make_url
+from sqlalchemy.pool import NullPool
 
 from superset import app
-from superset.models.core import Database
+from superset.models.core import Database, engine_pool
 from superset.utils.core import get_example_database, QueryStatus
+from superset.utils.engine_pool import EnginePool, InstrumentedQueuePool
 
 from .base_tests import SupersetTestCase
 
@@ -104,6 +107,22 @@ class DatabaseModelTestCase(SupersetTestCase):
         user_name = make_url(model.get_sqla_engine(user_name=example_user).url).username
         self.assertNotEqual(example_user, user_name)
 
+    def test_pooled_engine(self):
+        uri = "sqlite:////tmp/pooled.db"
+        model = Database(id=1000, database_name="test_pooled", sqlalchemy_uri=uri)
+
+        with mock.patch.dict(app.config, {"ENGINE_POOL_ENABLED": True}):
+            engine = model.get_sqla_engine()
+            self.assertIsInstance(engine.pool, InstrumentedQueuePool)
+            self.assertIs(engine, model.get_sqla_engine(nullpool=False))
+            self.assertIsNot(engine, model.get_sqla_engine(schema="main"))
+
+            model.set_sqlalchemy_uri("sqlite:////tmp/pooled2.db")
+            self.assertIsNot(engine, model.get_sqla_engine())
+
+        self.assertIsInstance(model.get_sqla_engine().pool, NullPool)
+        engine_pool.dispose_database(model.id)
+
     def test_select_star(self):
         db = get_example_database()
         table_name = "energy_usage"
@@ -170,6 +189,35 @@ class DatabaseModelTestCase(SupersetTestCase):
             self.assertEqual(df.iat[0, 0], ";")
 
 
+class EnginePoolTestCase(unittest.TestCase):
+    def test_idle_engines_are_disposed(self):
+        pool = EnginePool(max_engines=2, idle_timeout=10)
+        engines = [mock.Mock(pool=None) for _ in range(3)]
+        with mock.patch("superset.utils.engine_pool.monotonic", return_value=0):
+            self.assertIs(engines[0], pool.get_engine((1, "a"), lambda: engines[0]))
+            self.assertIs(engines[0], pool.get_engine((1, "a"), lambda: engines[1]))
+            pool.get_engine((1, "b"), lambda: engines[1])
+        with mock.patch("superset.utils.engine_pool.monotonic", return_value=20):
+            pool.get_engine((2, "a"), lambda: engines[2])
+        self.assertEqual(len(pool), 1)
+        engines[0].dispose.assert_called_once_with()
+        engines[1].dispose.assert_called_once_with()
+
+    def test_least_recently_used_engines_are_disposed(self):
+        pool = EnginePool(max_engines=2, idle_timeout=None)
+        engines = [mock.Mock(pool=None) for _ in range(3)]
+        pool.get_engine((1, "a"), lambda: engines[0])
+        pool.get_engine((1, "b"), lambda: engines[1])
+        pool.get_engine((1, "a"), lambda: engines[0])
+        pool.get_engine((2, "a"), lambda: engines[2])
+        engines[1].dispose.assert_called_once_with()
+        engines[0].dispose.assert_not_called()
+
+        pool.dispose_database(1)
+        engines[0].dispose.assert_called_once_with()
+        self.assertEqual(len(pool), 1)
+
+
 class SqlaTableModelTestCase(SupersetTestCase):
     def test_get_timestamp_expression(self):
         tbl = self.get_table_by_name("birth_names")
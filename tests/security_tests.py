@@ -18,8 +18,10 @@ import inspect
 import unittest
 from unittest.mock import Mock, patch
 
-from superset import app, appbuilder, security_manager, viz
+from superset import app, appbuilder, db, security_manager, viz
 from superset.exceptions import SupersetSecurityException
+from superset.models.user_attributes import UserAttribute
+from superset.views.aics_privacy_control import decorators
 
 from .base_tests import SupersetTestCase
 
@@ -376,3 +378,144 @@ class SecurityManagerTests(SupersetTestCase):
 
         with self.assertRaises(SupersetSecurityException):
             security_manager.assert_viz_permission(test_viz)
+
+    def test_aics_table_permissions(self):
+        from datetime import date, timedelta
+
+        from superset import db
+        from superset.models.table_permission import TablePermission
+
+        table = self.get_table_by_name("birth_names")
+        gamma = security_manager.find_user("gamma")
+        pv = security_manager.find_permission_view_menu("datasource_access", table.perm)
+        table_perm = TablePermission(
+            user_id=gamma.id,
+            apply_date=date.today(),
+            expire_date=date.today() + timedelta(days=1),
+            is_active=True,
+            table_permissions=[pv],
+        )
+        db.session.add(table_perm)
+        db.session.commit()
+        table_perm_id = table_perm.id
+
+        try:
+            with app.test_request_context():
+                self.assertTrue(
+                    security_manager._has_aics_table_permission(
+                        gamma, "datasource_access", table.perm
+                    )
+                )
+                self.assertFalse(
+                    security_manager._has_aics_table_permission(
+                        gamma, "datasource_access", "[main].[unknown](id:0)"
+                    )
+                )
+
+            # the session is removed at the end of each request
+            table_perm = db.session.query(TablePermission).get(table_perm_id)
+            table_perm.is_active = False
+            db.session.commit()
+            with app.test_request_context():
+                self.assertFalse(
+                    security_manager._has_aics_table_permission(
+                        gamma, "datasource_access", table.perm
+                    )
+                )
+        finally:
+            db.session.delete(db.session.query(TablePermission).get(table_perm_id))
+            db.session.commit()
+
+
+class AccessKeyVerificationTests(SupersetTestCase):
+    """
+    Testing the caching of access keys by aics_access_key_verification.
+    """
+
+    access_key = "test_access_key"
+
+    def setUp(self):
+        gamma = security_manager.find_user("gamma")
+        user_attribute = UserAttribute(user_id=gamma.id, access_key=self.access_key)
+        db.session.add(user_attribute)
+        db.session.commit()
+        self.gamma_id = gamma.id
+        self.user_attribute_id = user_attribute.id
+        decorators.access_key_cache.clear()
+
+    def tearDown(self):
+        db.session.delete(self.get_user_attribute())
+        self.get_gamma().active = True
+        db.session.commit()
+        decorators.access_key_cache.clear()
+
+    # the session is removed at the end of each request, objects are fetched
+    # again after verifying access keys
+    def get_gamma(self):
+        return db.session.query(security_manager.user_model).get(self.gamma_id)
+
+    def get_user_attribute(self):
+        return db.session.query(UserAttribute).get(self.user_attribute_id)
+
+    def verify(self, access_key=access_key, require_admin=False):
+        view = decorators.aics_access_key_verification(require_admin)(lambda: "ok")
+        with app.test_request_context(json={"access_key": access_key}):
+            return view()
+
+    def assert_rejected(self, result, message):
+        response, extra_info = result
+        self.assertEqual(response.status_code, 500)
+        self.assertIn(message, extra_info["err_msg"])
+
+    def test_cache_hit(self):
+        self.assertEqual(self.verify(), "ok")
+        gamma = self.get_gamma()
+        self.assertEqual(
+            decorators.access_key_cache.get(self.access_key),
+            (gamma.id, frozenset(role.name for role in gamma.roles)),
+        )
+
+        # the access key isn't looked up again
+        with patch.object(decorators, "db") as mock_db:
+            self.assertEqual(self.verify(), "ok")
+            mock_db.session.assert_not_called()
+
+        # unknown access keys aren't cached
+        self.assert_rejected(self.verify("unknown"), "Invalid access_key")
+        self.assertIsNone(decorators.access_key_cache.get("unknown"))
+
+    def test_cache_invalidation(self):
+        self.assertEqual(self.verify(), "ok")
+        self.get_user_attribute().access_key = "new_test_access_key"
+        db.session.commit()
+        self.assertEqual(len(decorators.access_key_cache), 0)
+        self.assert_rejected(self.verify(), "Invalid access_key")
+        self.assertEqual(self.verify("new_test_access_key"), "ok")
+
+        gamma = self.get_gamma()
+        gamma.roles.append(security_manager.find_role("Admin"))
+        db.session.commit()
+        try:
+            self.assertEqual(len(decorators.access_key_cache), 0)
+            self.assertEqual(
+                self.verify("new_test_access_key", require_admin=True), "ok"
+            )
+        finally:
+            gamma = self.get_gamma()
+            gamma.roles.remove(security_manager.find_role("Admin"))
+            db.session.commit()
+        self.assertEqual(len(decorators.access_key_cache), 0)
+
+    def test_inactive_user_with_cached_access_key(self):
+        self.assertEqual(self.verify(), "ok")
+        # deactivate the user as another process would, leaving the cache as is
+        db.session.query(security_manager.user_model).filter_by(
+            id=self.gamma_id
+        ).update({"active": False}, synchronize_session=False)
+        db.session.commit()
+        self.assertIsNotNone(decorators.access_key_cache.get(self.access_key))
+        self.assert_rejected(self.verify(), "is inactive")
+
+        # as are deleted users
+        with patch.object(security_manager, "get_user_by_id", return_value=None):
+            self.assert_rejected(self.verify(), "doesn't exist")
@@ -15,6 +15,9 @@
 # specific language governing permissions and limitations
 # under the License.
 import unittest
+from unittest.mock import patch
+
+import sqlparse
 
 from superset import sql_parse
 
@@ -504,3 +507,25 @@ class SupersetTestCase(unittest.TestCase):
         SELECT * FROM match
         """
         self.assertEqual({"foo"}, self.extract_tables(query))
+
+    def test_parse_cache(self):
+        sql_parse.parse_cache.clear()
+        query = "SELECT * FROM tbname LIMIT 10"
+        with patch("superset.sql_parse.sqlparse.parse", wraps=sqlparse.parse) as parse:
+            parsed = sql_parse.ParsedQuery(query)
+            cached = sql_parse.ParsedQuery(query)
+            self.assertEqual(parse.call_count, 1)
+        self.assertEqual(cached.tables, {"tbname"})
+        self.assertEqual(cached.limit, 10)
+        self.assertTrue(cached.is_select())
+
+        # instances must not leak changes into the shared parse result
+        parsed.tables.add("foo")
+        self.assertEqual(
+            parsed.get_query_with_new_limit(100), "SELECT * FROM tbname LIMIT 100"
+        )
+        cached = sql_parse.ParsedQuery(query)
+        self.assertEqual(cached.tables, {"tbname"})
+        self.assertEqual(
+            cached.get_query_with_new_limit(1000), "SELECT * FROM tbname LIMIT 1000"
+        )
@@ -16,15 +16,18 @@
 # under the License.
 """Unit tests for Superset cache warmup"""
 import json
-from unittest.mock import MagicMock
+from unittest.mock import ANY, MagicMock, patch
 
-from superset import db
+from superset import cache, db
 from superset.models.core import Log
 from superset.models.tags import get_tag, ObjectTypes, TaggedObject, TagTypes
 from superset.tasks.cache import (
+    CostWeightedStrategy,
     DashboardTagsStrategy,
     get_form_data,
+    RateLimiter,
     TopNDashboardsStrategy,
+    WarmUpExecutor,
 )
 
 from .base_tests import SupersetTestCase
@@ -209,3 +212,56 @@ class CacheWarmUpTests(SupersetTestCase):
         result = sorted(strategy.get_urls())
         expected = sorted(tag1_urls + tag2_urls)
         self.assertEqual(result, expected)
+
+    def test_cost_weighted_strategy(self):
+        db.session.query(Log).delete()
+        girls = self.get_slice("Girls", db.session)
+        boys = self.get_slice("Boys", db.session)
+        for _ in range(5):
+            db.session.add(
+                Log(action="explore_json", slice_id=girls.id, duration_ms=1000)
+            )
+        db.session.add(Log(action="explore_json", slice_id=boys.id, duration_ms=2000))
+        db.session.add(Log(action="dashboard", slice_id=boys.id, duration_ms=9000))
+        db.session.commit()
+        cache.clear()
+
+        strategy = CostWeightedStrategy(since="1 day ago", time_budget=10)
+        self.assertEqual(strategy.get_charts(), [(girls, None), (boys, None)])
+
+        # the budget only allows the best ranked chart
+        strategy = CostWeightedStrategy(since="1 day ago", time_budget=2.5)
+        self.assertEqual(strategy.get_charts(), [(girls, None)])
+
+        # warming up a chart that was just cached gains nothing
+        WarmUpExecutor(force=True).warm_up_charts([(girls, None)])
+        strategy = CostWeightedStrategy(since="1 day ago", time_budget=10)
+        self.assertEqual(strategy.get_charts()[0], (boys, None))
+
+    def test_warm_up_executor(self):
+        dash = self.get_dash_by_slug("births")
+        charts = [(slc, dash) for slc in dash.slices]
+        executor = WarmUpExecutor(max_workers=4, force=True)
+        summary = executor.warm_up_charts(charts + charts)
+        self.assertEqual(summary["errors"], [])
+        self.assertEqual(
+            sorted(result["chart_id"] for result in summary["success"]),
+            sorted(slc.id for slc in dash.slices),
+        )
+        for result in summary["success"]:
+            self.assertGreaterEqual(result["duration_ms"], 0)
+
+        # the charts are cached now
+        executor = WarmUpExecutor(max_workers=4)
+        slc = self.get_slice("Girls", db.session)
+        summary = executor.warm_up_charts([(slc, dash)])
+        self.assertEqual(summary["skipped"], [{"chart_id": slc.id, "duration_ms": ANY}])
+
+    @patch("superset.tasks.cache.sleep")
+    @patch("superset.tasks.cache.monotonic")
+    def test_rate_limiter(self, mock_monotonic, mock_sleep):
+        mock_monotonic.return_value = 100
+        limiter = RateLimiter(rate=30)
+        for _ in range(3):
+            limiter.wait()
+        self.assertEqual([call[0][0] for call in mock_sleep.call_args_list], [2.0, 4.0])
@@ -48,6 +48,9 @@ EMAIL_NOTIFICATIONS = False
 
 CACHE_CONFIG = {"CACHE_TYPE": "simple"}
 
+# tests assert on the `logs` table right after the requests
+EVENT_LOGGER_ASYNC = False
+
 
 class CeleryConfig(object):
     BROKER_URL = "redis://localhost"
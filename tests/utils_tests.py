@@ -14,6 +14,7 @@
 # KIND, either express or implied.  See the License for the
 # specific language governing permissions and limitations
 # under the License.
+import threading
 import unittest
 import uuid
 from datetime import date, datetime, time, timedelta
@@ -21,7 +22,7 @@ from decimal import Decimal
 from unittest.mock import patch
 
 import numpy
-from flask import Flask
+from flask import Flask, g
 from flask_caching import Cache
 from sqlalchemy.exc import ArgumentError
 
@@ -39,12 +40,14 @@ from superset.utils.core import (
     json_int_dttm_ser,
     json_iso_dttm_ser,
     JSONEncodedDict,
+    LRUCache,
     memoized,
     merge_extra_filters,
     merge_request_params,
     parse_human_timedelta,
     parse_js_uri_path_item,
     parse_past_timedelta,
+    run_concurrently,
     setup_cache,
     split,
     validate_json,
@@ -638,6 +641,48 @@ class UtilsTestCase(unittest.TestCase):
         self.assertEqual(instance.watcher, 4)
         self.assertEqual(result1, result8)
 
+    def test_lru_cache(self):
+        cache = LRUCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+        cache.set("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+        cache.delete("c")
+        self.assertEqual(cache.get("c", "default"), "default")
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+
+    @patch("superset.utils.core.monotonic")
+    def test_lru_cache_ttl(self, mock_monotonic):
+        mock_monotonic.return_value = 100
+        cache = LRUCache(ttl=10)
+        cache.set("a", 1)
+        cache.set("b", 2, ttl=60)
+        mock_monotonic.return_value = 109
+        self.assertEqual(cache.get("a"), 1)
+        mock_monotonic.return_value = 111
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("b"), 2)
+
+    def test_run_concurrently(self):
+        def get_user(i):
+            return lambda: (i, g.user, threading.get_ident())
+
+        with app.app_context():
+            g.user = "admin"
+            results = run_concurrently([get_user(i) for i in range(4)], 2)
+        self.assertEqual([(i, "admin") for i in range(4)], [r[:2] for r in results])
+        self.assertNotIn(threading.get_ident(), {r[2] for r in results})
+
+        def fail():
+            raise SupersetException("failed")
+
+        with self.assertRaises(SupersetException):
+            run_concurrently([lambda: 1, fail, lambda: 2], 2)
+
     @patch("superset.utils.core.parse_human_datetime", mock_parse_human_datetime)
     def test_get_since_until(self):
         result = get_since_until()
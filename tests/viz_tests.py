@@ -14,9 +14,10 @@
 # KIND, either express or implied.  See the License for the
 # specific language governing permissions and limitations
 # under the License.
+import json
 import uuid
-from datetime import datetime
-from unittest.mock import Mock, patch
+from datetime import datetime, timedelta
+from unittest.mock import ANY, Mock, patch
 
 import numpy as np
 import pandas as pd
@@ -24,7 +25,8 @@ import pandas as pd
 import superset.viz as viz
 from superset import app
 from superset.exceptions import SpatialException
-from superset.utils.core import DTTM_ALIAS
+from superset.utils import cache_codec
+from superset.utils.core import DTTM_ALIAS, QueryStatus
 
 from .base_tests import SupersetTestCase
 from .utils import load_fixture
@@ -158,6 +160,304 @@ class BaseVizTestCase(SupersetTestCase):
         test_viz = viz.BaseViz(datasource, form_data={})
         self.assertEqual(app.config["CACHE_DEFAULT_TIMEOUT"], test_viz.cache_timeout)
 
+    @patch.dict(app.config, {"CHART_PAYLOAD_CACHE_ENABLED": True})
+    @patch("superset.viz.cache")
+    def test_get_payload_json_cache(self, mock_cache):
+        store = {}
+        mock_cache.get.side_effect = store.get
+        mock_cache.set.side_effect = lambda key, value, timeout: store.update(
+            {key: value}
+        )
+        datasource = self.get_datasource_mock()
+        datasource.cache_timeout = 600
+
+        def get_viz(force=False, error=None):
+            test_viz = viz.BaseViz(datasource, form_data={"row_limit": 10}, force=force)
+            test_viz.query_obj = Mock(return_value={"row_limit": 10})
+            test_viz.cache_key = Mock(return_value="data_key")
+            test_viz.get_payload = Mock(
+                side_effect=lambda query_obj: {
+                    "cache_key": None,
+                    "cached_dttm": None,
+                    "is_cached": False,
+                    "error": error,
+                    "data": [{"a": 1}],
+                }
+            )
+            return test_viz
+
+        test_viz = get_viz()
+        payload_json, has_error = test_viz.get_payload_json()
+        payload = json.loads(payload_json)
+        self.assertFalse(has_error)
+        self.assertFalse(payload["is_cached"])
+        self.assertEqual(payload["data"], [{"a": 1}])
+        self.assertEqual(len(store), 1)
+
+        test_viz = get_viz()
+        payload_json, has_error = test_viz.get_payload_json()
+        cached_payload = json.loads(payload_json)
+        test_viz.get_payload.assert_not_called()
+        self.assertFalse(has_error)
+        self.assertTrue(cached_payload["is_cached"])
+        self.assertIsNotNone(cached_payload["cached_dttm"])
+        self.assertEqual(cached_payload["data"], payload["data"])
+
+        test_viz = get_viz(force=True)
+        test_viz.get_payload_json()
+        test_viz.get_payload.assert_called_once_with({"row_limit": 10})
+
+        store.clear()
+        test_viz = get_viz(error="No data")
+        payload_json, has_error = test_viz.get_payload_json()
+        self.assertTrue(has_error)
+        self.assertEqual(store, {})
+
+    @patch.dict(app.config, {"CHART_SINGLE_FLIGHT_ENABLED": True})
+    @patch("superset.utils.single_flight.sleep")
+    @patch("superset.viz.cache")
+    def test_get_df_payload_single_flight(self, mock_cache, mock_sleep):
+        store = {}
+        mock_cache.get.side_effect = store.get
+        mock_cache.set.side_effect = lambda key, value, timeout: store.update(
+            {key: value}
+        )
+        mock_cache.add.side_effect = lambda key, value, timeout: (
+            key not in store and not store.update({key: value})
+        )
+        mock_cache.delete.side_effect = lambda key: store.pop(key, None)
+        df = pd.DataFrame({"a": [1, 2]})
+        datasource = self.get_datasource_mock()
+        datasource.cache_timeout = 600
+
+        def get_viz():
+            test_viz = viz.BaseViz(datasource, form_data={})
+            test_viz.cache_key = Mock(return_value="data_key")
+            test_viz.get_df = Mock(return_value=df)
+            return test_viz
+
+        # another process runs the query and caches its results while waiting
+        store["single_flight_data_key"] = "token"
+
+        def set_results(interval):
+            leader = get_viz()
+            del store["single_flight_data_key"]
+            leader.get_df_payload({"row_limit": 10})
+
+        mock_sleep.side_effect = set_results
+        test_viz = get_viz()
+        payload = test_viz.get_df_payload({"row_limit": 10})
+        test_viz.get_df.assert_not_called()
+        self.assertTrue(payload["is_cached"])
+        self.assertTrue(payload["df"].equals(df))
+        self.assertEqual(set(store), {"data_key"})
+
+        # the lock is released once the results are cached
+        store.clear()
+        test_viz = get_viz()
+        payload = test_viz.get_df_payload({"row_limit": 10})
+        test_viz.get_df.assert_called_once_with({"row_limit": 10})
+        self.assertEqual(set(store), {"data_key"})
+
+    @patch("superset.tasks.cache.refresh_chart_data")
+    @patch("superset.viz.cache")
+    def test_get_df_payload_stale_while_revalidate(self, mock_cache, mock_refresh):
+        store = {}
+        mock_cache.get.side_effect = store.get
+        mock_cache.add.side_effect = lambda key, value, timeout: (
+            key not in store and not store.update({key: value})
+        )
+        df = pd.DataFrame({"a": [1, 2]})
+        datasource = self.get_datasource_mock()
+        datasource.cache_timeout = 600
+        datasource.database.cache_max_staleness = 3600
+
+        def get_viz(age):
+            dttm = datetime.utcnow() - timedelta(seconds=age)
+            store["data_key"] = cache_codec.dumps(
+                {"dttm": dttm.isoformat().split(".")[0], "df": df, "query": ""},
+                app.config["CHART_CACHE_CODEC"],
+            )
+            test_viz = viz.BaseViz(datasource, form_data={"viz_type": "table"})
+            test_viz.cache_key = Mock(return_value="data_key")
+            test_viz.get_df = Mock(return_value=df)
+            return test_viz
+
+        # fresh data
+        test_viz = get_viz(age=60)
+        test_viz.get_df_payload({"row_limit": 10})
+        test_viz.get_df.assert_not_called()
+        mock_refresh.delay.assert_not_called()
+
+        # expired data is served while it's refreshed, once
+        for _ in range(2):
+            test_viz = get_viz(age=1200)
+            payload = test_viz.get_df_payload({"row_limit": 10})
+            test_viz.get_df.assert_not_called()
+            self.assertTrue(payload["is_cached"])
+        mock_refresh.delay.assert_called_once_with(
+            "table", datasource.id, test_viz.form_data, "data_key"
+        )
+
+        # data expired for too long is queried again, and cached for as long as
+        # it can be served
+        test_viz = get_viz(age=4500)
+        payload = test_viz.get_df_payload({"row_limit": 10})
+        test_viz.get_df.assert_called_once_with({"row_limit": 10})
+        self.assertFalse(payload["is_cached"])
+        self.assertEqual(mock_cache.set.call_args[1]["timeout"], 4200)
+
+    @patch("superset.viz.cache")
+    def test_get_df_payloads(self, mock_cache):
+        df = pd.DataFrame({"a": [1, 2]})
+        store = {
+            "key_2": cache_codec.dumps(
+                {"dttm": "2020-01-01T00:00:00", "df": df, "query": "SELECT 2"},
+                app.config["CHART_CACHE_CODEC"],
+            )
+        }
+        mock_cache.get.side_effect = store.get
+        datasource = self.get_datasource_mock()
+        datasource.cache_timeout = 600
+
+        def get_df(query_obj):
+            if query_obj["row_limit"] == 3:
+                raise Exception("Error in query 3")
+            return df
+
+        test_viz = viz.BaseViz(datasource, form_data={})
+        test_viz.cache_key = Mock(
+            side_effect=lambda qry: "key_{}".format(qry["row_limit"])
+        )
+        test_viz.get_df = Mock(side_effect=get_df)
+        # charts are loaded in requests, reporting an error needs the app
+        with app.test_request_context():
+            payloads = test_viz.get_df_payloads(
+                [({"row_limit": row_limit}, {}) for row_limit in range(1, 5)]
+            )
+
+        # each query is looked up in the cache
+        self.assertEqual(
+            sorted(call[0][0]["row_limit"] for call in test_viz.get_df.call_args_list),
+            [1, 3, 4],
+        )
+        self.assertTrue(payloads[1]["is_cached"])
+        self.assertIsNone(payloads[2]["df"])
+        self.assertTrue(payloads[3]["df"].equals(df))
+
+        # the error of a query isn't hidden by the queries after it
+        self.assertEqual(test_viz.status, QueryStatus.FAILED)
+        self.assertEqual(test_viz.error_message, "Error in query 3")
+        self.assertTrue(test_viz._some_from_cache)
+        self.assertEqual(test_viz._any_cache_key, "key_2")
+        self.assertEqual(test_viz.query, "SELECT 2")
+
+    @patch.dict(app.config, {"CHART_INCREMENTAL_CACHE_ENABLED": True})
+    @patch("superset.viz.cache")
+    def test_get_df_incremental(self, mock_cache):
+        store = {}
+        mock_cache.get_many.side_effect = lambda *keys: [store.get(k) for k in keys]
+        mock_cache.set.side_effect = lambda key, value, timeout: store.update(
+            {key: value}
+        )
+        datasource = self.get_datasource_mock()
+        datasource.uid = "1__table"
+        datasource.offset = 0
+        datasource.cache_timeout = 600
+        datasource.get_extra_cache_keys = Mock(return_value=[])
+        data = pd.DataFrame(
+            {
+                DTTM_ALIAS: pd.date_range("2019-01-01", periods=10, freq="D"),
+                "y": np.arange(10.0),
+            }
+        )
+
+        def get_viz():
+            test_viz = viz.NVD3TimeSeriesViz(datasource, form_data={})
+
+            def get_df(query_obj):
+                test_viz.query = "SELECT {}".format(query_obj["from_dttm"].date())
+                df = data[
+                    (data[DTTM_ALIAS] >= query_obj["from_dttm"])
+                    & (data[DTTM_ALIAS] < query_obj["to_dttm"])
+                ][: query_obj["row_limit"]].reset_index(drop=True)
+                if df.empty:
+                    # the timestamps of empty results aren't converted
+                    return pd.DataFrame({DTTM_ALIAS: [], "y": []}, dtype=object)
+                return df
+
+            test_viz.get_df = Mock(side_effect=get_df)
+            return test_viz
+
+        def get_query_obj(from_dttm, to_dttm, row_limit=100):
+            return {
+                "granularity": "ds",
+                "is_timeseries": True,
+                "from_dttm": from_dttm,
+                "to_dttm": to_dttm,
+                "extras": {"time_grain_sqla": "P1D"},
+                "row_limit": row_limit,
+                "timeseries_limit": 0,
+            }
+
+        # the days missing from the cache are queried at once
+        test_viz = get_viz()
+        df = test_viz.get_df_incremental(
+            get_query_obj(datetime(2019, 1, 1), datetime(2019, 1, 4))
+        )
+        test_viz.get_df.assert_called_once()
+        self.assertTrue(df.equals(data[0:3]))
+        self.assertEqual(len(store), 3)
+
+        # only the new days are queried when the time range moves
+        test_viz = get_viz()
+        df = test_viz.get_df_incremental(
+            get_query_obj(datetime(2019, 1, 2), datetime(2019, 1, 6))
+        )
+        test_viz.get_df.assert_called_once()
+        qry = test_viz.get_df.call_args[0][0]
+        self.assertEqual(qry["from_dttm"], datetime(2019, 1, 4))
+        self.assertEqual(qry["to_dttm"], datetime(2019, 1, 6))
+        self.assertTrue(df.equals(data[1:5].reset_index(drop=True)))
+        self.assertEqual(test_viz.query, "SELECT 2019-01-01;\n\nSELECT 2019-01-04")
+
+        # the whole time range is queried when the days may have been truncated
+        test_viz = get_viz()
+        test_viz.get_df_incremental(
+            get_query_obj(datetime(2019, 1, 1), datetime(2019, 1, 4), 5)
+        )
+        test_viz = get_viz()
+        query_obj = get_query_obj(datetime(2019, 1, 1), datetime(2019, 1, 7), 5)
+        df = test_viz.get_df_incremental(query_obj)
+        self.assertEqual(test_viz.get_df.call_count, 2)
+        test_viz.get_df.assert_called_with(query_obj)
+        self.assertEqual(len(df.index), 5)
+
+        # the latest day may have no data yet
+        test_viz = get_viz()
+        test_viz.get_df_incremental(
+            get_query_obj(datetime(2019, 1, 9), datetime(2019, 1, 11))
+        )
+        test_viz = get_viz()
+        df = test_viz.get_df_incremental(
+            get_query_obj(datetime(2019, 1, 9), datetime(2019, 1, 12))
+        )
+        test_viz.get_df.assert_called_once()
+        self.assertTrue(df.equals(data[8:10].reset_index(drop=True)))
+
+        # as may the whole time range
+        for _ in range(2):
+            test_viz = get_viz()
+            df = test_viz.get_df_incremental(
+                get_query_obj(datetime(2019, 1, 20), datetime(2019, 1, 23))
+            )
+            self.assertTrue(df.empty)
+        test_viz.get_df.assert_not_called()
+
+        # time grains of more than a day aren't cached by day
+        query_obj["extras"]["time_grain_sqla"] = "P1W"
+        self.assertIsNone(test_viz.get_partitions(query_obj))
+
 
 class TableVizTestCase(SupersetTestCase):
     def test_get_data_applies_percentage(self):
@@ -835,6 +1135,85 @@ class TimeSeriesTableVizTestCase(SupersetTestCase):
             test_viz.query_obj()
 
 
+class MapboxVizTestCase(SupersetTestCase):
+    form_data = {
+        "all_columns_x": "lon",
+        "all_columns_y": "lat",
+        "mapbox_label": ["count"],
+        "point_radius": "Auto",
+        "clustering_radius": "60",
+        "pandas_aggfunc": "sum",
+    }
+
+    def get_df(self):
+        return pd.DataFrame(
+            {
+                "lon": [2.35222190001, 2.3522219, 13.4],
+                "lat": [48.8566, 48.8566, 52.52],
+                "count": [1, 2, 3],
+            }
+        )
+
+    def test_get_data(self):
+        datasource = self.get_datasource_mock()
+        test_viz = viz.MapboxViz(datasource, self.form_data)
+        data = test_viz.get_data(self.get_df())
+        self.assertIsNone(data["clusters"])
+        self.assertEqual(
+            data["geoJSON"]["features"][0],
+            {
+                "type": "Feature",
+                "properties": {"metric": 1, "radius": None},
+                "geometry": {"type": "Point", "coordinates": [2.3522219, 48.8566]},
+            },
+        )
+        self.assertEqual(len(data["geoJSON"]["features"]), 3)
+
+    @patch("superset.viz.cache")
+    def test_get_data_clusters(self, mock_cache):
+        store = {}
+        mock_cache.get.side_effect = store.get
+        mock_cache.set.side_effect = lambda key, value, timeout: store.update(
+            {key: value}
+        )
+        datasource = self.get_datasource_mock()
+        datasource.cache_timeout = 600
+        form_data = dict(self.form_data, server_side_clustering=True)
+        test_viz = viz.MapboxViz(datasource, form_data)
+        test_viz.query_obj = Mock(return_value={"row_limit": 10})
+        test_viz.cache_key = Mock(return_value="data_key")
+        data = test_viz.get_data(self.get_df())
+        self.assertIsNone(data["geoJSON"])
+
+        # the points of Paris are clustered until the deepest zoom level
+        deepest = data["clusters"][app.config["MAPBOX_CLUSTERING_MAX_ZOOM"]]
+        self.assertEqual(
+            [feature["properties"] for feature in deepest["features"]],
+            [
+                {"metric": 3, "radius": None, "cluster": True, "point_count": 2},
+                {"metric": 3, "radius": None},
+            ],
+        )
+        self.assertEqual(
+            deepest["features"][1]["geometry"]["coordinates"], [13.4, 52.52]
+        )
+        self.assertEqual(
+            [feature["properties"] for feature in data["clusters"][0]["features"]],
+            [{"metric": 6, "radius": None, "cluster": True, "point_count": 3}],
+        )
+
+        # the clusters are cached next to the data
+        self.assertEqual(len(store), 1)
+        test_viz = viz.MapboxViz(datasource, form_data)
+        test_viz.query_obj = Mock(return_value={"row_limit": 10})
+        test_viz.cache_key = Mock(return_value="data_key")
+        with patch("superset.viz.clustering.cluster_points") as mock_cluster_points:
+            self.assertEqual(
+                test_viz.get_data(self.get_df())["clusters"], data["clusters"]
+            )
+        mock_cluster_points.assert_not_called()
+
+
 class BaseDeckGLVizTestCase(SupersetTestCase):
     def test_get_metrics(self):
         form_data = load_fixture("deck_path_form_data.json")
@@ -950,6 +1329,62 @@ class BaseDeckGLVizTestCase(SupersetTestCase):
         with self.assertRaises(SpatialException):
             test_viz_deckgl.parse_coordinates("fldkjsalkj,fdlaskjfjadlksj")
 
+    def test_parse_coordinates_column(self):
+        column = pd.Series(["1.23, 3.21", "-0 90", "10 N, 20 E", "", None])
+        self.assertEqual(
+            viz.BaseDeckGLViz.parse_coordinates_column(column).tolist(),
+            [viz.BaseDeckGLViz.parse_coordinates(point) for point in column],
+        )
+
+        with self.assertRaises(SpatialException):
+            viz.BaseDeckGLViz.parse_coordinates_column(pd.Series(["1, 2", "NULL"]))
+
+    def test_reverse_geohash_decode_column(self):
+        column = pd.Series(["s", "ezs42", "u4pruydqqvj8pr", "S0"])
+        self.assertEqual(
+            viz.BaseDeckGLViz.reverse_geohash_decode_column(column).tolist(),
+            [viz.BaseDeckGLViz.reverse_geohash_decode(code) for code in column],
+        )
+
+    def test_get_data_columnar(self):
+        datasource = self.get_datasource_mock()
+        form_data = {
+            "spatial": {"type": "latlong", "lonCol": "lon", "latCol": "lat"},
+            "point_radius_fixed": {"type": "metric", "value": "count"},
+            "dimension": "cat",
+            "js_columns": ["name"],
+        }
+        df = pd.DataFrame(
+            {
+                "lon": [1.5, 2.5],
+                "lat": [-1.5, None],
+                "count": [3, 4],
+                "cat": ["a", "b"],
+                "name": ["x", "y"],
+                DTTM_ALIAS: pd.to_datetime(["2019-01-01", "2019-01-02"]),
+            }
+        )
+        test_viz = viz.DeckScatterViz(datasource, form_data)
+        test_viz.metric = "count"
+        features = test_viz.get_data(df.copy())["features"]
+
+        form_data["columnar_features"] = True
+        test_viz = viz.DeckScatterViz(datasource, form_data)
+        test_viz.metric = "count"
+        data = test_viz.get_data(df.copy())
+        self.assertEqual(data["length"], 2)
+        columns = data["columns"]
+        self.assertEqual(columns["position"][:3], [1.5, -1.5, 2.5])
+        self.assertTrue(np.isnan(columns["position"][3]))
+        self.assertEqual(columns["metric"], [3, 4])
+        self.assertEqual(columns["radius"], [3, 4])
+        self.assertEqual(columns["cat_color"], ["a", "b"])
+        self.assertEqual(columns[DTTM_ALIAS], [1546300800000.0, 1546387200000.0])
+        self.assertEqual(columns["extraProps"], {"name": ["x", "y"]})
+        self.assertEqual(
+            [feature["cat_color"] for feature in features], columns["cat_color"]
+        )
+
     @patch("superset.utils.core.uuid.uuid4")
     def test_filter_nulls(self, mock_uuid4):
         mock_uuid4.return_value = uuid.UUID("12345678123456781234567812345678")
@@ -1049,6 +1484,74 @@ class TimeSeriesVizTestCase(SupersetTestCase):
         ]
         self.assertEqual(expected, viz_data)
 
+    def test_to_series(self):
+        datasource = self.get_datasource_mock()
+        test_viz = viz.NVD3TimeSeriesViz(datasource, {"metrics": ["y"]})
+        index = pd.to_datetime(["2019-01-01", "2019-01-02"])
+        df = pd.DataFrame(
+            {"a": [1.0, np.nan], "b": [np.nan, np.nan], "": [1, 2], "c": ["x", "y"]},
+            index=index,
+        )
+        self.assertEqual(
+            test_viz.to_series(df.copy(), classed="time-shift-0"),
+            [
+                {
+                    "key": "a",
+                    "values": [{"x": index[0], "y": 1.0}, {"x": index[1], "y": ANY}],
+                    "classed": "time-shift-0",
+                },
+                {
+                    "key": "N/A",
+                    "values": [{"x": index[0], "y": 1}, {"x": index[1], "y": 2}],
+                    "classed": "time-shift-0",
+                },
+            ],
+        )
+
+        x_arrays = []
+        chart_data = test_viz.to_columnar_series(df.copy(), x_arrays)
+        self.assertEqual(x_arrays, [[1546300800000.0, 1546387200000.0]])
+        self.assertEqual(
+            [(d["key"], d["x"], d["y"][0]) for d in chart_data],
+            [("a", 0, 1.0), ("N/A", 0, 1)],
+        )
+        self.assertTrue(np.isnan(chart_data[0]["y"][1]))
+
+    def test_get_data_columnar(self):
+        datasource = self.get_datasource_mock()
+        df = pd.DataFrame(
+            {
+                "__timestamp": pd.to_datetime(["2019-01-01", "2019-01-02"] * 2),
+                "name": ["b", "b", "a", "a"],
+                "y": [1, 2, 3, 4],
+            }
+        )
+        form_data = {"metrics": ["y"], "groupby": ["name"], "columnar_series": True}
+        test_viz = viz.NVD3TimeSeriesViz(datasource, form_data)
+        test_viz._extra_chart_data = [("1 day ago", test_viz.process_data(df.copy()))]
+        self.assertEqual(
+            test_viz.get_data(df),
+            {
+                "x": [[1546300800000.0, 1546387200000.0]] * 2,
+                "series": [
+                    {"key": ("a",), "x": 0, "y": [3, 4]},
+                    {
+                        "key": ("a", "1 day ago"),
+                        "x": 1,
+                        "y": [3, 4],
+                        "classed": "time-shift-0",
+                    },
+                    {"key": ("b",), "x": 0, "y": [1, 2]},
+                    {
+                        "key": ("b", "1 day ago"),
+                        "x": 1,
+                        "y": [1, 2],
+                        "classed": "time-shift-0",
+                    },
+                ],
+            },
+        )
+
     def test_process_data_resample(self):
         datasource = self.get_datasource_mock()
 